@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tableaux de bord de l'apprentissage (progression sur les contenus éducatifs)
+
+Les lectures s'appuient sur les agrégats maintenus par trigger depuis
+user_progress (migration 9) :
+- progress_user_category : une ligne par (utilisateur, catégorie), plus
+  une ligne de total par utilisateur (category_id = 0) ;
+- progress_content_daily : une ligne par (contenu, jour de rattachement),
+  le jour étant celui du début du contenu (ou du dernier accès).
+
+L'export en colonnes (export_columns) lit user_progress en flux dans des
+tableaux typés (array, ou NumPy s'il est installé) pour les analyses de
+cohortes en masse.
+
+Toutes les lectures passent par DatabaseHelper.read_connection : elles sont
+servies par un réplica si un ReplicaManager (db_replica) est attaché.
+"""
+
+from array import array
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from db_setting import DatabaseHelper
+
+try:
+    import numpy
+except ImportError:  # NumPy est optionnel : l'export retourne alors des array
+    numpy = None
+
+# Codes des statuts de progression dans l'export en colonnes
+STATUS_CODES = {"not_started": 0, "in_progress": 1, "completed": 2}
+
+# Colonnes de l'export : nom -> (type array, expression SQL sur user_progress up)
+EXPORT_COLUMNS = {
+    "user_id": ("q", "up.user_id"),
+    "content_id": ("q", "up.content_id"),
+    "category_id": ("q", "COALESCE(ec.category_id, 0)"),
+    "status": ("b", "CASE up.progress_status WHEN 'in_progress' THEN 1 "
+                    "WHEN 'completed' THEN 2 ELSE 0 END"),
+    "score": ("q", "COALESCE(up.score, 0)"),
+    "time_spent": ("q", "COALESCE(up.time_spent, 0)"),
+    "attempts": ("q", "COALESCE(up.attempts_count, 0)"),
+    # Jour de rattachement en jours depuis 1970-01-01 (-1 si inconnu)
+    "day": ("i", "COALESCE(CAST(julianday(date(COALESCE(up.started_at, up.last_accessed)))"
+                 " - 2440587.5 AS INTEGER), -1)"),
+}
+
+# Types NumPy correspondant aux codes array
+NUMPY_TYPES = {"q": "int64", "b": "int8", "i": "int32", "d": "float64"}
+
+
+def _rates(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Ajoute les taux dérivés à une ligne de mesures agrégées"""
+    tracked, completed = row["tracked"] or 0, row["completed"] or 0
+    row["not_started"] = tracked - (row["in_progress"] or 0) - completed
+    row["completion_rate"] = round(completed / tracked, 4) if tracked else 0.0
+    row["average_score"] = round(row["score_sum"] / completed, 2) if completed else None
+    return row
+
+
+class ProgressAnalytics:
+    """Lectures des agrégats de progression et export en colonnes"""
+
+    def __init__(self, db_helper: DatabaseHelper):
+        """
+        Args:
+            db_helper: Accès à la base (schéma en version 9 ou plus) ; les
+                       agrégats différés (lazy_schema) sont créés ici
+        """
+        self.db_helper = db_helper
+        db_helper.ensure_schema_group("education")
+
+    # =============================================
+    # TABLEAUX DE BORD
+    # =============================================
+
+    def user_completion(self, user_id: int) -> Dict[str, Any]:
+        """
+        Progression d'un utilisateur par catégorie et au total
+
+        Returns:
+            {"total": {...}, "categories": [{...}]} ; chaque entrée contient les
+            mesures (tracked, in_progress, completed, score_sum, time_spent,
+            attempts) et les taux dérivés (completion_rate, average_score)
+        """
+        rows = self.db_helper.read_connection().execute('''
+            SELECT p.*, c.name AS category_name
+            FROM progress_user_category p
+            LEFT JOIN education_categories c ON c.id = p.category_id
+            WHERE p.user_id = ?
+            ORDER BY p.category_id
+        ''', (user_id,)).fetchall()
+        result: Dict[str, Any] = {"total": None, "categories": []}
+        for row in rows:
+            entry = _rates(dict(row))
+            if entry["category_id"] == 0:
+                del entry["category_name"]
+                result["total"] = entry
+            else:
+                result["categories"].append(entry)
+        return result
+
+    def content_funnel(self, content_id: int, since: Optional[str] = None,
+                       until: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Entonnoir d'un contenu : non commencé, en cours, terminé
+
+        Args:
+            content_id: Contenu éducatif
+            since, until: Bornes incluses ("AAAA-MM-JJ") sur le jour de rattachement
+
+        Returns:
+            Mesures cumulées et taux dérivés
+        """
+        row = self.db_helper.read_connection().execute('''
+            SELECT ? AS content_id, COUNT(*) AS days, SUM(tracked) AS tracked,
+                   SUM(in_progress) AS in_progress, SUM(completed) AS completed,
+                   SUM(score_sum) AS score_sum, SUM(time_spent) AS time_spent,
+                   SUM(attempts) AS attempts
+            FROM progress_content_daily
+            WHERE content_id = ? AND day >= ? AND day <= ?
+        ''', (content_id, content_id, since or "", until or "9999-12-31")).fetchone()
+        return _rates({key: (row[key] or 0) for key in row.keys()})
+
+    def content_daily(self, content_id: int, since: Optional[str] = None,
+                      until: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Série journalière d'un contenu (jours sans activité absents)"""
+        rows = self.db_helper.read_connection().execute('''
+            SELECT * FROM progress_content_daily
+            WHERE content_id = ? AND day >= ? AND day <= ?
+            ORDER BY day
+        ''', (content_id, since or "", until or "9999-12-31")).fetchall()
+        return [_rates(dict(row)) for row in rows]
+
+    def category_progress(self, since: Optional[str] = None,
+                          until: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Progression par catégorie sur une période (jour de rattachement)
+
+        Somme des lignes journalières des contenus de chaque catégorie ; le
+        nombre de lignes lues dépend du nombre de contenus et de jours, pas
+        du volume de user_progress.
+        """
+        rows = self.db_helper.read_connection().execute('''
+            SELECT ec.category_id, c.name AS category_name,
+                   SUM(d.tracked) AS tracked, SUM(d.in_progress) AS in_progress,
+                   SUM(d.completed) AS completed, SUM(d.score_sum) AS score_sum,
+                   SUM(d.time_spent) AS time_spent, SUM(d.attempts) AS attempts
+            FROM progress_content_daily d
+            JOIN educational_content ec ON ec.id = d.content_id
+            LEFT JOIN education_categories c ON c.id = ec.category_id
+            WHERE d.day >= ? AND d.day <= ?
+            GROUP BY ec.category_id
+            ORDER BY ec.category_id
+        ''', (since or "", until or "9999-12-31")).fetchall()
+        return [_rates(dict(row)) for row in rows]
+
+    def category_learners(self, category_id: int) -> int:
+        """Nombre d'utilisateurs ayant au moins un contenu suivi dans une catégorie"""
+        return self.db_helper.read_connection().execute(
+            "SELECT COUNT(*) FROM progress_user_category WHERE category_id = ?",
+            (category_id,)).fetchone()[0]
+
+    # =============================================
+    # EXPORT EN COLONNES
+    # =============================================
+
+    def export_columns(self, columns: Optional[List[str]] = None,
+                       category_id: Optional[int] = None, since: Optional[str] = None,
+                       as_numpy: Optional[bool] = None,
+                       chunk_size: int = 50000) -> Dict[str, Any]:
+        """
+        Exporte user_progress en colonnes typées
+
+        Les lignes sont lues par paquets et réparties colonne par colonne
+        dans des array ; avec NumPy, les tableaux sont exposés sans copie.
+
+        Args:
+            columns: Colonnes de EXPORT_COLUMNS (par défaut toutes)
+            category_id: Limite l'export à une catégorie
+            since: Jour de rattachement minimal ("AAAA-MM-JJ")
+            as_numpy: Tableaux NumPy (par défaut si NumPy est installé)
+            chunk_size: Nombre de lignes lues par paquet
+
+        Returns:
+            Nom de colonne -> array (ou numpy.ndarray)
+        """
+        columns = list(columns or EXPORT_COLUMNS)
+        unknown = [column for column in columns if column not in EXPORT_COLUMNS]
+        if unknown:
+            raise ValueError(f"Colonnes inconnues: {', '.join(unknown)}")
+        if as_numpy is None:
+            as_numpy = numpy is not None
+        elif as_numpy and numpy is None:
+            raise RuntimeError("NumPy n'est pas installé : utiliser as_numpy=False")
+
+        where, params = [], []
+        if category_id is not None:
+            where.append("ec.category_id = ?")
+            params.append(category_id)
+        if since is not None:
+            where.append("date(COALESCE(up.started_at, up.last_accessed)) >= ?")
+            params.append(since)
+        cursor = self.db_helper.read_connection().cursor()
+        cursor.row_factory = None
+        cursor.execute(f'''
+            SELECT {", ".join(EXPORT_COLUMNS[column][1] for column in columns)}
+            FROM user_progress up
+            LEFT JOIN educational_content ec ON ec.id = up.content_id
+            {"WHERE " + " AND ".join(where) if where else ""}
+        ''', params)
+
+        arrays = [array(EXPORT_COLUMNS[column][0]) for column in columns]
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for values, target in zip(zip(*rows), arrays):
+                target.extend(values)
+        if as_numpy:
+            return {column: numpy.frombuffer(values, dtype=NUMPY_TYPES[values.typecode])
+                    for column, values in zip(columns, arrays)}
+        return dict(zip(columns, arrays))
+
+    @staticmethod
+    def cohort_completion(columns: Dict[str, Any],
+                          period_days: int = 7) -> Dict[Tuple[int, int], Tuple[int, int]]:
+        """
+        Taux de complétion par cohorte (période de début) et par catégorie
+
+        Args:
+            columns: Résultat de export_columns (colonnes day, category_id, status)
+            period_days: Durée d'une cohorte en jours
+
+        Returns:
+            (premier jour de la cohorte depuis 1970-01-01, catégorie) ->
+            (lignes suivies, lignes terminées) ; lignes sans jour ignorées
+        """
+        days, categories, statuses = columns["day"], columns["category_id"], columns["status"]
+        if numpy is not None and isinstance(days, numpy.ndarray):
+            known = days >= 0
+            cohorts = days[known] // period_days
+            category = categories[known].astype("int64")
+            completed = statuses[known] == STATUS_CODES["completed"]
+            if not len(cohorts):
+                return {}
+            width = int(category.max()) + 1
+            keys = (cohorts - cohorts.min()) * width + category
+            tracked = numpy.bincount(keys)
+            done = numpy.bincount(keys, weights=completed)
+            base = int(cohorts.min())
+            return {((base + int(key) // width) * period_days, int(key) % width):
+                    (int(tracked[key]), int(done[key]))
+                    for key in numpy.flatnonzero(tracked)}
+
+        counts: Dict[Tuple[int, int], List[int]] = defaultdict(lambda: [0, 0])
+        completed_code = STATUS_CODES["completed"]
+        for day, category, status in zip(days, categories, statuses):
+            if day < 0:
+                continue
+            entry = counts[(day // period_days * period_days, category)]
+            entry[0] += 1
+            if status == completed_code:
+                entry[1] += 1
+        return {key: (tracked, done) for key, (tracked, done) in counts.items()}
+
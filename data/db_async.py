@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Front-end asyncio pour la base de données Child Security
+
+Les lectures sont exécutées sur un pool de threads lecteurs (une connexion
+WAL par thread), les écritures sont sérialisées par un unique thread
+écrivain qui regroupe les écritures en attente dans une même transaction
+(group commit) : un seul fsync pour plusieurs requêtes.
+"""
+
+import asyncio
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from db_setting import DatabaseHelper, QueryStats
+
+# Marqueur d'arrêt du thread écrivain
+_STOP = object()
+
+
+class AsyncDatabaseHelper:
+    """Accès asynchrone à la base : lecteurs en parallèle, écrivain unique"""
+
+    def __init__(self, db_path: str, readers: int = 4, max_batch: int = 256,
+                 pragmas: Optional[Dict[str, Any]] = None, cache_size: int = 1024,
+                 query_stats: Optional[QueryStats] = None):
+        """
+        Initialise le helper (les threads sont démarrés par start())
+
+        Args:
+            db_path: Chemin vers le fichier de base de données
+            readers: Nombre de threads (et de connexions) de lecture
+            max_batch: Nombre maximal d'écritures regroupées dans une transaction
+            pragmas: PRAGMAs supplémentaires pour toutes les connexions
+            cache_size: Taille du cache de données de référence des lecteurs
+            query_stats: Instrumentation partagée par les lecteurs et l'écrivain
+        """
+        self.db_path = db_path
+        self.readers = readers
+        self.max_batch = max_batch
+        self.pragmas = pragmas
+        self.cache_size = cache_size
+        self.query_stats = query_stats
+        self._reader: Optional[DatabaseHelper] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._writes: "queue.Queue[Any]" = queue.Queue()
+        self._writer_thread: Optional[threading.Thread] = None
+        self._writer_ready = threading.Event()
+        self._writer_error: Optional[BaseException] = None
+        self.stats = {"writes": 0, "transactions": 0, "failed_writes": 0}
+
+    async def __aenter__(self) -> "AsyncDatabaseHelper":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        """Démarre le thread écrivain et le pool de lecteurs"""
+        if self._writer_thread is not None:
+            return
+        self._reader = DatabaseHelper(self.db_path, pool_size=self.readers, pragmas=self.pragmas,
+                                      cache_size=self.cache_size, query_stats=self.query_stats)
+        self._executor = ThreadPoolExecutor(max_workers=self.readers,
+                                            thread_name_prefix="db-reader")
+        self._writer_ready.clear()
+        self._writer_thread = threading.Thread(target=self._writer_loop, name="db-writer",
+                                               daemon=True)
+        self._writer_thread.start()
+        await asyncio.get_running_loop().run_in_executor(None, self._writer_ready.wait)
+        if self._writer_error is not None:
+            raise self._writer_error
+
+    async def close(self):
+        """Termine les écritures en attente puis arrête les threads"""
+        if self._writer_thread is None:
+            return
+        self._writes.put(_STOP)
+        await asyncio.get_running_loop().run_in_executor(None, self._writer_thread.join)
+        self._writer_thread = None
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        self._reader.close()
+        self._reader = None
+
+    # =============================================
+    # SCHÉMA
+    # =============================================
+
+    async def create_tables(self):
+        """Applique le schéma (mêmes migrations que DatabaseHelper.create_tables)"""
+        def migrate(conn: sqlite3.Connection):
+            helper = DatabaseHelper(self.db_path)
+            helper.connection = conn
+            helper.create_tables()
+            # Les lecteurs ne doivent pas servir de données de référence périmées
+            self._reader.invalidate_cache()
+        await self._submit_write(migrate, (), transactional=False)
+
+    # =============================================
+    # LECTURES
+    # =============================================
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Exécute une lecture sur un thread lecteur
+
+        Args:
+            func: Fonction appelée avec (DatabaseHelper, *args) ; elle ne doit
+                  pas écrire (les écritures passent par execute/write)
+        """
+        def call():
+            with self._reader.acquire():
+                return func(self._reader, *args)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    async def fetchall(self, sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        """Exécute une requête SELECT et retourne toutes les lignes (dict)"""
+        return await self.run(lambda helper: [dict(row) for row in
+                                              helper.connect().execute(sql, params)])
+
+    async def fetchone(self, sql: str, params: Sequence[Any] = ()) -> Optional[Dict[str, Any]]:
+        """Exécute une requête SELECT et retourne la première ligne (dict) ou None"""
+        def query(helper: DatabaseHelper):
+            row = helper.connect().execute(sql, params).fetchone()
+            return dict(row) if row is not None else None
+        return await self.run(query)
+
+    async def get_messages(self, conversation_id: int, before: Optional[Tuple[str, int]] = None,
+                           limit: int = 50) -> Dict[str, Any]:
+        """Voir DatabaseHelper.get_messages"""
+        return await self.run(DatabaseHelper.get_messages, conversation_id, before, limit)
+
+    async def get_inbox(self, user_id: int) -> List[Dict[str, Any]]:
+        """Voir DatabaseHelper.get_inbox"""
+        return await self.run(DatabaseHelper.get_inbox, user_id)
+
+    async def find_alerts_near(self, lat: float, lon: float, radius_m: float,
+                               since: Optional[str] = None,
+                               alert_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Voir DatabaseHelper.find_alerts_near"""
+        return await self.run(DatabaseHelper.find_alerts_near, lat, lon, radius_m, since, alert_type)
+
+    async def search(self, query: str, kinds: Optional[List[str]] = None,
+                     limit: int = 20) -> List[Dict[str, Any]]:
+        """Voir DatabaseHelper.search"""
+        return await self.run(DatabaseHelper.search, query, kinds, limit)
+
+    async def get_notifications(self, user_id: int, unread_only: bool = False,
+                                limit: int = 50) -> List[Dict[str, Any]]:
+        """Voir DatabaseHelper.get_notifications"""
+        return await self.run(DatabaseHelper.get_notifications, user_id, unread_only, limit)
+
+    # =============================================
+    # ÉCRITURES (THREAD ÉCRIVAIN UNIQUE)
+    # =============================================
+
+    async def write(self, func: Callable[..., Any], *args: Any,
+                    table: Optional[str] = None, key: Any = None) -> Any:
+        """
+        Exécute une écriture sur le thread écrivain
+
+        L'écriture est regroupée avec les autres écritures en attente dans une
+        même transaction, isolée par un SAVEPOINT : si elle échoue, seule
+        elle est annulée. Le résultat n'est rendu qu'après le COMMIT.
+
+        Args:
+            func: Fonction appelée avec (connexion, *args) ; elle ne doit ni
+                  valider ni annuler la transaction
+            table: Table modifiée : les entrées correspondantes du cache des
+                   lecteurs sont invalidées après le COMMIT (voir
+                   DatabaseHelper.invalidate_cache)
+            key: Identifiant de la ligne modifiée (toute la table si None)
+        """
+        return await self._submit_write(func, args, invalidate=(table, key) if table else None)
+
+    async def execute(self, sql: str, params: Sequence[Any] = (),
+                      table: Optional[str] = None, key: Any = None) -> Dict[str, int]:
+        """
+        Exécute une instruction d'écriture
+
+        Args:
+            table, key: Données de référence modifiées (voir write)
+
+        Returns:
+            {"rowcount": ..., "lastrowid": ...}
+        """
+        def statement(conn: sqlite3.Connection):
+            cursor = conn.execute(sql, params)
+            return {"rowcount": cursor.rowcount, "lastrowid": cursor.lastrowid}
+        return await self.write(statement, table=table, key=key)
+
+    async def executemany(self, sql: str, seq_of_params: Sequence[Sequence[Any]],
+                          table: Optional[str] = None) -> int:
+        """
+        Exécute une instruction d'écriture pour chaque jeu de paramètres ; retourne rowcount
+
+        Args:
+            table: Table modifiée, invalidée en entier dans le cache des lecteurs
+        """
+        return await self.write(lambda conn: conn.executemany(sql, seq_of_params).rowcount,
+                                table=table)
+
+    async def send_message(self, conversation_id: int, sender_id: int, content: str,
+                           message_type: str = "text",
+                           reply_to_message_id: Optional[int] = None) -> int:
+        """Envoie un message et retourne son identifiant"""
+        def insert(conn: sqlite3.Connection) -> int:
+            return conn.execute('''
+                INSERT INTO messages (conversation_id, sender_id, content, message_type,
+                                      reply_to_message_id)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (conversation_id, sender_id, content, message_type, reply_to_message_id)).lastrowid
+        return await self._submit_write(insert, ())
+
+    def invalidate_cache(self, table: Optional[str] = None, key: Any = None):
+        """Invalide le cache des lecteurs après une écriture sur des données de référence"""
+        if self._reader is not None:
+            self._reader.invalidate_cache(table, key)
+
+    async def _submit_write(self, func: Callable[..., Any], args: Sequence[Any],
+                            transactional: bool = True,
+                            invalidate: Optional[Tuple[str, Any]] = None) -> Any:
+        """
+        Met une écriture en file et attend son résultat
+
+        Args:
+            invalidate: (table, clé) à invalider dans le cache des lecteurs
+                        une fois l'écriture validée
+        """
+        if self._writer_thread is None:
+            raise RuntimeError("AsyncDatabaseHelper n'est pas démarré (start)")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._writes.put((func, args, transactional, invalidate, loop, future))
+        return await future
+
+    @staticmethod
+    def _resolve(future: "asyncio.Future", result: Any = None,
+                 error: Optional[BaseException] = None):
+        """Complète un future depuis la boucle d'événements"""
+        if future.cancelled():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _writer_loop(self):
+        """Boucle du thread écrivain : regroupe les écritures en transactions"""
+        try:
+            writer = DatabaseHelper(self.db_path, pool_size=1, pragmas=self.pragmas, cache_size=0,
+                                    query_stats=self.query_stats)
+            conn = writer.connect()
+        except BaseException as error:
+            self._writer_error = error
+            self._writer_ready.set()
+            return
+        self._writer_ready.set()
+
+        stopping = False
+        try:
+            while not stopping:
+                batch = [self._writes.get()]
+                # Regroupe tout ce qui est arrivé pendant la transaction précédente
+                while len(batch) < self.max_batch:
+                    try:
+                        batch.append(self._writes.get_nowait())
+                    except queue.Empty:
+                        break
+                if _STOP in batch:
+                    stopping = True
+                    batch = [item for item in batch if item is not _STOP]
+
+                # Les écritures non transactionnelles (DDL) s'exécutent seules
+                pending = []
+                for item in batch:
+                    if item[2]:
+                        pending.append(item)
+                        continue
+                    self._commit_group(conn, pending)
+                    pending = []
+                    func, args, _, invalidate, loop, future = item
+                    try:
+                        result = func(conn, *args)
+                        if invalidate is not None:
+                            self.invalidate_cache(*invalidate)
+                        loop.call_soon_threadsafe(self._resolve, future, result)
+                    except BaseException as error:
+                        if conn.in_transaction:
+                            conn.rollback()
+                        loop.call_soon_threadsafe(self._resolve, future, None, error)
+                self._commit_group(conn, pending)
+        finally:
+            writer.release()
+            writer.close()
+
+    def _commit_group(self, conn: sqlite3.Connection, items: List[Tuple]):
+        """Exécute un groupe d'écritures dans une seule transaction"""
+        if not items:
+            return
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for func, args, _, _, _, _ in items:
+                conn.execute("SAVEPOINT async_write")
+                try:
+                    results.append((func(conn, *args), None))
+                    conn.execute("RELEASE SAVEPOINT async_write")
+                except Exception as error:
+                    conn.execute("ROLLBACK TO SAVEPOINT async_write")
+                    conn.execute("RELEASE SAVEPOINT async_write")
+                    results.append((None, error))
+            conn.commit()
+        except BaseException as error:
+            # Échec du COMMIT (disque plein, verrou...) : tout le groupe échoue
+            if conn.in_transaction:
+                conn.rollback()
+            results = [(None, error)] * len(items)
+
+        self.stats["transactions"] += 1
+        for (_, _, _, invalidate, loop, future), (result, error) in zip(items, results):
+            self.stats["writes"] += 1
+            if error is not None:
+                self.stats["failed_writes"] += 1
+            elif invalidate is not None:
+                # Avant de rendre le résultat : l'appelant relit ensuite la valeur validée
+                self.invalidate_cache(*invalidate)
+            loop.call_soon_threadsafe(self._resolve, future, result, error)
@@ -0,0 +1,2121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks de la base de données Child Security
+
+Usage:
+    python data/db_benchmark.py spatial --alerts 1000000
+    python data/db_benchmark.py pool --threads 8 --seconds 10
+    python data/db_benchmark.py history --messages 200000
+    python data/db_benchmark.py inbox --messages 1000000
+    python data/db_benchmark.py search --documents 500000
+    python data/db_benchmark.py ingest --rows 1000000
+    python data/db_benchmark.py startup
+    python data/db_benchmark.py archive --rows 2000000
+    python data/db_benchmark.py cache --users 100000
+    python data/db_benchmark.py async --clients 64 --seconds 10
+    python data/db_benchmark.py fanout --nearby 100000 --workers 4
+    python data/db_benchmark.py graph --users 1000000 --links 3
+    python data/db_benchmark.py ratings --ratings 10000000
+    python data/db_benchmark.py progress --rows 20000000
+    python data/db_benchmark.py json --notifications 5000000
+    python data/db_benchmark.py replica --rows 2000000 --readers 8
+    python data/db_benchmark.py moderation --reports 5000000
+    python data/db_benchmark.py suite --scale 1.0 --json suite.json
+    python data/db_benchmark.py instrument --scale 1.0 --slow-ms 10
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import logging
+import os
+import py_compile
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from db_analytics import ProgressAnalytics
+from db_async import AsyncDatabaseHelper
+from db_fanout import AlertFanoutWorkers
+from db_generator import Vocabulary, generate_database, random_point_near
+from db_graph import ConnectionGraph
+from db_replica import ReplicaManager
+from db_setting import (DatabaseHelper, QueryStats, bounding_box, explain_query_plan,
+                        haversine_m, plan_warnings)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Percentile (interpolation au plus proche rang) d'une liste de mesures"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def measure(func: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Exécute func repeat fois et retourne les statistiques de latence (ms)"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return {
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+        "mean": statistics.fmean(samples),
+    }
+
+
+def print_stats(label: str, stats: Dict[str, float]):
+    """Affiche une ligne de résultats"""
+    print(f"  {label:<32} p50={stats['p50']:8.3f} ms  p99={stats['p99']:8.3f} ms  "
+          f"moy={stats['mean']:8.3f} ms")
+
+
+def temp_database(prefix: str) -> DatabaseHelper:
+    """Crée une base temporaire avec le schéma complet"""
+    fd, path = tempfile.mkstemp(prefix=prefix, suffix=".db")
+    os.close(fd)
+    os.unlink(path)
+    db_helper = DatabaseHelper(path)
+    db_helper.create_tables()
+    return db_helper
+
+
+def remove_database(db_helper: DatabaseHelper):
+    """Ferme et supprime une base temporaire"""
+    db_helper.close()
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(db_helper.db_path + suffix):
+            os.unlink(db_helper.db_path + suffix)
+
+
+# =============================================
+# ALERTES À PROXIMITÉ (R*TREE)
+# =============================================
+
+def bench_spatial(alerts: int, queries: int, radius_m: float, seed: int):
+    """Compare le pré-filtre B-tree (idx_alerts_location) et le R*Tree"""
+    rng = random.Random(seed)
+    db_helper = temp_database("bench_spatial_")
+    conn = db_helper.connect()
+    try:
+        print(f"📥 Insertion de {alerts} alertes...")
+        start = time.perf_counter()
+        alert_types = ["suspicious_person", "lost_child", "road_danger", "other"]
+        batch = []
+        for i in range(alerts):
+            lat, lon = random_point_near(rng, background=0.5)
+            created = f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 12:00:00"
+            batch.append((1, f"Alerte {i}", "Description", rng.choice(alert_types),
+                          lat, lon, created))
+            if len(batch) >= 50000:
+                conn.executemany('''
+                    INSERT INTO community_alerts
+                        (user_id, title, description, alert_type, latitude, longitude, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', batch)
+                batch.clear()
+        if batch:
+            conn.executemany('''
+                INSERT INTO community_alerts
+                    (user_id, title, description, alert_type, latitude, longitude, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', batch)
+        conn.commit()
+        conn.execute("ANALYZE")
+        print(f"   {time.perf_counter() - start:.1f} s")
+
+        points = [random_point_near(rng) for _ in range(queries)]
+
+        def btree_query():
+            # Même résultat que find_alerts_near (dict avec distance, triés)
+            lat, lon = points[rng.randrange(len(points))]
+            lat_min, lat_max, lon_ranges = bounding_box(lat, lon, radius_m)
+            lon_min, lon_max = lon_ranges[0]
+            rows = conn.execute('''
+                SELECT * FROM community_alerts INDEXED BY idx_alerts_location
+                WHERE latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?
+            ''', (lat_min, lat_max, lon_min, lon_max)).fetchall()
+            results = []
+            for row in rows:
+                distance = haversine_m(lat, lon, row["latitude"], row["longitude"])
+                if distance <= radius_m:
+                    results.append(dict(row, distance_m=distance))
+            results.sort(key=lambda item: item["distance_m"])
+            return results
+
+        def rtree_query():
+            lat, lon = points[rng.randrange(len(points))]
+            return db_helper.find_alerts_near(lat, lon, radius_m)
+
+        def probe(sql: str) -> Callable[[], List[Tuple[int]]]:
+            # Pré-filtre seul : identifiants des points de la boîte englobante
+            def run():
+                lat, lon = points[rng.randrange(len(points))]
+                lat_min, lat_max, lon_ranges = bounding_box(lat, lon, radius_m)
+                return conn.execute(sql, (lat_min, lat_max, *lon_ranges[0])).fetchall()
+            return run
+
+        sample_lat, sample_lon = points[0]
+        found = len(db_helper.find_alerts_near(sample_lat, sample_lon, radius_m))
+        print(f"🔎 Rayon {radius_m:.0f} m, ~{found} alertes par requête")
+        print_stats("B-tree, pré-filtre seul", measure(probe('''
+            SELECT id FROM community_alerts INDEXED BY idx_alerts_location
+            WHERE latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?
+        '''), queries))
+        print_stats("R*Tree, pré-filtre seul", measure(probe('''
+            SELECT id FROM community_alerts_rtree
+            WHERE max_lat >= ? AND min_lat <= ? AND max_lon >= ? AND min_lon <= ?
+        '''), queries))
+        print_stats("B-tree (latitude, longitude)", measure(btree_query, queries))
+        print_stats("R*Tree + haversine", measure(rtree_query, queries))
+    finally:
+        remove_database(db_helper)
+
+
+# =============================================
+# POOL DE CONNEXIONS (WAL) VS CONNEXION UNIQUE
+# =============================================
+
+def _seed_chat(db_helper: DatabaseHelper, conversations: int, messages: int, rng: random.Random):
+    """Insère des conversations et des messages pour les benchmarks de chat"""
+    with db_helper.acquire() as conn:
+        conn.executemany('''
+            INSERT INTO conversations (id, title, created_by) VALUES (?, ?, 1)
+        ''', [(i, f"Conversation {i}") for i in range(1, conversations + 1)])
+        conn.executemany('''
+            INSERT INTO messages (conversation_id, sender_id, content, sent_at)
+            VALUES (?, ?, ?, ?)
+        ''', [(rng.randint(1, conversations), rng.randint(1, 1000), f"Message {i}",
+               f"2025-01-01 00:{i // 60 % 60:02d}:{i % 60:02d}") for i in range(messages)])
+
+
+def _run_mixed_workload(get_connection: Callable[[], object], threads: int, seconds: float,
+                        write_ratio: float, conversations: int, seed: int) -> Dict[str, float]:
+    """
+    Exécute une charge mixte lecture/écriture sur plusieurs threads
+
+    get_connection() doit retourner un gestionnaire de contexte fournissant
+    une connexion propre au thread appelant.
+    """
+    counters = {"reads": 0, "writes": 0, "errors": 0}
+    counters_lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(index: int):
+        rng = random.Random(seed + index)
+        reads = writes = errors = 0
+        while time.perf_counter() < deadline:
+            conversation_id = rng.randint(1, conversations)
+            try:
+                with get_connection() as conn:
+                    if rng.random() < write_ratio:
+                        conn.execute('''
+                            INSERT INTO messages (conversation_id, sender_id, content)
+                            VALUES (?, ?, ?)
+                        ''', (conversation_id, index + 1, "Nouveau message"))
+                        writes += 1
+                    else:
+                        conn.execute('''
+                            SELECT * FROM messages WHERE conversation_id = ?
+                            ORDER BY sent_at DESC LIMIT 50
+                        ''', (conversation_id,)).fetchall()
+                        reads += 1
+            except Exception:
+                errors += 1
+        with counters_lock:
+            counters["reads"] += reads
+            counters["writes"] += writes
+            counters["errors"] += errors
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    counters["ops_per_sec"] = (counters["reads"] + counters["writes"]) / elapsed
+    return counters
+
+
+def bench_pool(threads: int, seconds: float, write_ratio: float, seed: int):
+    """Compare une connexion par thread (journal rollback) et le pool WAL"""
+    conversations = 1000
+    rng = random.Random(seed)
+
+    def print_result(label: str, result: Dict[str, float]):
+        print(f"  {label:<36} {result['ops_per_sec']:10.0f} ops/s  "
+              f"(lectures={result['reads']}, écritures={result['writes']}, "
+              f"erreurs={result['errors']})")
+
+    print(f"🧵 {threads} threads, {seconds:.0f} s, {write_ratio:.0%} d'écritures")
+
+    # Référence : un DatabaseHelper mono-connexion par thread (usage actuel)
+    db_helper = temp_database("bench_single_")
+    _seed_chat(db_helper, conversations, 100_000, rng)
+    local = threading.local()
+
+    def single_connection():
+        # Les connexions sqlite3 par défaut sont liées à leur thread de création
+        if not hasattr(local, "helper"):
+            local.helper = DatabaseHelper(db_helper.db_path)
+        return local.helper.acquire()
+
+    try:
+        print_result("DatabaseHelper (journal rollback)",
+                     _run_mixed_workload(single_connection, threads, seconds, write_ratio,
+                                         conversations, seed))
+    finally:
+        remove_database(db_helper)
+
+    # Mode pool : WAL, synchronous=NORMAL, une connexion par thread
+    db_helper = temp_database("bench_pool_")
+    db_helper.close()
+    pooled = DatabaseHelper(db_helper.db_path, pool_size=threads)
+    try:
+        _seed_chat(pooled, conversations, 100_000, rng)
+        print_result("DatabaseHelper(pool_size, WAL)",
+                     _run_mixed_workload(pooled.acquire, threads, seconds, write_ratio,
+                                         conversations, seed))
+    finally:
+        remove_database(pooled)
+
+
+# =============================================
+# HISTORIQUE DE CHAT (CURSEUR VS OFFSET)
+# =============================================
+
+def bench_history(messages: int, page_size: int, pages: int, seed: int):
+    """Compare la pagination OFFSET et la pagination par curseur de get_messages"""
+    rng = random.Random(seed)
+    db_helper = temp_database("bench_history_")
+    conn = db_helper.connect()
+    try:
+        print(f"📥 Insertion de {messages} messages dans une conversation...")
+        start = time.perf_counter()
+        conn.execute("INSERT INTO conversations (id, title, created_by) VALUES (1, 'Groupe', 1)")
+        batch = []
+        for i in range(1, messages + 1):
+            reply_to = rng.randint(1, i - 1) if i > 1 and rng.random() < 0.1 else None
+            sent_at = f"2025-{1 + i * 12 // (messages + 1):02d}-01 00:00:{i % 60:02d}"
+            batch.append((i, 1, rng.randint(1, 50), f"Message {i}", sent_at, reply_to))
+            if len(batch) >= 50000:
+                conn.executemany('''
+                    INSERT INTO messages (id, conversation_id, sender_id, content, sent_at,
+                                          reply_to_message_id)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', batch)
+                batch.clear()
+        conn.executemany('''
+            INSERT INTO messages (id, conversation_id, sender_id, content, sent_at,
+                                  reply_to_message_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', batch)
+        conn.executemany('''
+            INSERT OR IGNORE INTO message_reactions (message_id, user_id, reaction_type)
+            VALUES (?, ?, ?)
+        ''', [(rng.randint(1, messages), rng.randint(1, 50), rng.choice(["👍", "❤️", "😮"]))
+              for _ in range(messages // 5)])
+        conn.commit()
+        conn.execute("ANALYZE")
+        print(f"   {time.perf_counter() - start:.1f} s")
+
+        def offset_page(offset: int):
+            rows = conn.execute('''
+                SELECT * FROM messages INDEXED BY idx_messages_history
+                WHERE conversation_id = 1
+                ORDER BY sent_at DESC, id DESC
+                LIMIT ? OFFSET ?
+            ''', (page_size, offset)).fetchall()
+            # Approche naïve : une requête de réactions par message
+            for row in rows:
+                conn.execute("SELECT * FROM message_reactions WHERE message_id = ?",
+                             (row["id"],)).fetchall()
+            return rows
+
+        # Curseurs de chaque page, pour mesurer une page à une profondeur donnée
+        cursors = [None]
+        page = db_helper.get_messages(1, limit=page_size)
+        while page["next_cursor"] is not None:
+            cursors.append(page["next_cursor"])
+            page = db_helper.get_messages(1, before=page["next_cursor"], limit=page_size)
+
+        print(f"📄 Pages de {page_size} messages ({len(cursors)} pages au total)")
+        for depth in (0.0, 0.5, 0.99):
+            index = min(len(cursors) - 1, int(depth * len(cursors)))
+            print(f"  Page {index}:")
+            print_stats("OFFSET + réactions par message",
+                        measure(lambda: offset_page(index * page_size), pages))
+            print_stats("get_messages (curseur)",
+                        measure(lambda: db_helper.get_messages(1, before=cursors[index],
+                                                               limit=page_size), pages))
+    finally:
+        remove_database(db_helper)
+
+
+# =============================================
+# BOÎTE DE RÉCEPTION (COMPTEURS DÉNORMALISÉS)
+# =============================================
+
+def bench_inbox(users: int, conversations: int, messages: int, queries: int, seed: int):
+    """Compare le comptage à la volée des non-lus et get_inbox"""
+    rng = random.Random(seed)
+    db_helper = temp_database("bench_inbox_")
+    conn = db_helper.connect()
+    try:
+        print(f"📥 {conversations} conversations, {messages} messages, {users} utilisateurs...")
+        start = time.perf_counter()
+        conn.executemany("INSERT INTO conversations (id, title, created_by) VALUES (?, ?, 1)",
+                         [(i, f"Conversation {i}") for i in range(1, conversations + 1)])
+        participants = set()
+        for conversation_id in range(1, conversations + 1):
+            for _ in range(rng.randint(2, 6)):
+                participants.add((conversation_id, rng.randint(1, users)))
+        conn.executemany('''
+            INSERT INTO conversation_participants (conversation_id, user_id, last_read_at)
+            VALUES (?, ?, '2025-06-01 00:00:00')
+        ''', sorted(participants))
+        members: Dict[int, List[int]] = {}
+        for conversation_id, user_id in participants:
+            members.setdefault(conversation_id, []).append(user_id)
+        batch = []
+        for i in range(messages):
+            conversation_id = rng.randint(1, conversations)
+            sent_at = f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 10:00:00"
+            batch.append((conversation_id, rng.choice(members[conversation_id]), "Bonjour", sent_at))
+            if len(batch) >= 50000:
+                conn.executemany('''
+                    INSERT INTO messages (conversation_id, sender_id, content, sent_at)
+                    VALUES (?, ?, ?, ?)
+                ''', batch)
+                batch.clear()
+        conn.executemany('''
+            INSERT INTO messages (conversation_id, sender_id, content, sent_at)
+            VALUES (?, ?, ?, ?)
+        ''', batch)
+        conn.commit()
+        conn.execute("ANALYZE")
+        print(f"   {time.perf_counter() - start:.1f} s (triggers de compteurs inclus)")
+
+        user_ids = [user_id for _, user_id in participants]
+
+        def adhoc_inbox():
+            user_id = rng.choice(user_ids)
+            return conn.execute('''
+                SELECT c.id, c.title, MAX(m.sent_at) AS last_message_at,
+                       SUM(CASE WHEN m.sender_id != cp.user_id
+                                 AND (cp.last_read_at IS NULL OR m.sent_at > cp.last_read_at)
+                                THEN 1 ELSE 0 END) AS unread_count,
+                       (SELECT COUNT(*) FROM conversation_participants p
+                        WHERE p.conversation_id = c.id AND p.is_active = 1) AS participants_count
+                FROM conversation_participants cp
+                JOIN conversations c ON c.id = cp.conversation_id
+                LEFT JOIN messages m ON m.conversation_id = c.id
+                WHERE cp.user_id = ? AND cp.is_active = 1
+                GROUP BY c.id
+                ORDER BY last_message_at DESC
+            ''', (user_id,)).fetchall()
+
+        def precomputed_inbox():
+            return db_helper.get_inbox(rng.choice(user_ids))
+
+        print_stats("Jointure + COUNT à la volée", measure(adhoc_inbox, queries))
+        print_stats("get_inbox (compteurs)", measure(precomputed_inbox, queries))
+
+        start = time.perf_counter()
+        mismatches = db_helper.check_conversation_counters()
+        print(f"🔍 Vérification des compteurs: {sum(len(v) for v in mismatches.values())} écart(s) "
+              f"en {time.perf_counter() - start:.1f} s")
+    finally:
+        remove_database(db_helper)
+
+
+# =============================================
+# RECHERCHE PLEIN TEXTE (FTS5 VS LIKE)
+# =============================================
+
+def bench_search(documents: int, queries: int, seed: int):
+    """Compare LIKE '%terme%' et la recherche FTS5 classée de search()"""
+    rng = random.Random(seed)
+    db_helper = temp_database("bench_search_")
+    conn = db_helper.connect()
+    try:
+        print(f"📥 Indexation de {documents} documents...")
+        start = time.perf_counter()
+        vocabulary = Vocabulary(rng)
+        share = documents // 5
+        conn.executemany('''
+            INSERT INTO educational_content (category_id, title, content, tags)
+            VALUES (?, ?, ?, ?)
+        ''', ((rng.randint(1, 5), vocabulary.text(rng, 6), vocabulary.text(rng, 120),
+               ", ".join(vocabulary.text(rng, 3).split())) for _ in range(2 * share)))
+        conn.executemany('''
+            INSERT INTO parenting_advice (author_id, title, content, category, tags)
+            VALUES (?, ?, ?, 'general', ?)
+        ''', ((rng.randint(1, 1000), vocabulary.text(rng, 6), vocabulary.text(rng, 80),
+               ", ".join(vocabulary.text(rng, 3).split())) for _ in range(2 * share)))
+        conn.executemany('''
+            INSERT INTO community_alerts (user_id, title, description, alert_type,
+                                          latitude, longitude)
+            VALUES (?, ?, ?, 'other', 48.85, 2.35)
+        ''', ((rng.randint(1, 1000), vocabulary.text(rng, 5), vocabulary.text(rng, 40))
+              for _ in range(documents - 4 * share)))
+        conn.commit()
+        print(f"   {time.perf_counter() - start:.1f} s")
+
+        # Requêtes de un ou deux mots de fréquence moyenne
+        terms = [" ".join(vocabulary.word(rng, 200, 5000) for _ in range(rng.randint(1, 2)))
+                 for _ in range(queries)]
+
+        def like_query():
+            words = rng.choice(terms).split()
+            results = []
+            for table, column in (("educational_content", "content"),
+                                  ("parenting_advice", "content"),
+                                  ("community_alerts", "description")):
+                clauses = " AND ".join(f"{column} LIKE ?" for _ in words)
+                results.extend(conn.execute(
+                    f"SELECT id, title FROM {table} WHERE {clauses} LIMIT 20",
+                    [f"%{word}%" for word in words]).fetchall())
+            return results[:20]
+
+        def fts_query():
+            return db_helper.search(rng.choice(terms), limit=20)
+
+        print_stats("LIKE '%terme%' (3 tables)", measure(like_query, queries))
+        print_stats("search() FTS5 + bm25 + snippet", measure(fts_query, queries))
+    finally:
+        remove_database(db_helper)
+
+
+# =============================================
+# CHARGEMENT EN MASSE
+# =============================================
+
+def bench_ingest(rows: int, naive_rows: int, batch_size: int, seed: int):
+    """Compare des insertions ligne à ligne (autocommit) et bulk_load"""
+    rng = random.Random(seed)
+
+    def notifications(count: int):
+        for i in range(count):
+            yield {
+                "user_id": rng.randint(1, 100_000),
+                "title": "Nouvelle alerte",
+                "message": f"Alerte communautaire {i}",
+                "type": rng.choice(["alert", "message", "connection"]),
+                "data": {"alert_id": i},
+                "is_read": rng.random() < 0.6,
+                "created_at": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 08:00:00",
+            }
+
+    def print_result(label: str, stats: Dict[str, float]):
+        print(f"  {label:<40} {stats['rows_per_sec']:10.0f} lignes/s "
+              f"({stats['rows']} lignes en {stats['seconds']:.1f} s)")
+
+    print(f"📥 notifications : {rows} lignes, lots de {batch_size}")
+
+    # Référence : une transaction par ligne, index en place
+    db_helper = temp_database("bench_ingest_naive_")
+    try:
+        conn = db_helper.connect()
+        start = time.perf_counter()
+        for record in notifications(naive_rows):
+            conn.execute('''
+                INSERT INTO notifications (user_id, title, message, type, data, is_read, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (record["user_id"], record["title"], record["message"], record["type"],
+                  json.dumps(record["data"]), record["is_read"], record["created_at"]))
+            conn.commit()
+        seconds = time.perf_counter() - start
+        print_result("INSERT + commit par ligne", {
+            "rows": naive_rows, "seconds": seconds, "rows_per_sec": naive_rows / seconds})
+    finally:
+        remove_database(db_helper)
+
+    for label, drop_indexes in (("bulk_load (index en place)", False),
+                                ("bulk_load (index reconstruits)", True)):
+        db_helper = temp_database("bench_ingest_bulk_")
+        try:
+            print_result(label, db_helper.bulk_load("notifications", notifications(rows),
+                                                    batch_size=batch_size,
+                                                    drop_indexes=drop_indexes))
+        finally:
+            remove_database(db_helper)
+
+
+# =============================================
+# DÉMARRAGE (MIGRATIONS)
+# =============================================
+
+def bench_startup(rows: int, repeat: int, seed: int):
+    """Démarrage : DDL sur une base à jour, création d'une base, démarrage à froid des processus"""
+    rng = random.Random(seed)
+    db_helper = temp_database("bench_startup_")
+    scratch = tempfile.mkdtemp(prefix="bench_startup_new_")
+    try:
+        vocabulary = Vocabulary(rng)
+        db_helper.bulk_load("educational_content", (
+            {"category_id": rng.randint(1, 5), "title": vocabulary.text(rng, 5),
+             "content": vocabulary.text(rng, 60)} for _ in range(rows)))
+        db_helper.bulk_load("community_alerts", (
+            {"user_id": 1, "title": "Alerte", "description": vocabulary.text(rng, 20),
+             "alert_type": "other", "latitude": lat, "longitude": lon}
+            for lat, lon in (random_point_near(rng) for _ in range(rows))))
+        db_helper.close()
+        print(f"📦 Base à jour (version {DatabaseHelper.SCHEMA_VERSION}), "
+              f"{os.path.getsize(db_helper.db_path) / 1e6:.1f} Mo")
+
+        def full_ddl():
+            # Comportement précédent : toutes les instructions DDL à chaque démarrage
+            helper = DatabaseHelper(db_helper.db_path)
+            conn = helper.connect()
+            with contextlib.redirect_stdout(io.StringIO()):
+                conn.execute("BEGIN IMMEDIATE")
+                for _, _, method, _ in DatabaseHelper.MIGRATIONS:
+                    if method != "_migration_json_columns":
+                        getattr(helper, method)(conn.cursor())
+                conn.commit()
+            helper.close()
+
+        def fast_path():
+            # Avec une première requête : le chargement du schéma par SQLite est
+            # payé par la vérification d'empreinte ou, sinon, par cette requête
+            helper = DatabaseHelper(db_helper.db_path)
+            with contextlib.redirect_stdout(io.StringIO()):
+                helper.create_tables()
+            helper.connect().execute("SELECT COUNT(*) FROM users").fetchone()
+            helper.close()
+
+        print_stats("DDL complète (IF NOT EXISTS)", measure(full_ddl, repeat))
+        print_stats("create_tables + 1re requête", measure(fast_path, repeat))
+
+        counter = itertools.count()
+
+        def new_database(lazy: bool):
+            def create():
+                helper = DatabaseHelper(os.path.join(scratch, f"new_{next(counter)}.db"),
+                                        lazy_schema=lazy)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    helper.create_tables()
+                helper.close()
+            return create
+
+        print(f"🆕 Création d'une base neuve ({repeat} fois)")
+        print_stats("Schéma complet", measure(new_database(False), repeat))
+        print_stats("Groupes différés (lazy)", measure(new_database(True), repeat))
+
+        # Démarrage à froid : un processus Python par lancement, comme un worker court
+        here = os.path.dirname(os.path.abspath(__file__))
+        runs = max(5, repeat // 5)
+
+        def process(*args: str, fresh: bool = False):
+            def run():
+                if fresh:
+                    shutil.rmtree(os.path.join(scratch, "data"), ignore_errors=True)
+                subprocess.run([sys.executable, *args], cwd=scratch, check=True,
+                               stdout=subprocess.DEVNULL)
+            return run
+
+        setting = os.path.join(here, "db_setting.py")
+        cli = os.path.join(here, "db_cli.py")
+        # Bytecode à jour comme après un déploiement (PYTHONDONTWRITEBYTECODE l'empêcherait)
+        py_compile.compile(setting)
+        existing = ("--db", db_helper.db_path)
+        print(f"🧊 Démarrage à froid ({runs} processus)")
+        print_stats("Interpréteur seul", measure(process("-c", "pass"), runs))
+        print_stats("db_setting.py init (base à jour)", measure(process(setting, *existing), runs))
+        print_stats("db_cli.py init (base à jour)", measure(process(cli, *existing), runs))
+        print_stats("db_setting.py init (base neuve)", measure(process(setting, fresh=True), runs))
+        print_stats("db_cli.py init (base neuve)", measure(process(cli, fresh=True), runs))
+        print_stats("db_cli.py init --lazy (neuve)",
+                    measure(process(cli, "init", "--lazy", fresh=True), runs))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+        remove_database(db_helper)
+
+
+# =============================================
+# ARCHIVAGE (TABLES CHAUDES AVANT / APRÈS)
+# =============================================
+
+def bench_archive(rows: int, users: int, keep_days: int, queries: int, seed: int):
+    """Latence des requêtes sur notifications avant et après archivage"""
+    rng = random.Random(seed)
+    db_helper = temp_database("bench_archive_")
+    db_helper.archive_dir = db_helper.db_path + "_archives"
+    conn = db_helper.connect()
+    try:
+        print(f"📥 {rows} notifications sur 24 mois...")
+        db_helper.bulk_load("notifications", (
+            {"user_id": rng.randint(1, users), "title": "Alerte à proximité",
+             "message": "Une alerte a été signalée près de chez vous",
+             "type": rng.choice(["alert", "message", "connection"]),
+             "is_read": rng.random() < 0.8,
+             "created_at": f"{rng.choice([2024, 2025])}-{rng.randint(1, 12):02d}-"
+                           f"{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00:00"}
+            for _ in range(rows)), batch_size=50_000)
+        conn.execute("ANALYZE")
+
+        def feed():
+            return db_helper.get_notifications(rng.randint(1, users), limit=50)
+
+        def unread_count():
+            return conn.execute("SELECT COUNT(*) FROM notifications WHERE user_id = ? AND is_read = 0",
+                                (rng.randint(1, users),)).fetchone()
+
+        def type_scan():
+            return conn.execute("SELECT type, COUNT(*) FROM notifications GROUP BY type").fetchall()
+
+        def run(label: str):
+            size = conn.execute("SELECT COUNT(*) FROM notifications").fetchone()[0]
+            print(f"  {label} ({size} lignes chaudes, "
+                  f"{os.path.getsize(db_helper.db_path) / 1e6:.0f} Mo)")
+            print_stats("fil de notifications (50)", measure(feed, queries))
+            print_stats("compteur de non-lues", measure(unread_count, queries))
+            print_stats("agrégat sur toute la table", measure(type_scan, max(5, queries // 20)))
+
+        run("Avant archivage")
+        stats = db_helper.archive_old_rows(older_than_days=keep_days, vacuum_pages=0,
+                                           now=datetime(2025, 12, 31))
+        archived = sum(stats["rows"].values())
+        print(f"📦 {archived} lignes archivées en {stats['seconds']:.1f} s "
+              f"({archived / stats['seconds']:.0f} lignes/s), {len(stats['months'])} mois, "
+              f"{stats['freed_pages']} pages libérées")
+        conn.execute("ANALYZE")
+        run("Après archivage")
+        print_stats("fil avec archives (50)",
+                    measure(lambda: db_helper.get_notifications(rng.randint(1, users), limit=50,
+                                                                include_archived=True),
+                            max(5, queries // 10)))
+    finally:
+        remove_database(db_helper)
+        shutil.rmtree(db_helper.archive_dir, ignore_errors=True)
+
+
+# =============================================
+# DIFFUSION DES ALERTES
+# =============================================
+
+def bench_fanout(users: int, nearby: int, alerts: int, workers: int, seed: int):
+    """Compare la boucle par utilisateur à la diffusion ensembliste et au pool de workers"""
+    rng = random.Random(seed)
+    db_helper = temp_database("bench_fanout_")
+    center_lat, center_lon = 48.8566, 2.3522
+    try:
+        print(f"📥 Insertion de {users} utilisateurs dont {nearby} autour de Paris...")
+
+        def user_rows():
+            for user_id in range(1, users + 1):
+                if user_id <= nearby:
+                    lat = center_lat + rng.gauss(0, 0.012)
+                    lon = center_lon + rng.gauss(0, 0.018)
+                else:
+                    lat, lon = random_point_near(rng, background=0.5)
+                sharing = "true" if rng.random() < 0.6 else "false"
+                yield (user_id, f"Parent {user_id}", f"parent{user_id}@example.org", "2025-01-01",
+                       lat, lon, f"token-{user_id}" if rng.random() < 0.7 else None,
+                       f'{{"profile_visible": true, "location_sharing": {sharing}}}')
+        db_helper.bulk_load("users", user_rows(), batch_size=50_000,
+                            columns=["id", "name", "email", "join_date", "latitude", "longitude",
+                                     "notification_token", "privacy_settings"])
+        conn = db_helper.connect()
+        conn.execute("ANALYZE")
+        radius = db_helper.FANOUT_RADIUS_M["high"]
+
+        def create_alert(title: str) -> int:
+            alert_id = conn.execute('''
+                INSERT INTO community_alerts (user_id, title, description, alert_type, severity,
+                                              latitude, longitude)
+                VALUES (?, ?, 'Description', 'lost_child', 'high', ?, ?)
+            ''', (users, title, center_lat + rng.gauss(0, 0.002),
+                  center_lon + rng.gauss(0, 0.002))).lastrowid
+            conn.commit()
+            return alert_id
+
+        # Boucle naïve : voisins en Python puis une insertion par destinataire
+        alert_id = create_alert("Alerte naïve")
+        alert = conn.execute("SELECT * FROM community_alerts WHERE id = ?", (alert_id,)).fetchone()
+        start = time.perf_counter()
+        created = 0
+        for user in db_helper.find_users_near(alert["latitude"], alert["longitude"], radius):
+            privacy = json.loads(user["privacy_settings"] or "{}")
+            if user["id"] == alert["user_id"] or not user["notification_token"] \
+                    or not privacy.get("location_sharing"):
+                continue
+            conn.execute('''
+                INSERT INTO notifications (user_id, title, message, type, data, priority)
+                VALUES (?, ?, ?, 'alert', ?, 'high')
+            ''', (user["id"], "⚠️ Alerte à proximité", alert["title"],
+                  json.dumps({"alert_id": alert_id, "distance_m": round(user["distance_m"])})))
+            created += 1
+        conn.execute("UPDATE alert_fanout SET status = 'done' WHERE alert_id = ?", (alert_id,))
+        conn.commit()
+        naive = time.perf_counter() - start
+        print(f"🔔 Rayon {radius:.0f} m, {created} destinataires par alerte")
+        print(f"  {'Boucle par utilisateur':<32} {naive * 1000:9.1f} ms  "
+              f"({created / naive:9.0f} notifications/s)")
+
+        for batch_size in (1000, 5000, 20000):
+            alert_id = create_alert(f"Alerte lots {batch_size}")
+            start = time.perf_counter()
+            created = db_helper.fan_out_alert(alert_id, batch_size=batch_size)
+            elapsed = time.perf_counter() - start
+            print(f"  {f'Ensembliste (lots de {batch_size})':<32} {elapsed * 1000:9.1f} ms  "
+                  f"({created / elapsed:9.0f} notifications/s)")
+
+        # Pool de workers : file de plusieurs alertes simultanées
+        for count in sorted({1, workers}):
+            for index in range(alerts):
+                create_alert(f"Alerte file {count}-{index}")
+            before = conn.execute("SELECT COUNT(*) FROM notifications").fetchone()[0]
+            start = time.perf_counter()
+            with AlertFanoutWorkers(db_helper.db_path, workers=count, poll_interval=0.01) as pool:
+                while pool.pending():
+                    time.sleep(0.01)
+            elapsed = time.perf_counter() - start
+            created = conn.execute("SELECT COUNT(*) FROM notifications").fetchone()[0] - before
+            print(f"  {f'{count} worker(s), {alerts} alertes':<32} {elapsed * 1000:9.1f} ms  "
+                  f"({created / elapsed:9.0f} notifications/s)")
+        duplicates = conn.execute('''
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM notifications
+                GROUP BY user_id, data_alert_id HAVING COUNT(*) > 1
+            )
+        ''').fetchone()[0]
+        print(f"  Doublons (utilisateur, alerte): {duplicates}")
+    finally:
+        remove_database(db_helper)
+
+
+# =============================================
+# GRAPHE DES CONNEXIONS ENTRE PARENTS
+# =============================================
+
+def bench_graph(users: int, links: int, queries: int, changes: int, seed: int):
+    """Compare les requêtes de graphe en SQL (index d'origine, index d'adjacence) et en CSR"""
+    rng = random.Random(seed)
+    db_helper = temp_database("bench_graph_")
+    conn = db_helper.connect()
+    try:
+        print(f"📥 Insertion de {users} utilisateurs et ~{users * links} connexions...")
+        start = time.perf_counter()
+
+        def user_rows():
+            for user_id in range(1, users + 1):
+                lat, lon = random_point_near(rng, spread_deg=0.1, background=0.1)
+                yield (user_id, f"Parent {user_id}", f"parent{user_id}@example.org",
+                       "2025-01-01", lat, lon)
+        db_helper.bulk_load("users", user_rows(), batch_size=50_000,
+                            columns=["id", "name", "email", "join_date", "latitude", "longitude"])
+
+        def connection_rows():
+            # Attachement préférentiel, comme db_generator
+            endpoints = list(range(1, links + 1))
+            for user_id in range(links + 1, users + 1):
+                targets = set()
+                while len(targets) < links:
+                    targets.add(endpoints[rng.randrange(len(endpoints))])
+                for target in targets:
+                    endpoints.extend((target, user_id))
+                    status = "accepted" if rng.random() < 0.85 else "pending"
+                    pair = (target, user_id) if rng.random() < 0.5 else (user_id, target)
+                    yield (*pair, status, "2025-01-01", round(rng.uniform(0.5, 5.0), 2))
+        db_helper.bulk_load("parent_connections", connection_rows(), batch_size=50_000,
+                            columns=["user1_id", "user2_id", "status", "connection_date",
+                                     "trust_score"], drop_indexes=True)
+        conn.execute("DELETE FROM connection_changes")
+        conn.commit()
+        edges = conn.execute(
+            "SELECT COUNT(*) FROM parent_connections WHERE status = 'accepted'").fetchone()[0]
+        print(f"   {edges} connexions acceptées, {time.perf_counter() - start:.1f} s")
+
+        conn.create_function("haversine_m", 4, haversine_m, deterministic=True)
+        sample = [rng.randint(1, users) for _ in range(queries)]
+        pairs = [(rng.randint(1, users), rng.randint(1, users)) for _ in range(queries)]
+        position = itertools.count()
+
+        def next_user() -> int:
+            return sample[next(position) % len(sample)]
+
+        def next_pair():
+            return pairs[next(position) % len(pairs)]
+
+        def suggest_sql(adjacency: str, second: str):
+            # Amis d'amis classés par confiance et proximité (auto-jointures)
+            sql = f'''
+                WITH direct(user_id, trust) AS (
+                    SELECT user_id, trust_score FROM ({adjacency.format(user="?1")})
+                ),
+                second(user_id, score) AS ({second})
+                SELECT s.user_id, SUM(s.score) / 25.0
+                       * (10000.0 / (10000.0 + haversine_m(me.latitude, me.longitude,
+                                                           u.latitude, u.longitude))) AS score
+                FROM second s JOIN users u ON u.id = s.user_id, users me
+                WHERE me.id = ?1 AND s.user_id != ?1
+                  AND s.user_id NOT IN (SELECT user_id FROM direct)
+                GROUP BY s.user_id ORDER BY score DESC LIMIT 10
+            '''
+            return lambda: conn.execute(sql, (next_user(),)).fetchall()
+
+        # Index d'origine : (user1_id, user2_id) seulement
+        legacy = '''
+            SELECT CASE WHEN user1_id = {user} THEN user2_id ELSE user1_id END AS user_id,
+                   trust_score
+            FROM parent_connections
+            WHERE (user1_id = {user} OR user2_id = {user}) AND status = 'accepted'
+        '''
+        adjacency = db_helper.ADJACENCY_SQL.replace(":user_id", "{user}")
+        for index_name, _ in db_helper._table_indexes("parent_connections"):
+            conn.execute(f"DROP INDEX IF EXISTS {index_name}")
+        conn.execute("CREATE INDEX idx_connections_users ON parent_connections(user1_id, user2_id)")
+        conn.execute("ANALYZE")
+        conn.commit()
+        slow = max(3, queries // 50)
+        print(f"🐢 Index d'origine ({slow} requêtes)")
+        print_stats("Voisins (OR)", measure(
+            lambda: conn.execute(legacy.format(user="?1"), (next_user(),)).fetchall(), slow))
+        print_stats("Connexions communes", measure(lambda: conn.execute(
+            f"SELECT user_id FROM ({legacy.format(user='?1')}) "
+            f"INTERSECT SELECT user_id FROM ({legacy.format(user='?2')})",
+            next_pair()).fetchall(), slow))
+        print_stats("Suggestions (top 10)", measure(suggest_sql(legacy, '''
+            SELECT CASE WHEN pc.user1_id = d.user_id THEN pc.user2_id ELSE pc.user1_id END,
+                   d.trust * pc.trust_score
+            FROM direct d JOIN parent_connections pc
+                ON (pc.user1_id = d.user_id OR pc.user2_id = d.user_id) AND pc.status = 'accepted'
+        '''), slow))
+
+        conn.execute("DROP INDEX idx_connections_users")
+        db_helper._create_indexes(conn.cursor())
+        conn.execute("ANALYZE")
+        conn.commit()
+        print(f"📇 Index d'adjacence ({queries} requêtes)")
+        print_stats("Voisins (get_connections)", measure(
+            lambda: db_helper.get_connections(next_user()), queries))
+        print_stats("Connexions communes", measure(
+            lambda: db_helper.get_mutual_connections(*next_pair()), queries))
+        print_stats("Suggestions (top 10)", measure(suggest_sql(adjacency, '''
+            SELECT pc.user2_id, d.trust * pc.trust_score
+            FROM direct d JOIN parent_connections pc
+                ON pc.user1_id = d.user_id AND pc.status = 'accepted'
+            UNION ALL
+            SELECT pc.user1_id, d.trust * pc.trust_score
+            FROM direct d JOIN parent_connections pc
+                ON pc.user2_id = d.user_id AND pc.status = 'accepted'
+        '''), queries))
+
+        start = time.perf_counter()
+        graph = ConnectionGraph(db_helper).load()
+        load_seconds = time.perf_counter() - start
+        size_mb = sum(len(values) * values.itemsize for values in (
+            graph._offsets, graph._targets, graph._trust,
+            graph._latitudes, graph._longitudes)) / 1e6
+        print(f"🕸️  Instantané CSR : chargement {load_seconds:.2f} s, {size_mb:.0f} Mo")
+        print_stats("Voisins (neighbors)", measure(lambda: graph.neighbors(next_user()), queries))
+        print_stats("Connexions communes", measure(
+            lambda: graph.mutual_connections(*next_pair()), queries))
+        print_stats("Suggestions (top 10)", measure(
+            lambda: graph.suggest_connections(next_user(), 10), queries))
+
+        # Mise à jour incrémentale : acceptations et retraits journalisés
+        rows = conn.execute('''
+            SELECT id FROM parent_connections WHERE status = 'pending' LIMIT ?
+        ''', (changes // 2,)).fetchall()
+        conn.executemany("UPDATE parent_connections SET status = 'accepted' WHERE id = ?",
+                         [(row["id"],) for row in rows])
+        conn.execute('''
+            UPDATE parent_connections SET status = 'blocked'
+            WHERE id IN (SELECT id FROM parent_connections WHERE status = 'accepted' LIMIT ?)
+        ''', (changes - len(rows),))
+        conn.commit()
+        start = time.perf_counter()
+        applied = graph.refresh()
+        refresh_seconds = time.perf_counter() - start
+        print(f"🔄 refresh() : {applied} changements en {refresh_seconds * 1000:.1f} ms "
+              f"(rechargement complet : {load_seconds * 1000:.0f} ms)")
+        start = time.perf_counter()
+        graph.compact()
+        print(f"   compact() : {(time.perf_counter() - start) * 1000:.0f} ms")
+        check = sample[:20]
+        mismatches = sum(set(graph.neighbors(user_id)) !=
+                         {row["user_id"] for row in db_helper.get_connections(user_id)}
+                         for user_id in check)
+        print(f"   Voisinages différents de la base : {mismatches}/{len(check)}")
+    finally:
+        remove_database(db_helper)
+
+
+# =============================================
+# AGRÉGATS DES ÉVALUATIONS
+# =============================================
+
+def bench_ratings(ratings: int, users: int, contents: int, queries: int, seed: int):
+    """Compare les classements par note : GROUP BY sur ratings et agrégats maintenus par trigger"""
+    rng = random.Random(seed)
+    db_helper = temp_database("bench_ratings_")
+    conn = db_helper.connect()
+    try:
+        category_id = conn.execute("SELECT MIN(id) FROM education_categories").fetchone()[0]
+        db_helper.bulk_load("users", ((user_id, f"Parent {user_id}", f"parent{user_id}@example.org",
+                                       "2025-01-01") for user_id in range(1, users + 1)),
+                            batch_size=50_000, columns=["id", "name", "email", "join_date"])
+        db_helper.bulk_load("educational_content", ((content_id, category_id, f"Contenu {content_id}",
+                                                     "Texte") for content_id in range(1, contents + 1)),
+                            batch_size=50_000, columns=["id", "category_id", "title", "content"])
+
+        def rating_rows():
+            # Chaque parent note des contenus (70 %) et d'autres parents, sans doublon
+            per_user = max(1, ratings // users)
+            for user_id in range(1, users + 1):
+                content_count = round(per_user * 0.7)
+                for content_id in rng.sample(range(1, contents + 1), min(content_count, contents)):
+                    yield (user_id, content_id, "content",
+                           float(rng.choices((1, 2, 3, 4, 5), (5, 5, 15, 35, 40))[0]))
+                for other_id in rng.sample(range(1, users + 1), min(per_user - content_count, users)):
+                    yield (user_id, other_id, "user", float(rng.randint(2, 5)))
+
+        print(f"📥 Insertion de ~{ratings} notes (agrégats recalculés à la fin)...")
+        stats = db_helper.bulk_load("ratings", rating_rows(), batch_size=50_000,
+                                    columns=["user_id", "target_id", "target_type", "rating"],
+                                    drop_indexes=True, defer_aggregates=True)
+        conn.execute("ANALYZE")
+        conn.commit()
+        print(f"   {stats['rows']} notes, {stats['seconds']:.1f} s "
+              f"({stats['rows_per_sec']:.0f} lignes/s)")
+
+        min_count = 5
+        top_sql = '''
+            SELECT target_id, COUNT(*) AS rating_count, ROUND(AVG(rating), 2) AS average
+            FROM ratings WHERE target_type = 'content'
+            GROUP BY target_id HAVING COUNT(*) >= ?
+            ORDER BY AVG(rating) DESC, rating_count DESC, target_id LIMIT 10
+        '''
+        sample = [rng.randint(1, contents) for _ in range(queries)]
+        position = itertools.count()
+
+        def next_content() -> int:
+            return sample[next(position) % len(sample)]
+
+        def summary_sql():
+            return conn.execute('''
+                SELECT COUNT(*), AVG(rating) FROM ratings
+                WHERE target_type = 'content' AND target_id = ?
+            ''', (next_content(),)).fetchone()
+
+        # Sans index : seule la contrainte UNIQUE(user_id, ...) existe
+        conn.execute("DROP INDEX idx_ratings_target")
+        slow = max(3, queries // 100)
+        print(f"🐢 Sans index sur la cible ({slow} requêtes)")
+        expected = [tuple(row) for row in conn.execute(top_sql, (min_count,))]
+        print_stats("Top 10 contenus (GROUP BY)", measure(
+            lambda: conn.execute(top_sql, (min_count,)).fetchall(), slow))
+        print_stats("Moyenne d'un contenu", measure(summary_sql, slow))
+
+        db_helper._create_indexes(conn.cursor())
+        conn.execute("ANALYZE")
+        conn.commit()
+        print(f"📇 Index couvrant idx_ratings_target ({slow} / {queries} requêtes)")
+        print_stats("Top 10 contenus (GROUP BY)", measure(
+            lambda: conn.execute(top_sql, (min_count,)).fetchall(), slow))
+        print_stats("Moyenne d'un contenu", measure(summary_sql, queries))
+
+        print(f"📊 rating_aggregates ({queries} requêtes)")
+        actual = [(row["target_id"], row["rating_count"], row["average"])
+                  for row in db_helper.get_top_rated("content", 10, min_count)]
+        print_stats("Top 10 contenus (get_top_rated)", measure(
+            lambda: db_helper.get_top_rated("content", 10, min_count), queries))
+        print_stats("Top 10 parents (get_top_rated)", measure(
+            lambda: db_helper.get_top_rated("user", 10, min_count), queries))
+        print_stats("Moyenne d'un contenu (summary)", measure(
+            lambda: db_helper.get_rating_summary("content", next_content()), queries))
+        print(f"   Classement identique au GROUP BY : {'oui' if actual == expected else 'NON'}")
+
+        # Écriture : une note et ses agrégats, dans une transaction
+        raters = itertools.count(users + 1)
+        conn.executemany(
+            "INSERT INTO users (id, name, email, join_date) VALUES (?, 'Bench', ?, '2025-01-01')",
+            [(user_id, f"bench{user_id}@example.org")
+             for user_id in range(users + 1, users + queries + 1)])
+        conn.commit()
+        print_stats("rate() (note + agrégats)", measure(
+            lambda: db_helper.rate(next(raters), "content", next_content(), 4.0), queries))
+
+        start = time.perf_counter()
+        repaired = db_helper.recompute_rating_aggregates()
+        print(f"🔧 recompute_rating_aggregates : {time.perf_counter() - start:.1f} s, "
+              f"{repaired['aggregates']} agrégats et {repaired['columns']} colonnes corrigés")
+    finally:
+        remove_database(db_helper)
+
+
+# =============================================
+# AGRÉGATS DE PROGRESSION
+# =============================================
+
+def _seed_progress(db_helper: DatabaseHelper, rows: int, users: int, contents: int,
+                   rng: random.Random) -> List[int]:
+    """Insère parents, contenus et lignes de progression ; retourne les catégories"""
+    conn = db_helper.connect()
+    categories = [row[0] for row in conn.execute("SELECT id FROM education_categories")]
+    db_helper.bulk_load("users", ((user_id, f"Parent {user_id}", f"parent{user_id}@example.org",
+                                   "2025-01-01") for user_id in range(1, users + 1)),
+                        batch_size=50_000, columns=["id", "name", "email", "join_date"])
+    db_helper.bulk_load("educational_content", (
+        (content_id, rng.choice(categories), f"Contenu {content_id}", "Texte")
+        for content_id in range(1, contents + 1)),
+        batch_size=50_000, columns=["id", "category_id", "title", "content"])
+
+    start_day = datetime(2025, 1, 1)
+    days = [(start_day + timedelta(days=offset)).strftime("%Y-%m-%d %H:%M:%S")
+            for offset in range(365)]
+
+    def progress_rows():
+        per_user = max(1, rows // users)
+        for user_id in range(1, users + 1):
+            for content_id in rng.sample(range(1, contents + 1), min(per_user, contents)):
+                status = rng.choices(("completed", "in_progress", "not_started"), (50, 35, 15))[0]
+                day = rng.randrange(len(days) - 7)
+                started = days[day] if status != "not_started" else None
+                yield (user_id, content_id, status,
+                       rng.randint(25, 50) if status == "completed" else 0,
+                       rng.randint(60, 3600) if started else 0, started,
+                       days[day + rng.randint(0, 7)] if status == "completed" else None,
+                       days[day], rng.randint(1, 3) if started else 0)
+
+    print(f"📥 Insertion de ~{rows} lignes de progression (agrégats recalculés à la fin)...")
+    stats = db_helper.bulk_load("user_progress", progress_rows(), batch_size=50_000,
+                                columns=["user_id", "content_id", "progress_status", "score",
+                                         "time_spent", "started_at", "completed_at",
+                                         "last_accessed", "attempts_count"],
+                                drop_indexes=True, defer_aggregates=True)
+    conn.execute("ANALYZE")
+    conn.commit()
+    rollup_rows = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                   for table in ("progress_user_category", "progress_content_daily")}
+    print(f"   {stats['rows']} lignes, {stats['seconds']:.1f} s "
+          f"({stats['rows_per_sec']:.0f} lignes/s) ; agrégats : "
+          + ", ".join(f"{table}={count}" for table, count in rollup_rows.items()))
+    return categories
+
+
+def bench_progress(rows: int, users: int, contents: int, queries: int, seed: int):
+    """Compare les tableaux de bord de progression : agrégation ad hoc et agrégats maintenus"""
+    rng = random.Random(seed)
+    db_helper = temp_database("bench_progress_")
+    conn = db_helper.connect()
+    analytics = ProgressAnalytics(db_helper)
+    try:
+        categories = _seed_progress(db_helper, rows, users, contents, rng)
+
+        sample_users = [rng.randint(1, users) for _ in range(queries)]
+        sample_contents = [rng.randint(1, contents) for _ in range(queries)]
+        position = itertools.count()
+
+        def next_user() -> int:
+            return sample_users[next(position) % queries]
+
+        def next_content() -> int:
+            return sample_contents[next(position) % queries]
+
+        def next_category() -> int:
+            return categories[next(position) % len(categories)]
+
+        measures = """COUNT(*) AS tracked, SUM(up.progress_status = 'in_progress') AS in_progress,
+                      SUM(up.progress_status = 'completed') AS completed,
+                      SUM(CASE WHEN up.progress_status = 'completed' THEN up.score ELSE 0 END)
+                          AS score_sum"""
+        category_sql = f'''
+            SELECT ec.category_id, {measures}
+            FROM user_progress up JOIN educational_content ec ON ec.id = up.content_id
+            GROUP BY ec.category_id ORDER BY ec.category_id
+        '''
+        cohort_sql = '''
+            SELECT CAST(julianday(date(COALESCE(up.started_at, up.last_accessed))) - 2440587.5
+                        AS INTEGER) / 7 * 7 AS cohort,
+                   ec.category_id, COUNT(*), SUM(up.progress_status = 'completed')
+            FROM user_progress up JOIN educational_content ec ON ec.id = up.content_id
+            GROUP BY cohort, ec.category_id
+        '''
+        leaderboard_sql = '''
+            SELECT up.user_id, u.name, SUM(up.score) AS total_score, COUNT(*) AS completed
+            FROM user_progress up
+            JOIN educational_content ec ON ec.id = up.content_id
+            JOIN users u ON u.id = up.user_id
+            WHERE up.progress_status = 'completed' AND ec.category_id = ?
+            GROUP BY up.user_id
+            ORDER BY total_score DESC, up.user_id
+            LIMIT 20
+        '''
+
+        slow = max(3, queries // 100)
+        print(f"🐢 Agrégation ad hoc sur user_progress ({slow} / {queries} requêtes)")
+        print_stats("Progression d'un parent", measure(lambda: conn.execute(f'''
+            SELECT ec.category_id, {measures}
+            FROM user_progress up JOIN educational_content ec ON ec.id = up.content_id
+            WHERE up.user_id = ? GROUP BY ec.category_id
+        ''', (next_user(),)).fetchall(), queries))
+        print_stats("Entonnoir d'un contenu", measure(lambda: conn.execute(f'''
+            SELECT {measures} FROM user_progress up WHERE up.content_id = ?
+        ''', (next_content(),)).fetchone(), queries))
+        print_stats("Progression par catégorie", measure(
+            lambda: conn.execute(category_sql).fetchall(), slow))
+        print_stats("Classement d'une catégorie", measure(
+            lambda: conn.execute(leaderboard_sql, (next_category(),)).fetchall(), slow))
+        print_stats("Cohortes hebdomadaires (SQL)", measure(
+            lambda: conn.execute(cohort_sql).fetchall(), slow))
+        expected_categories = [tuple(row) for row in conn.execute(category_sql)]
+        expected_board = [tuple(row) for row in conn.execute(leaderboard_sql, (categories[0],))]
+        expected_cohorts = {(row[0], row[1]): (row[2], row[3])
+                            for row in conn.execute(cohort_sql) if row[0] is not None}
+
+        print(f"📊 Agrégats de progression ({queries} requêtes)")
+        print_stats("Progression d'un parent", measure(
+            lambda: analytics.user_completion(next_user()), queries))
+        print_stats("Entonnoir d'un contenu", measure(
+            lambda: analytics.content_funnel(next_content()), queries))
+        print_stats("Progression par catégorie", measure(analytics.category_progress, slow))
+        print_stats("Classement d'une catégorie", measure(
+            lambda: db_helper.get_leaderboard(20, next_category()), queries))
+        actual_categories = [(row["category_id"], row["tracked"], row["in_progress"],
+                              row["completed"], row["score_sum"])
+                             for row in analytics.category_progress()]
+        actual_board = [tuple(row.values()) for row in db_helper.get_leaderboard(20, categories[0])]
+        print(f"   Résultats identiques à l'agrégation ad hoc : "
+              f"{'oui' if (actual_categories, actual_board) == (expected_categories, expected_board) else 'NON'}")
+
+        start = time.perf_counter()
+        columns = analytics.export_columns(["day", "category_id", "status"])
+        export_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        cohorts = analytics.cohort_completion(columns, period_days=7)
+        cohort_seconds = time.perf_counter() - start
+        backend = "array" if isinstance(columns["day"], array) else "NumPy"
+        print(f"🧮 Export en colonnes ({backend}) : {export_seconds:.1f} s pour "
+              f"{len(columns['day'])} lignes, cohortes calculées en {cohort_seconds * 1000:.0f} ms ; "
+              f"identiques au SQL : {'oui' if cohorts == expected_cohorts else 'NON'}")
+
+        ids = [row[0] for row in conn.execute(
+            "SELECT id FROM user_progress WHERE progress_status = 'in_progress' LIMIT ?", (queries,))]
+        updates = iter(ids)
+
+        def complete_one():
+            conn.execute("UPDATE user_progress SET progress_status = 'completed', score = 40, "
+                         "completed_at = CURRENT_TIMESTAMP WHERE id = ?", (next(updates),))
+            conn.commit()
+        print_stats("Progression terminée (triggers)", measure(complete_one, len(ids)))
+
+        start = time.perf_counter()
+        repaired = db_helper.recompute_progress_rollups()
+        print(f"🔧 recompute_progress_rollups : {time.perf_counter() - start:.1f} s, "
+              f"{sum(repaired.values())} lignes corrigées")
+    finally:
+        remove_database(db_helper)
+
+
+# =============================================
+# COLONNES JSON COMPACTES ET CLÉS INDEXÉES
+# =============================================
+
+def bench_json(users: int, notifications: int, interactions: int, queries: int, seed: int):
+    """Taille des colonnes JSON et filtres sur une clé : json_extract vs colonnes générées indexées"""
+    rng = random.Random(seed)
+    db_helper = temp_database("bench_json_")
+    conn = db_helper.connect()
+    try:
+        # Encodage historique (json.dumps par défaut, avec espaces), comme
+        # dans une base antérieure à la migration 10
+        db_helper.bulk_load("users", ((
+            user_id, f"Parent {user_id}", f"parent{user_id}@example.org", "2025-01-01",
+            int(rng.random() < 0.95),
+            json.dumps({"profile_visible": rng.random() < 0.9, "location_sharing": rng.random() < 0.6}),
+        ) for user_id in range(1, users + 1)), batch_size=50_000,
+            columns=["id", "name", "email", "join_date", "is_active", "privacy_settings"])
+
+        alerts = max(1, notifications // 200)
+
+        def notification_rows():
+            for _ in range(notifications):
+                kind = rng.choices(("alert", "message", "advice", "system"), (25, 40, 20, 15))[0]
+                data = {"alert": {"alert_id": rng.randint(1, alerts)},
+                        "message": {"conversation_id": rng.randint(1, users)},
+                        "advice": {"advice_id": rng.randint(1, 50_000)}}.get(kind)
+                yield (rng.randint(1, users), f"Notification {kind}", "Texte", kind,
+                       json.dumps(data) if data else None)
+
+        def interaction_rows():
+            start = datetime(2025, 1, 1)
+            for index in range(interactions):
+                view = rng.random() < 0.7
+                data = {"source": rng.choice(("feed", "search", "notification")),
+                        "duration": rng.randint(5, 600)} if view else None
+                yield (rng.randint(1, users), "view" if view else "like", rng.randint(1, 50_000),
+                       "content", json.dumps(data) if data else None,
+                       (start + timedelta(seconds=index * 30)).strftime("%Y-%m-%d %H:%M:%S"))
+
+        print(f"📥 Insertion de {users} parents, {notifications} notifications "
+              f"et {interactions} interactions (JSON avec espaces)...")
+        db_helper.bulk_load("notifications", notification_rows(), batch_size=50_000,
+                            columns=["user_id", "title", "message", "type", "data"], drop_indexes=True)
+        db_helper.bulk_load("user_interactions", interaction_rows(), batch_size=50_000,
+                            columns=["user_id", "interaction_type", "target_id", "target_type",
+                                     "interaction_data", "created_at"], drop_indexes=True)
+        conn.execute("ANALYZE")
+        conn.commit()
+
+        columns = [(table, column) for table, names in DatabaseHelper.JSON_COLUMNS.items()
+                   if table in ("users", "notifications", "user_interactions") for column in names]
+
+        def storage() -> Dict[str, int]:
+            sizes = {f"{table}.{column}": conn.execute(
+                f"SELECT COALESCE(SUM(length(CAST({column} AS BLOB))), 0) FROM {table}").fetchone()[0]
+                for table, column in columns}
+            conn.execute("VACUUM")
+            sizes["fichier"] = os.path.getsize(db_helper.db_path)
+            return sizes
+
+        sharing_json = '''
+            SELECT COUNT(*) FROM users
+            WHERE json_extract(privacy_settings, '$.location_sharing') = 1 AND is_active = 1
+        '''
+        sharing_field = "SELECT COUNT(*) FROM users WHERE location_sharing = 1 AND is_active = 1"
+        alert_json = "SELECT id, user_id FROM notifications WHERE json_extract(data, '$.alert_id') = ?"
+        alert_field = "SELECT id, user_id FROM notifications WHERE data_alert_id = ?"
+        # Dernier centième de la période : filtre sélectif sur created_at
+        since = (datetime(2025, 1, 1) + timedelta(seconds=int(interactions * 30 * 0.99))).strftime(
+            "%Y-%m-%d %H:%M:%S")
+        source_json = '''
+            SELECT COUNT(*) FROM user_interactions
+            WHERE json_extract(interaction_data, '$.source') = 'search' AND created_at >= ?
+        '''
+        source_field = '''
+            SELECT COUNT(*) FROM user_interactions
+            WHERE interaction_source = 'search' AND created_at >= ?
+        '''
+        sample = [rng.randint(1, alerts) for _ in range(queries)]
+        position = itertools.count()
+
+        def next_alert() -> int:
+            return sample[next(position) % len(sample)]
+
+        def run_filters(label: str, sharing: str, alert: str, source: str, repeat: int) -> List[object]:
+            print(f"{label} ({repeat} requêtes)")
+            print_stats("Parents partageant leur position",
+                        measure(lambda: conn.execute(sharing).fetchone(), repeat))
+            print_stats("Notifications d'une alerte",
+                        measure(lambda: conn.execute(alert, (next_alert(),)).fetchall(), repeat))
+            print_stats("Interactions récentes par source",
+                        measure(lambda: conn.execute(source, (since,)).fetchone(), repeat))
+            return [conn.execute(sharing).fetchone()[0],
+                    sorted(tuple(row) for row in conn.execute(alert, (sample[0],))),
+                    conn.execute(source, (since,)).fetchone()[0]]
+
+        before = storage()
+        slow = max(3, queries // 100)
+        expected = run_filters("🐢 json_extract sur le JSON avec espaces",
+                               sharing_json, alert_json, source_json, slow)
+
+        start = time.perf_counter()
+        rewritten = db_helper.compact_json_columns(["users", "notifications", "user_interactions"])
+        elapsed = time.perf_counter() - start
+        print(f"🗜️  compact_json_columns : {sum(rewritten.values())} valeurs réécrites en {elapsed:.1f} s")
+        after = storage()
+        for name in before:
+            print(f"  {name:<36} {before[name] / 1e6:9.1f} Mo -> {after[name] / 1e6:9.1f} Mo "
+                  f"({(after[name] - before[name]) / max(1, before[name]):+.1%})")
+
+        compact = run_filters("🐢 json_extract sur le JSON compact",
+                              sharing_json, alert_json, source_json, slow)
+        indexed = run_filters("📇 Colonnes générées indexées",
+                              sharing_field, alert_field, source_field, queries)
+        print(f"   Résultats identiques : {'oui' if expected == compact == indexed else 'NON'}")
+
+        # Écriture : mise à jour d'une clé sans relire le JSON côté Python
+        print_stats("patch_json (location_sharing)", measure(
+            lambda: db_helper.patch_json("users", "privacy_settings", rng.randint(1, users),
+                                         {"location_sharing": rng.random() < 0.5}), queries))
+    finally:
+        remove_database(db_helper)
+
+
+# =============================================
+# FILE DE MODÉRATION
+# =============================================
+
+def bench_moderation(reports: int, targets: int, moderators: int, claims: int, seed: int):
+    """Prochaine cible à modérer : parcours de reports vs file de priorité maintenue par trigger"""
+    rng = random.Random(seed)
+    db_helper = temp_database("bench_moderation_")
+    conn = db_helper.connect()
+    try:
+        types = list(DatabaseHelper.MODERATION_TARGET_WEIGHTS)
+        reasons = list(DatabaseHelper.REPORT_SEVERITY)
+        start = datetime(2025, 1, 1)
+
+        def report_rows():
+            # Cibles très inégalement signalées ; 20 % de signalements déjà traités
+            for index in range(reports):
+                pending = rng.random() < 0.8
+                yield (rng.randint(1, 100_000), min(targets, int(rng.paretovariate(0.8))) if
+                       rng.random() < 0.3 else rng.randint(1, targets), rng.choice(types),
+                       rng.choices(reasons, (5, 15, 30, 10, 40))[0],
+                       "pending" if pending else "reviewed",
+                       (start + timedelta(seconds=index * 5)).strftime("%Y-%m-%d %H:%M:%S"))
+
+        print(f"📥 Insertion de {reports} signalements sur {targets} cibles (file recalculée à la fin)...")
+        stats = db_helper.bulk_load("reports", report_rows(), batch_size=50_000,
+                                    columns=["reporter_id", "target_id", "target_type", "reason",
+                                             "status", "created_at"],
+                                    drop_indexes=True, defer_aggregates=True)
+        conn.execute("ANALYZE")
+        conn.commit()
+        queue = db_helper.moderation_queue_stats()
+        print(f"   {stats['rows']} signalements, {stats['seconds']:.1f} s ; file : {queue['pending']} "
+              f"cibles pour {queue['reports']} signalements en attente")
+
+        severity = db_helper._severity_sql("reason")
+        next_sql = f'''
+            SELECT target_type, target_id, COUNT(*) AS report_count,
+                   {db_helper._moderation_priority_sql("target_type", f"SUM({severity})",
+                                                       f"MAX({severity})")} AS priority
+            FROM reports WHERE status = 'pending'
+            GROUP BY target_type, target_id
+            ORDER BY priority DESC, MIN(created_at) LIMIT 1
+        '''
+        fifo_sql = "SELECT * FROM reports WHERE status = 'pending' ORDER BY created_at LIMIT 1"
+        slow = 3
+        for index_name in ("idx_reports_pending", "idx_reports_status"):
+            conn.execute(f"DROP INDEX {index_name}")
+        print(f"🐢 Sans index sur reports ({slow} requêtes)")
+        print_stats("Plus ancien signalement (FIFO)", measure(lambda: conn.execute(fifo_sql).fetchone(), slow))
+        print_stats("Cible prioritaire (GROUP BY)", measure(lambda: conn.execute(next_sql).fetchone(), slow))
+        db_helper._create_indexes(conn.cursor())
+        conn.execute("ANALYZE")
+        conn.commit()
+        print(f"📇 Index idx_reports_pending / idx_reports_status ({slow} requêtes)")
+        print_stats("Plus ancien signalement (FIFO)", measure(lambda: conn.execute(fifo_sql).fetchone(), slow))
+        expected = tuple(conn.execute(next_sql).fetchone())
+        print_stats("Cible prioritaire (GROUP BY)", measure(lambda: conn.execute(next_sql).fetchone(), slow))
+
+        print(f"📊 moderation_queue ({claims} réservations)")
+        first = db_helper.claim_moderation_item(1)
+        actual = (first["target_type"], first["target_id"], first["report_count"], first["priority"])
+        db_helper.release_moderation_item(1, first["target_type"], first["target_id"])
+        print(f"   Même cible que le GROUP BY : {'oui' if actual == expected else 'NON'}")
+        claimed: List[Dict[str, object]] = []
+        print_stats("claim_moderation_item", measure(
+            lambda: claimed.append(db_helper.claim_moderation_item(1)), claims))
+        items = iter(claimed)
+        print_stats("resolve_moderation_item", measure(lambda: (lambda item: db_helper.resolve_moderation_item(
+            1, item["target_type"], item["target_id"], "warning"))(next(items)), claims))
+        print_stats("report() (signalement + file)", measure(
+            lambda: db_helper.report(rng.randint(1, 100_000), rng.choice(types),
+                                     rng.randint(1, targets), rng.choice(reasons)), claims))
+        db_helper.close()
+
+        # Modérateurs concurrents (WAL) : aucune cible ne doit être servie deux fois
+        pooled = DatabaseHelper(db_helper.db_path, pool_size=moderators, cache_size=0)
+        served: List[Tuple[str, int]] = []
+        latencies: List[float] = []
+        served_lock = threading.Lock()
+        per_moderator = max(1, claims // moderators)
+
+        def moderator(moderator_id: int):
+            local_served, local_latencies = [], []
+            try:
+                for _ in range(per_moderator):
+                    start_time = time.perf_counter()
+                    item = pooled.claim_moderation_item(moderator_id)
+                    local_latencies.append((time.perf_counter() - start_time) * 1000.0)
+                    if item is None:
+                        break
+                    local_served.append((item["target_type"], item["target_id"]))
+                    pooled.resolve_moderation_item(moderator_id, item["target_type"], item["target_id"])
+            finally:
+                pooled.release()
+            with served_lock:
+                served.extend(local_served)
+                latencies.extend(local_latencies)
+
+        threads = [threading.Thread(target=moderator, args=(index + 2,)) for index in range(moderators)]
+        elapsed = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - elapsed
+        print(f"👥 {moderators} modérateurs concurrents : {len(served) / elapsed:.0f} cibles traitées/s, "
+              f"réservation p50={percentile(latencies, 50):.3f} ms p99={percentile(latencies, 99):.3f} ms, "
+              f"doublons={len(served) - len(set(served))}")
+        pooled.close()
+
+        start_time = time.perf_counter()
+        repaired = db_helper.recompute_moderation_queue()
+        print(f"🔧 recompute_moderation_queue : {time.perf_counter() - start_time:.1f} s, "
+              f"{repaired} entrées corrigées")
+    finally:
+        remove_database(db_helper)
+
+
+# =============================================
+# SAUVEGARDE EN LIGNE ET RÉPLICAS
+# =============================================
+
+def _progress_writer(db_helper: DatabaseHelper, rows: int, stop: threading.Event,
+                     seed: int) -> List[float]:
+    """Écrivain continu : une progression mise à jour par transaction ; latences (ms)"""
+    rng = random.Random(seed)
+    samples = []
+    with db_helper.acquire() as conn:
+        while not stop.is_set():
+            start = time.perf_counter()
+            conn.execute('''
+                UPDATE user_progress
+                SET progress_status = 'completed', score = ?, last_accessed = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (rng.randint(25, 50), rng.randint(1, rows)))
+            conn.commit()
+            samples.append((time.perf_counter() - start) * 1000.0)
+            # Rythme d'une application (environ 500 écritures/s), pas un chargement
+            time.sleep(0.002)
+    return samples
+
+
+def _latency_stats(samples: List[float]) -> Dict[str, float]:
+    """Statistiques de latence d'une liste de mesures (ms)"""
+    return {"p50": percentile(samples, 50), "p95": percentile(samples, 95),
+            "p99": percentile(samples, 99), "mean": statistics.fmean(samples) if samples else 0.0}
+
+
+def bench_replica(rows: int, users: int, contents: int, readers: int, seconds: float,
+                  replicas: int, seed: int):
+    """Impact de la sauvegarde en ligne sur l'écrivain et débit de lecture avec réplicas"""
+    rng = random.Random(seed)
+    db_helper = temp_database("bench_replica_")
+    categories = _seed_progress(db_helper, rows, users, contents, rng)
+    db_helper.close()
+    # Mode pool (WAL) : un écrivain et des lecteurs concurrents
+    pooled = DatabaseHelper(db_helper.db_path, pool_size=readers + 2, cache_size=0)
+    backup_path = f"{db_helper.db_path}.backup"
+    analytics = ProgressAnalytics(pooled)
+    size_mb = os.path.getsize(db_helper.db_path) / 1e6
+    try:
+        def with_writer(action: Callable[[], object]) -> List[float]:
+            stop = threading.Event()
+            result: Dict[str, List[float]] = {}
+            writer = threading.Thread(target=lambda: result.setdefault(
+                "samples", _progress_writer(pooled, rows, stop, seed)))
+            writer.start()
+            try:
+                action()
+            finally:
+                stop.set()
+                writer.join()
+            return result["samples"]
+
+        print(f"💾 Sauvegarde en ligne ({size_mb:.0f} Mo) pendant des écritures continues")
+        print_stats("Écrivain seul", _latency_stats(with_writer(lambda: time.sleep(seconds))))
+        for label, pages in (("(1024 p.)", 1024), ("(1 étape)", -1)):
+            backups = []
+
+            def repeated_backup():
+                deadline = time.perf_counter() + seconds
+                while time.perf_counter() < deadline:
+                    backups.append(pooled.backup(backup_path, pages=pages))
+
+            samples = with_writer(repeated_backup)
+            print_stats(f"Écrivain + sauvegarde {label}", _latency_stats(samples))
+            mean_seconds = statistics.fmean(stats["seconds"] for stats in backups)
+            print(f"    {len(backups)} sauvegarde(s), {mean_seconds:.2f} s chacune "
+                  f"({size_mb / mean_seconds:.0f} Mo/s)")
+
+        def read_one(thread_rng: random.Random):
+            kind = thread_rng.random()
+            if kind < 0.4:
+                pooled.get_leaderboard(20, thread_rng.choice(categories))
+            elif kind < 0.7:
+                analytics.content_funnel(thread_rng.randint(1, contents))
+            elif kind < 0.95:
+                analytics.user_completion(thread_rng.randint(1, users))
+            else:
+                analytics.category_progress()
+
+        def read_throughput() -> Tuple[float, List[float], float]:
+            # WAL vidé avant chaque mesure : sa taille finale montre les
+            # checkpoints bloqués par les lectures longues sur la base principale
+            with pooled.acquire() as conn:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+            counts = []
+            deadline = time.perf_counter() + seconds
+
+            def reader(index: int):
+                thread_rng = random.Random(seed + index)
+                count = 0
+                try:
+                    while time.perf_counter() < deadline:
+                        read_one(thread_rng)
+                        count += 1
+                finally:
+                    pooled.release()
+                counts.append(count)
+
+            def run_readers():
+                threads = [threading.Thread(target=reader, args=(index,)) for index in range(readers)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+
+            samples = with_writer(run_readers)
+            wal_path = f"{db_helper.db_path}-wal"
+            wal_mb = os.path.getsize(wal_path) / 1e6 if os.path.exists(wal_path) else 0.0
+            return sum(counts) / seconds, samples, wal_mb
+
+        print(f"📖 {readers} lecteurs (classements, tableaux de bord) + 1 écrivain, {seconds:.0f} s")
+        throughput, samples, wal_mb = read_throughput()
+        print(f"  {'Base principale (WAL)':<32} {throughput:9.0f} lectures/s  "
+              f"écrivain p99={percentile(samples, 99):.3f} ms  WAL={wal_mb:.1f} Mo")
+        for count in sorted({1, replicas}):
+            manager = ReplicaManager(pooled, replicas=count, interval=max(1.0, seconds / 3))
+            try:
+                with manager:
+                    throughput, samples, wal_mb = read_throughput()
+                print(f"  {f'{count} réplica(s)':<32} {throughput:9.0f} lectures/s  "
+                      f"écrivain p99={percentile(samples, 99):.3f} ms  WAL={wal_mb:.1f} Mo  "
+                      f"({manager.stats['refreshes']} rafraîchissements, "
+                      f"{manager.stats['last_seconds']:.2f} s)")
+            finally:
+                manager.remove_files()
+    finally:
+        for path in (backup_path, f"{backup_path}.tmp"):
+            if os.path.exists(path):
+                os.unlink(path)
+        remove_database(pooled)
+
+
+# =============================================
+# CACHE DES DONNÉES DE RÉFÉRENCE
+# =============================================
+
+def bench_cache(users: int, cache_size: int, lookups: int, seed: int):
+    """Latence des lectures de référence avec et sans cache LRU/TTL"""
+    rng = random.Random(seed)
+    db_helper = temp_database("bench_cache_")
+    try:
+        db_helper.bulk_load("users", ({
+            "name": f"Parent {i}", "email": f"parent{i}@example.com", "join_date": "2025-01-01",
+            "bio": "Parent de deux enfants", "latitude": lat, "longitude": lon,
+        } for i, (lat, lon) in enumerate(random_point_near(rng) for _ in range(users))))
+        db_helper.bulk_load("educational_content", ({
+            "category_id": rng.randint(1, 5), "title": f"Article {i}", "content": "Contenu " * 200,
+        } for i in range(5000)))
+        contents = db_helper.connect().execute("SELECT COUNT(*) FROM educational_content").fetchone()[0]
+        db_helper.close()
+
+        # Accès de type Zipf : quelques profils et contenus très consultés
+        def zipf_ids(count: int) -> List[int]:
+            weights = list(itertools.accumulate(1.0 / rank for rank in range(1, count + 1)))
+            return rng.choices(range(1, count + 1), cum_weights=weights, k=lookups)
+
+        user_ids = zipf_ids(users)
+        content_ids = zipf_ids(contents)
+
+        for label, size in (("sans cache", 0), (f"cache LRU {cache_size}", cache_size)):
+            helper = DatabaseHelper(db_helper.db_path, cache_size=size, cache_ttl=300.0)
+            users_iter = iter(user_ids)
+            contents_iter = iter(content_ids)
+            print(f"  {label}:")
+            print_stats("get_user_profile",
+                        measure(lambda: helper.get_user_profile(next(users_iter)), lookups))
+            print_stats("get_educational_content",
+                        measure(lambda: helper.get_educational_content(next(contents_iter)), lookups))
+            print_stats("get_categories", measure(helper.get_categories, lookups))
+            stats = helper.cache_stats()
+            print(f"    succès={stats['hits']} échecs={stats['misses']} "
+                  f"taux={stats['hit_ratio']:.1%} évictions={stats['evictions']}")
+            helper.close()
+    finally:
+        remove_database(db_helper)
+
+
+# =============================================
+# FRONT-END ASYNCIO (GROUP COMMIT)
+# =============================================
+
+def bench_async(clients: int, seconds: float, write_ratio: float, readers: int, seed: int):
+    """Débit d'un trafic chat + alertes : helper synchrone vs AsyncDatabaseHelper"""
+    rng = random.Random(seed)
+    conversations = 500
+    db_helper = temp_database("bench_async_")
+    try:
+        _seed_chat(db_helper, conversations, 50_000, rng)
+        db_helper.bulk_load("community_alerts", (
+            {"user_id": 1, "title": "Alerte", "description": "Voiture suspecte",
+             "alert_type": "suspicious_person", "latitude": lat, "longitude": lon}
+            for lat, lon in (random_point_near(rng) for _ in range(100_000))))
+        db_helper.close()
+
+        async def drive(send, read_alerts) -> Dict[str, float]:
+            latencies: List[float] = []
+            deadline = time.perf_counter() + seconds
+
+            async def client(index: int):
+                client_rng = random.Random(seed + index)
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    if client_rng.random() < write_ratio:
+                        await send(client_rng.randint(1, conversations), index + 1)
+                    else:
+                        lat, lon = random_point_near(client_rng)
+                        await read_alerts(lat, lon)
+                    latencies.append((time.perf_counter() - start) * 1000.0)
+
+            async def ticker():
+                # Retard de la boucle d'événements : temps d'attente d'une
+                # coroutine qui demande à être réveillée toutes les 1 ms
+                while time.perf_counter() < deadline:
+                    expected = time.perf_counter() + 0.001
+                    await asyncio.sleep(0.001)
+                    loop_lag.append(max(0.0, time.perf_counter() - expected) * 1000.0)
+
+            loop_lag: List[float] = []
+            start = time.perf_counter()
+            await asyncio.gather(ticker(), *(client(i) for i in range(clients)))
+            elapsed = time.perf_counter() - start
+            return {"rps": len(latencies) / elapsed, "p50": percentile(latencies, 50),
+                    "p99": percentile(latencies, 99), "lag_p99": percentile(loop_lag, 99),
+                    "lag_max": max(loop_lag, default=0.0)}
+
+        def print_result(label: str, result: Dict[str, float]):
+            print(f"  {label:<28} {result['rps']:7.0f} req/s  p50={result['p50']:7.2f} ms  "
+                  f"p99={result['p99']:7.2f} ms  retard boucle p99={result['lag_p99']:7.2f} ms "
+                  f"max={result['lag_max']:7.2f} ms")
+
+        print(f"🌐 {clients} clients, {seconds:.0f} s, {write_ratio:.0%} d'envois de messages")
+
+        # Référence : DatabaseHelper appelé directement (bloque la boucle d'événements)
+        async def sync_run():
+            helper = DatabaseHelper(db_helper.db_path)
+            conn = helper.connect()
+
+            async def send(conversation_id: int, sender_id: int):
+                conn.execute("INSERT INTO messages (conversation_id, sender_id, content) "
+                             "VALUES (?, ?, ?)", (conversation_id, sender_id, "Bonjour"))
+                conn.commit()
+
+            async def read_alerts(lat: float, lon: float):
+                helper.find_alerts_near(lat, lon, 1000.0)
+
+            try:
+                return await drive(send, read_alerts)
+            finally:
+                helper.close()
+
+        print_result("DatabaseHelper synchrone", asyncio.run(sync_run()))
+
+        async def async_run():
+            async with AsyncDatabaseHelper(db_helper.db_path, readers=readers) as db:
+                async def send(conversation_id: int, sender_id: int):
+                    await db.send_message(conversation_id, sender_id, "Bonjour")
+
+                async def read_alerts(lat: float, lon: float):
+                    await db.find_alerts_near(lat, lon, 1000.0)
+
+                result = await drive(send, read_alerts)
+                result["writes_per_tx"] = db.stats["writes"] / max(1, db.stats["transactions"])
+                return result
+
+        result = asyncio.run(async_run())
+        print_result("AsyncDatabaseHelper", result)
+        print(f"    {result['writes_per_tx']:.1f} écritures par transaction (group commit)")
+    finally:
+        remove_database(db_helper)
+
+
+# =============================================
+# SUITE DE REQUÊTES SUR DONNÉES SYNTHÉTIQUES
+# =============================================
+
+def capture_plans(conn, func: Callable[[], object]) -> List[Dict[str, object]]:
+    """Exécute func une fois en traçant ses SELECT et retourne le plan de chacun"""
+    statements: List[str] = []
+    conn.set_trace_callback(statements.append)
+    try:
+        func()
+    finally:
+        conn.set_trace_callback(None)
+    plans = []
+    for sql in dict.fromkeys(" ".join(statement.split()) for statement in statements):
+        # Les lectures internes des tables virtuelles (R*Tree, FTS5) nomment 'main'
+        if sql.upper().startswith(("SELECT", "WITH")) and "'main'." not in sql \
+                and "sqlite_stat" not in sql:
+            plans.append({"sql": sql, "plan": explain_query_plan(conn, sql)})
+    return plans
+
+
+def _suite_queries(db_helper: DatabaseHelper, queries: int,
+                   seed: int) -> Dict[str, Callable[[], object]]:
+    """Chemins d'accès mesurés, avec des paramètres tirés des données de la base"""
+    rng = random.Random(seed)
+    conn = db_helper.connect()
+
+    def sample(sql: str) -> List[object]:
+        values = [row[0] for row in conn.execute(sql)]
+        if not values:
+            raise ValueError(f"Aucune donnée pour: {sql}")
+        return [rng.choice(values) for _ in range(queries)]
+
+    newest_alert = conn.execute("SELECT MAX(created_at) FROM community_alerts").fetchone()[0]
+    since = (datetime.strptime(newest_alert, "%Y-%m-%d %H:%M:%S")
+             - timedelta(days=30)).strftime("%Y-%m-%d %H:%M:%S")
+    points = [random_point_near(rng, spread_deg=0.08) for _ in range(queries)]
+    inbox_users = sample("SELECT DISTINCT user_id FROM conversation_participants")
+    conversations = sample("SELECT id FROM conversations WHERE last_message_at IS NOT NULL")
+    feed_users = sample("SELECT DISTINCT user_id FROM notifications")
+    titles = sample("SELECT title FROM parenting_advice LIMIT 5000")
+    terms = [rng.choice([word for word in title.split() if len(word) > 3] or title.split())
+             for title in titles]
+    categories = sample("SELECT id FROM education_categories") + [None] * queries
+    cursor = itertools.count()
+
+    def next_index() -> int:
+        return next(cursor) % queries
+
+    return {
+        "nearby_alerts": lambda: db_helper.find_alerts_near(*points[next_index()], 2000.0,
+                                                            since=since),
+        "inbox": lambda: db_helper.get_inbox(inbox_users[next_index()]),
+        "chat_history": lambda: db_helper.get_messages(conversations[next_index()], limit=50),
+        "notification_feed": lambda: db_helper.get_notifications(feed_users[next_index()]),
+        "content_search": lambda: db_helper.search(terms[next_index()]),
+        "leaderboard": lambda: db_helper.get_leaderboard(
+            20, categories[rng.randrange(len(categories))]),
+    }
+
+
+def synthetic_database(db_path: str, scale: float, seed: int, prefix: str) -> str:
+    """Génère la base synthétique si elle n'existe pas (temporaire si db_path est vide)"""
+    if not db_path:
+        fd, db_path = tempfile.mkstemp(prefix=prefix, suffix=".db")
+        os.close(fd)
+        os.unlink(db_path)
+    if not os.path.exists(db_path):
+        print(f"📥 Génération de {db_path} (échelle {scale})...")
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            counts = generate_database(db_path, scale=scale, seed=seed)
+        print(f"   {sum(counts.values())} lignes en {time.perf_counter() - start:.1f} s")
+    return db_path
+
+
+def bench_suite(db_path: str, scale: float, queries: int, seed: int, json_path: str,
+                baseline_path: str):
+    """Mesure les principaux chemins d'accès sur une base synthétique"""
+    temporary = not db_path
+    db_path = synthetic_database(db_path, scale, seed, "bench_suite_")
+    db_helper = DatabaseHelper(db_path)
+    try:
+        conn = db_helper.connect()
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN "
+            "('users', 'messages', 'community_alerts', 'notifications', 'user_progress')")]
+        results: Dict[str, object] = {
+            "database": os.path.abspath(db_path),
+            "sqlite_version": sqlite3.sqlite_version,
+            "rows": {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                     for table in sorted(tables)},
+            "queries": {},
+        }
+        print("📊 " + ", ".join(f"{table}={rows}" for table, rows in results["rows"].items()))
+
+        for name, query in _suite_queries(db_helper, queries, seed).items():
+            plans = capture_plans(conn, query)
+            for _ in range(min(10, queries)):
+                query()
+            stats = measure(query, queries)
+            results["queries"][name] = {**stats, "plans": plans}
+            print(f"  {name:<20} p50={stats['p50']:8.3f} ms  p95={stats['p95']:8.3f} ms  "
+                  f"p99={stats['p99']:8.3f} ms")
+            for plan in plans:
+                for warning in plan_warnings(plan["plan"]):
+                    print(f"    ⚠️  {warning}")
+
+        print("\n🔎 Plans d'exécution")
+        for name, result in results["queries"].items():
+            print(f"  {name}")
+            for plan in result["plans"]:
+                print(f"    {plan['sql'][:100]}")
+                for line in plan["plan"]:
+                    print(f"      {line}")
+
+        if baseline_path:
+            with open(baseline_path, encoding="utf-8") as handle:
+                baseline = json.load(handle)["queries"]
+            print(f"\n📈 Comparaison avec {baseline_path}")
+            for name, result in results["queries"].items():
+                if name not in baseline:
+                    continue
+                ratio = result["p95"] / baseline[name]["p95"] if baseline[name]["p95"] else 0.0
+                changed = [plan["plan"] for plan in result["plans"]] != \
+                    [plan["plan"] for plan in baseline[name]["plans"]]
+                print(f"  {name:<20} p95 x{ratio:5.2f}" + ("  ⚠️ plan modifié" if changed else ""))
+
+        if json_path:
+            with open(json_path, "w", encoding="utf-8") as handle:
+                json.dump(results, handle, ensure_ascii=False, indent=2)
+            print(f"\n💾 Résultats enregistrés dans {json_path}")
+    finally:
+        if temporary:
+            remove_database(db_helper)
+        else:
+            db_helper.close()
+
+
+# =============================================
+# INSTRUMENTATION DES REQUÊTES
+# =============================================
+
+def bench_instrument(db_path: str, scale: float, queries: int, slow_ms: float, seed: int):
+    """Coût de l'instrumentation (QueryStats) et métriques collectées sur la suite"""
+    temporary = not db_path
+    db_path = synthetic_database(db_path, scale, seed, "bench_instrument_")
+    plain = DatabaseHelper(db_path, cache_size=0)
+    stats = QueryStats(slow_ms=slow_ms)
+    instrumented = DatabaseHelper(db_path, cache_size=0, query_stats=stats)
+    try:
+        # Journal des requêtes lentes compté, pas affiché
+        logging.getLogger("child_security.db").disabled = True
+        users = plain.connect().execute("SELECT MAX(id) FROM users").fetchone()[0]
+        lookup = "SELECT * FROM users WHERE id = ?"
+        rng = random.Random(seed)
+        ids = [rng.randint(1, users) for _ in range(20_000)]
+        for label, helper in (("Sans instrumentation", plain), ("Instrumenté", instrumented)):
+            conn = helper.connect()
+            start = time.perf_counter()
+            for user_id in ids:
+                conn.execute(lookup, (user_id,)).fetchone()
+            elapsed = time.perf_counter() - start
+            print(f"  {label:<24} lecture par clé : {elapsed / len(ids) * 1e6:6.2f} µs/requête")
+
+        print(f"\n⏱️  Suite ({queries} requêtes par chemin d'accès)")
+        plain_queries = _suite_queries(plain, queries, seed)
+        instrumented_queries = _suite_queries(instrumented, queries, seed)
+        stats.reset()
+        for name in plain_queries:
+            base = measure(plain_queries[name], queries)
+            measured = measure(instrumented_queries[name], queries)
+            overhead = (measured["mean"] / base["mean"] - 1.0) * 100.0 if base["mean"] else 0.0
+            print(f"  {name:<20} moy={base['mean']:8.3f} ms -> {measured['mean']:8.3f} ms "
+                  f"({overhead:+5.1f} %)")
+
+        metrics = instrumented.query_metrics(explain=True)
+        print("\n📊 Modèles les plus coûteux")
+        for statement in metrics["statements"][:8]:
+            print(f"  {statement['total_ms']:10.1f} ms  x{statement['count']:<5} "
+                  f"p95={statement['p95_ms']:8.3f} ms  {statement['template'][:70]}")
+            for warning in statement["warnings"] or []:
+                print(f"      ⚠️  {warning}")
+        print(f"\n🐢 {len(metrics['slow_queries'])} requêtes au-dessus de {slow_ms} ms")
+    finally:
+        logging.getLogger("child_security.db").disabled = False
+        instrumented.close()
+        if temporary:
+            remove_database(plain)
+        else:
+            plain.close()
+
+
+def main():
+    """Point d'entrée des benchmarks"""
+    parser = argparse.ArgumentParser(description="Benchmarks de la base Child Security")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    spatial = subparsers.add_parser("spatial", help="Alertes à proximité (R*Tree)")
+    spatial.add_argument("--alerts", type=int, default=1_000_000)
+    spatial.add_argument("--queries", type=int, default=500)
+    spatial.add_argument("--radius", type=float, default=2000.0)
+    spatial.add_argument("--seed", type=int, default=42)
+
+    pool = subparsers.add_parser("pool", help="Pool WAL vs connexion unique")
+    pool.add_argument("--threads", type=int, default=8)
+    pool.add_argument("--seconds", type=float, default=10.0)
+    pool.add_argument("--write-ratio", type=float, default=0.2)
+    pool.add_argument("--seed", type=int, default=42)
+
+    history = subparsers.add_parser("history", help="Historique de chat paginé")
+    history.add_argument("--messages", type=int, default=200_000)
+    history.add_argument("--page-size", type=int, default=50)
+    history.add_argument("--pages", type=int, default=50)
+    history.add_argument("--seed", type=int, default=42)
+
+    inbox = subparsers.add_parser("inbox", help="Boîte de réception et non-lus")
+    inbox.add_argument("--users", type=int, default=1_000)
+    inbox.add_argument("--conversations", type=int, default=2_000)
+    inbox.add_argument("--messages", type=int, default=1_000_000)
+    inbox.add_argument("--queries", type=int, default=200)
+    inbox.add_argument("--seed", type=int, default=42)
+
+    search = subparsers.add_parser("search", help="Recherche plein texte")
+    search.add_argument("--documents", type=int, default=500_000)
+    search.add_argument("--queries", type=int, default=50)
+    search.add_argument("--seed", type=int, default=42)
+
+    ingest = subparsers.add_parser("ingest", help="Chargement en masse")
+    ingest.add_argument("--rows", type=int, default=1_000_000)
+    ingest.add_argument("--naive-rows", type=int, default=5_000)
+    ingest.add_argument("--batch-size", type=int, default=50_000)
+    ingest.add_argument("--seed", type=int, default=42)
+
+    startup = subparsers.add_parser("startup", help="Démarrage à froid et création du schéma")
+    startup.add_argument("--rows", type=int, default=100_000)
+    startup.add_argument("--repeat", type=int, default=50)
+    startup.add_argument("--seed", type=int, default=42)
+
+    archive = subparsers.add_parser("archive", help="Archivage des notifications")
+    archive.add_argument("--rows", type=int, default=2_000_000)
+    archive.add_argument("--users", type=int, default=50_000)
+    archive.add_argument("--keep-days", type=int, default=90)
+    archive.add_argument("--queries", type=int, default=200)
+    archive.add_argument("--seed", type=int, default=42)
+
+    cache = subparsers.add_parser("cache", help="Cache LRU/TTL des données de référence")
+    cache.add_argument("--users", type=int, default=100_000)
+    cache.add_argument("--cache-size", type=int, default=10_000)
+    cache.add_argument("--lookups", type=int, default=100_000)
+    cache.add_argument("--seed", type=int, default=42)
+
+    async_parser = subparsers.add_parser("async", help="Front-end asyncio")
+    async_parser.add_argument("--clients", type=int, default=64)
+    async_parser.add_argument("--seconds", type=float, default=10.0)
+    async_parser.add_argument("--write-ratio", type=float, default=0.3)
+    async_parser.add_argument("--readers", type=int, default=4)
+    async_parser.add_argument("--seed", type=int, default=42)
+
+    fanout = subparsers.add_parser("fanout", help="Diffusion des alertes aux parents proches")
+    fanout.add_argument("--users", type=int, default=150_000)
+    fanout.add_argument("--nearby", type=int, default=100_000)
+    fanout.add_argument("--alerts", type=int, default=8)
+    fanout.add_argument("--workers", type=int, default=4)
+    fanout.add_argument("--seed", type=int, default=42)
+
+    graph = subparsers.add_parser("graph", help="Graphe des connexions entre parents")
+    graph.add_argument("--users", type=int, default=1_000_000)
+    graph.add_argument("--links", type=int, default=3)
+    graph.add_argument("--queries", type=int, default=500)
+    graph.add_argument("--changes", type=int, default=10_000)
+    graph.add_argument("--seed", type=int, default=42)
+
+    ratings = subparsers.add_parser("ratings", help="Classements par note (agrégats)")
+    ratings.add_argument("--ratings", type=int, default=10_000_000)
+    ratings.add_argument("--users", type=int, default=200_000)
+    ratings.add_argument("--contents", type=int, default=50_000)
+    ratings.add_argument("--queries", type=int, default=500)
+    ratings.add_argument("--seed", type=int, default=42)
+
+    progress = subparsers.add_parser("progress", help="Tableaux de bord de progression")
+    progress.add_argument("--rows", type=int, default=20_000_000)
+    progress.add_argument("--users", type=int, default=1_000_000)
+    progress.add_argument("--contents", type=int, default=5_000)
+    progress.add_argument("--queries", type=int, default=500)
+    progress.add_argument("--seed", type=int, default=42)
+
+    json_parser = subparsers.add_parser("json", help="Colonnes JSON compactes et clés indexées")
+    json_parser.add_argument("--users", type=int, default=500_000)
+    json_parser.add_argument("--notifications", type=int, default=5_000_000)
+    json_parser.add_argument("--interactions", type=int, default=2_000_000)
+    json_parser.add_argument("--queries", type=int, default=500)
+    json_parser.add_argument("--seed", type=int, default=42)
+
+    replica = subparsers.add_parser("replica", help="Sauvegarde en ligne et réplicas en lecture")
+    replica.add_argument("--rows", type=int, default=2_000_000)
+    replica.add_argument("--users", type=int, default=100_000)
+    replica.add_argument("--contents", type=int, default=2_000)
+    replica.add_argument("--readers", type=int, default=8)
+    replica.add_argument("--seconds", type=float, default=10.0)
+    replica.add_argument("--replicas", type=int, default=2)
+    replica.add_argument("--seed", type=int, default=42)
+
+    moderation = subparsers.add_parser("moderation", help="File de modération des signalements")
+    moderation.add_argument("--reports", type=int, default=5_000_000)
+    moderation.add_argument("--targets", type=int, default=1_000_000)
+    moderation.add_argument("--moderators", type=int, default=4)
+    moderation.add_argument("--claims", type=int, default=2000)
+    moderation.add_argument("--seed", type=int, default=42)
+
+    suite = subparsers.add_parser("suite", help="Chemins d'accès sur données synthétiques")
+    suite.add_argument("--db", default="",
+                       help="Base à utiliser (générée si absente ; temporaire par défaut)")
+    suite.add_argument("--scale", type=float, default=0.1)
+    suite.add_argument("--queries", type=int, default=200)
+    suite.add_argument("--seed", type=int, default=42)
+    suite.add_argument("--json", default="", help="Enregistre les résultats (JSON)")
+    suite.add_argument("--baseline", default="", help="Résultats JSON de référence à comparer")
+
+    instrument = subparsers.add_parser("instrument", help="Instrumentation des requêtes")
+    instrument.add_argument("--db", default="",
+                            help="Base à utiliser (générée si absente ; temporaire par défaut)")
+    instrument.add_argument("--scale", type=float, default=0.1)
+    instrument.add_argument("--queries", type=int, default=200)
+    instrument.add_argument("--slow-ms", type=float, default=10.0)
+    instrument.add_argument("--seed", type=int, default=42)
+
+    args = parser.parse_args()
+    if args.benchmark == "spatial":
+        bench_spatial(args.alerts, args.queries, args.radius, args.seed)
+    elif args.benchmark == "pool":
+        bench_pool(args.threads, args.seconds, args.write_ratio, args.seed)
+    elif args.benchmark == "history":
+        bench_history(args.messages, args.page_size, args.pages, args.seed)
+    elif args.benchmark == "inbox":
+        bench_inbox(args.users, args.conversations, args.messages, args.queries, args.seed)
+    elif args.benchmark == "search":
+        bench_search(args.documents, args.queries, args.seed)
+    elif args.benchmark == "ingest":
+        bench_ingest(args.rows, args.naive_rows, args.batch_size, args.seed)
+    elif args.benchmark == "startup":
+        bench_startup(args.rows, args.repeat, args.seed)
+    elif args.benchmark == "archive":
+        bench_archive(args.rows, args.users, args.keep_days, args.queries, args.seed)
+    elif args.benchmark == "cache":
+        bench_cache(args.users, args.cache_size, args.lookups, args.seed)
+    elif args.benchmark == "async":
+        bench_async(args.clients, args.seconds, args.write_ratio, args.readers, args.seed)
+    elif args.benchmark == "fanout":
+        bench_fanout(args.users, args.nearby, args.alerts, args.workers, args.seed)
+    elif args.benchmark == "graph":
+        bench_graph(args.users, args.links, args.queries, args.changes, args.seed)
+    elif args.benchmark == "ratings":
+        bench_ratings(args.ratings, args.users, args.contents, args.queries, args.seed)
+    elif args.benchmark == "progress":
+        bench_progress(args.rows, args.users, args.contents, args.queries, args.seed)
+    elif args.benchmark == "json":
+        bench_json(args.users, args.notifications, args.interactions, args.queries, args.seed)
+    elif args.benchmark == "replica":
+        bench_replica(args.rows, args.users, args.contents, args.readers, args.seconds,
+                      args.replicas, args.seed)
+    elif args.benchmark == "moderation":
+        bench_moderation(args.reports, args.targets, args.moderators, args.claims, args.seed)
+    elif args.benchmark == "suite":
+        bench_suite(args.db, args.scale, args.queries, args.seed, args.json, args.baseline)
+    elif args.benchmark == "instrument":
+        bench_instrument(args.db, args.scale, args.queries, args.slow_ms, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ligne de commande de la base Child Security
+
+Mêmes commandes que `python data/db_setting.py` (voir db_setting.main).
+Un script lancé directement est recompilé à chaque exécution ; importé
+ici, db_setting est chargé depuis son bytecode en cache, ce qui réduit le
+démarrage à froid des scripts courts et des workers.
+
+    python data/db_cli.py init [--lazy]
+    python data/db_cli.py verify [--integrity]
+    python data/db_cli.py stats
+    python data/db_cli.py vacuum [--full]
+"""
+
+import sys
+
+from db_setting import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Workers de diffusion des alertes communautaires
+
+Chaque nouvelle alerte est mise en file dans alert_fanout (trigger de la
+migration 6). Les workers réservent les alertes en attente par bail
+(claim_pending_alert) et créent les notifications des parents à proximité
+(fan_out_alert). Un worker arrêté en cours de diffusion laisse expirer son
+bail : un autre reprend l'alerte sans créer de doublon.
+
+Le débit est borné par l'écrivain unique de SQLite : plusieurs workers
+servent surtout à la disponibilité (reprise des baux expirés, plusieurs
+processus), pas à insérer plus vite.
+"""
+
+import logging
+import os
+import socket
+import threading
+from typing import Any, Dict, List, Optional
+
+from db_setting import DatabaseHelper
+
+logger = logging.getLogger("child_security.fanout")
+
+
+class AlertFanoutWorkers:
+    """Pool de threads qui vident la file des alertes à diffuser"""
+
+    def __init__(self, db_path: str, workers: int = 1, poll_interval: float = 0.5,
+                 batch_size: int = 5000, lease_seconds: float = 60.0,
+                 pragmas: Optional[Dict[str, Any]] = None):
+        """
+        Initialise le pool (les threads sont démarrés par start())
+
+        Args:
+            db_path: Chemin vers le fichier de base de données
+            workers: Nombre de threads (chacun avec sa connexion WAL)
+            poll_interval: Attente (secondes) entre deux consultations d'une file vide
+            batch_size: Notifications insérées par transaction (voir fan_out_alert)
+            lease_seconds: Durée du bail d'une alerte réservée
+            pragmas: PRAGMAs supplémentaires pour les connexions des workers
+        """
+        if workers < 1:
+            raise ValueError("workers doit être supérieur ou égal à 1")
+        self.db_path = db_path
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.pragmas = pragmas
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self.stats = {"alerts": 0, "notifications": 0, "failed": 0, "errors": 0}
+
+    def __enter__(self) -> "AlertFanoutWorkers":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """Démarre les threads"""
+        if self._threads:
+            return
+        self._stop.clear()
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(f"{prefix}:{index}",),
+                                      name=f"alert-fanout-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Arrête les threads après la diffusion en cours"""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wake(self):
+        """Réveille les workers en attente (nouvelle alerte créée)"""
+        self._wake.set()
+
+    def pending(self) -> int:
+        """Nombre d'alertes en attente ou en cours de diffusion"""
+        db_helper = DatabaseHelper(self.db_path, cache_size=0)
+        try:
+            return db_helper.connect().execute('''
+                SELECT COUNT(*) FROM alert_fanout WHERE status IN ('pending', 'running')
+            ''').fetchone()[0]
+        finally:
+            db_helper.close()
+
+    def _run(self, worker: str):
+        """Boucle d'un worker : vide la file, puis attend poll_interval ou wake()"""
+        db_helper = DatabaseHelper(self.db_path, pool_size=1, pragmas=self.pragmas, cache_size=0)
+        try:
+            while not self._stop.is_set():
+                try:
+                    # Une alerte à la fois : stop() est pris en compte entre deux alertes
+                    result = db_helper.process_pending_alerts(
+                        worker, max_alerts=1, batch_size=self.batch_size,
+                        lease_seconds=self.lease_seconds)
+                except Exception:
+                    # Base verrouillée trop longtemps... : nouvelle tentative plus tard
+                    with self._lock:
+                        self.stats["errors"] += 1
+                    logger.exception("Échec de la diffusion des alertes (worker %s)", worker)
+                    self._stop.wait(self.poll_interval)
+                    continue
+                with self._lock:
+                    for key, value in result.items():
+                        self.stats[key] += value
+                if not result["alerts"] and not result["failed"]:
+                    self._wake.wait(self.poll_interval)
+                    self._wake.clear()
+        finally:
+            db_helper.release()
+            db_helper.close()
@@ -0,0 +1,696 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Générateur de données synthétiques pour la base Child Security
+
+Remplit toutes les tables avec des volumes réalistes et des références
+cohérentes : utilisateurs et alertes regroupés autour de quelques villes,
+graphe de connexions à loi de puissance (attachement préférentiel),
+conversations dont l'activité suit une loi de Pareto, messages en ordre
+chronologique... Pour une même graine et une même échelle, la base produite
+est identique d'une exécution à l'autre.
+
+Usage:
+    python data/db_generator.py child_security_load.db --scale 1.0 --seed 42
+"""
+
+import argparse
+import itertools
+import os
+import random
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+from db_setting import DatabaseHelper
+
+# Quelques villes autour desquelles les données sont générées
+CITIES = [
+    ("Paris", 48.8566, 2.3522),
+    ("Lyon", 45.7640, 4.8357),
+    ("Marseille", 43.2965, 5.3698),
+    ("Toulouse", 43.6047, 1.4442),
+    ("Lille", 50.6292, 3.0573),
+    ("Casablanca", 33.5731, -7.5898),
+    ("Rabat", 34.0209, -6.8416),
+]
+
+
+# Vocabulaire utilisé pour générer du texte en français
+WORDS = (
+    "sécurité enfant école parents écran internet danger prévention communication "
+    "émotion premiers secours route voiture parc jeux harcèlement réseaux sociaux "
+    "confiance famille sommeil alimentation santé règles limites dialogue écoute "
+    "autonomie responsabilité protection vigilance quartier voisin trajet bus "
+    "téléphone application vidéo jeu vidéo mot de passe photo partage respect "
+    "colère peur tristesse joie crèche maternelle collège adolescent bébé"
+).split()
+
+SYLLABLES = ["ba", "cé", "di", "fo", "gu", "la", "mè", "ni", "po", "ré", "sa", "té",
+             "vo", "an", "ou", "in", "eau", "ch", "é", "qu"]
+
+FIRST_NAMES = ["Ahmed", "Fatima", "Youssef", "Sarah", "Karim", "Amina", "Lucas", "Emma",
+               "Mehdi", "Léa", "Omar", "Chloé", "Nadia", "Hugo", "Salma", "Julien",
+               "Inès", "Thomas", "Yasmine", "Camille"]
+LAST_NAMES = ["Martin", "Benali", "Durand", "El Amrani", "Bernard", "Tazi", "Petit",
+              "Moreau", "Alaoui", "Laurent", "Idrissi", "Roux", "Bennani", "Fournier"]
+
+ALERT_TYPES = ["suspicious_person", "lost_child", "road_danger", "unsafe_area", "other"]
+REACTIONS = ["👍", "❤️", "😂", "😮", "🙏"]
+HELP_CATEGORIES = ["garde", "transport", "conseil", "urgence", "matériel"]
+ADVICE_CATEGORIES = ["sommeil", "alimentation", "écrans", "émotions", "sécurité", "scolarité"]
+AGE_GROUPS = ["0-3", "3-6", "6-12", "12-18"]
+NOTIFICATION_TYPES = ["alert", "message", "connection", "advice", "system"]
+REPORT_REASONS = ["spam", "harassment", "inappropriate", "false_alert", "danger"]
+
+# Fenêtre temporelle des données générées (UTC)
+START_TS = int(datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp())
+END_TS = int(datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp())
+DAY = 86400
+
+
+class Vocabulary:
+    """Vocabulaire à distribution de Zipf (quelques mots fréquents, beaucoup de rares)"""
+
+    def __init__(self, rng: random.Random, size: int = 30000):
+        words = list(dict.fromkeys(WORDS))
+        while len(words) < size:
+            words.append("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+        self.words = list(dict.fromkeys(words))
+        rng.shuffle(self.words)
+        weights = [1.0 / (rank + 1) for rank in range(len(self.words))]
+        self.cum_weights = list(itertools.accumulate(weights))
+
+    def text(self, rng: random.Random, words: int) -> str:
+        """Phrase aléatoire de `words` mots"""
+        return " ".join(rng.choices(self.words, cum_weights=self.cum_weights, k=words)).capitalize()
+
+    def word(self, rng: random.Random, min_rank: int, max_rank: int) -> str:
+        """Mot dont le rang de fréquence est compris entre min_rank et max_rank"""
+        return self.words[rng.randint(min_rank, min(max_rank, len(self.words) - 1))]
+
+
+def random_point_near(rng: random.Random, spread_deg: float = 0.15, background: float = 0.0):
+    """
+    Point aléatoire concentré autour d'une des villes
+
+    Une fraction `background` des points est répartie uniformément sur la zone
+    France/Maroc pour simuler les alertes hors agglomération.
+    """
+    if background and rng.random() < background:
+        return rng.uniform(33.0, 51.0), rng.uniform(-8.0, 8.0)
+    _, lat, lon = rng.choice(CITIES)
+    return lat + rng.gauss(0, spread_deg), lon + rng.gauss(0, spread_deg)
+
+
+def timestamp(epoch: float) -> str:
+    """Date au format des colonnes TEXT de la base ("AAAA-MM-JJ HH:MM:SS", UTC)"""
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(epoch))
+
+
+class SyntheticDataGenerator:
+    """Remplit une base Child Security vide avec des données synthétiques"""
+
+    # Volumes à l'échelle 1.0 (quiz_questions : par contenu ;
+    # parent_connections : connexions créées par nouvel utilisateur)
+    VOLUMES = {
+        "users": 100_000,
+        "parent_connections": 3,
+        "conversations": 50_000,
+        "messages": 2_000_000,
+        "message_reactions": 200_000,
+        "community_alerts": 200_000,
+        "alert_comments": 300_000,
+        "help_requests": 20_000,
+        "help_responses": 60_000,
+        "educational_content": 2_000,
+        "quiz_questions": 5,
+        "user_progress": 500_000,
+        "parenting_advice": 20_000,
+        "advice_comments": 80_000,
+        "user_interactions": 1_000_000,
+        "ratings": 300_000,
+        "notifications": 1_000_000,
+        "reports": 10_000,
+    }
+
+    # Tables en ajout seul chargées sans leurs index secondaires
+    APPEND_ONLY = ("messages", "user_interactions", "notifications")
+
+    # Volumes qui ne dépendent pas de l'échelle
+    FIXED = ("parent_connections", "quiz_questions")
+
+    def __init__(self, db_helper: DatabaseHelper, scale: float = 1.0, seed: int = 42,
+                 batch_size: int = 20000, verbose: bool = True):
+        """
+        Initialise le générateur
+
+        Args:
+            db_helper: Base de destination (schéma créé, sans données)
+            scale: Facteur appliqué aux volumes de VOLUMES
+            seed: Graine ; chaque table a son propre générateur dérivé de la graine
+            batch_size: Nombre de lignes par transaction (voir bulk_load)
+            verbose: Affiche la progression
+        """
+        if scale <= 0:
+            raise ValueError("scale doit être strictement positif")
+        self.db_helper = db_helper
+        self.seed = seed
+        self.batch_size = batch_size
+        self.verbose = verbose
+        self.volumes = {table: volume if table in self.FIXED else max(10, int(round(volume * scale)))
+                        for table, volume in self.VOLUMES.items()}
+        self.vocabulary = Vocabulary(self._rng("vocabulary"))
+        self.counts: Dict[str, int] = {}
+        self.members: List[Tuple[int, ...]] = []
+        self.message_conversations = array("I")
+
+    def _rng(self, table: str) -> random.Random:
+        """Générateur propre à une table (indépendant de l'ordre de génération)"""
+        return random.Random(f"{self.seed}:{table}")
+
+    def _chrono(self, index: int, count: int) -> int:
+        """Date (epoch) de la ligne `index` d'une table en ordre chronologique"""
+        return START_TS + (END_TS - START_TS) * index // count
+
+    @staticmethod
+    def _weights(rng: random.Random, count: int, alpha: float) -> List[float]:
+        """Poids cumulés d'une loi de Pareto (activité très inégale)"""
+        return list(itertools.accumulate(rng.paretovariate(alpha) for _ in range(count)))
+
+    def _pick(self, rng: random.Random, cum_weights: Sequence[float], k: int) -> List[int]:
+        """k identifiants (1..n) tirés selon des poids cumulés"""
+        return rng.choices(range(1, len(cum_weights) + 1), cum_weights=cum_weights, k=k)
+
+    def _load(self, table: str, columns: Sequence[str], rows: Iterator[Sequence]):
+        """Charge les lignes d'une table avec bulk_load et note le volume"""
+        stats = self.db_helper.bulk_load(table, rows, batch_size=self.batch_size, columns=columns,
+                                         drop_indexes=table in self.APPEND_ONLY,
+                                         defer_aggregates=True)
+        self.counts[table] = stats["rows"]
+        if self.verbose:
+            print(f"   {table:<28} {stats['rows']:>10} lignes  {stats['seconds']:7.1f} s")
+
+    def generate(self) -> Dict[str, int]:
+        """
+        Génère toutes les tables
+
+        Returns:
+            Nombre de lignes insérées par table
+        """
+        conn = self.db_helper.connect()
+        if conn.execute("SELECT 1 FROM users LIMIT 1").fetchone():
+            raise ValueError("La base contient déjà des utilisateurs")
+        self.categories = [row[0] for row in conn.execute("SELECT id FROM education_categories")]
+        if not self.categories:
+            raise ValueError("Aucune catégorie éducative : appeler create_tables d'abord")
+
+        start = time.perf_counter()
+        if self.verbose:
+            print(f"📥 Génération des données (graine {self.seed})...")
+        self.user_weights = self._weights(self._rng("activity"), self.volumes["users"], 1.3)
+        steps: List[Tuple[str, Sequence[str], Callable[[], Iterator[Sequence]]]] = [
+            ("users", ("id", "name", "email", "phone", "address", "latitude", "longitude",
+                       "is_verified", "is_active", "join_date", "last_seen",
+                       "children_count", "bio", "notification_token", "privacy_settings",
+                       "created_at", "updated_at"), self._users),
+            ("parent_connections", ("user1_id", "user2_id", "status", "connection_date",
+                                    "last_interaction", "trust_score", "created_at"),
+             self._parent_connections),
+            ("conversations", ("id", "title", "type", "created_by", "created_at", "updated_at"),
+             self._conversations),
+            ("conversation_participants", ("conversation_id", "user_id", "role", "joined_at",
+                                           "last_read_at", "is_muted"), self._participants),
+            ("messages", ("id", "conversation_id", "sender_id", "content", "message_type",
+                          "media_url", "sent_at", "reply_to_message_id", "status",
+                          "location_data"), self._messages),
+            ("message_reactions", ("message_id", "user_id", "reaction_type", "created_at"),
+             self._message_reactions),
+            ("community_alerts", ("id", "user_id", "title", "description", "alert_type", "severity",
+                                  "latitude", "longitude", "address", "created_at", "updated_at",
+                                  "is_resolved", "resolved_by", "resolved_at", "views_count",
+                                  "media_urls"), self._community_alerts),
+            ("alert_comments", ("alert_id", "user_id", "comment", "created_at", "is_helpful",
+                                "helpful_count"), self._alert_comments),
+            ("help_requests", ("id", "requester_id", "title", "description", "category", "urgency",
+                               "latitude", "longitude", "created_at", "updated_at",
+                               "is_resolved"), self._help_requests),
+            ("help_responses", ("request_id", "responder_id", "response", "contact_method",
+                                "created_at", "is_accepted", "rating"), self._help_responses),
+            ("educational_content", ("id", "category_id", "title", "content", "content_type",
+                                     "difficulty_level", "estimated_duration", "views_count",
+                                     "created_at", "updated_at", "tags", "author", "likes_count"),
+             self._educational_content),
+            ("quiz_questions", ("content_id", "question", "options", "correct_answer",
+                                "explanation", "points", "sort_order"), self._quiz_questions),
+            ("user_progress", ("user_id", "content_id", "progress_status", "score", "time_spent",
+                               "started_at", "completed_at", "last_accessed", "attempts_count"),
+             self._user_progress),
+            ("parenting_advice", ("id", "author_id", "title", "content", "category", "age_group",
+                                  "tags", "views_count", "created_at", "updated_at", "is_featured",
+                                  "likes_count", "shares_count"), self._parenting_advice),
+            ("advice_comments", ("id", "advice_id", "user_id", "comment", "created_at",
+                                 "helpful_count", "parent_comment_id"), self._advice_comments),
+            ("user_interactions", ("user_id", "interaction_type", "target_id", "target_type",
+                                   "interaction_data", "created_at"), self._user_interactions),
+            ("ratings", ("user_id", "target_id", "target_type", "rating", "review", "created_at",
+                         "is_anonymous"), self._ratings),
+            ("notifications", ("user_id", "title", "message", "type", "data", "is_read",
+                               "created_at", "read_at", "priority"), self._notifications),
+            ("reports", ("reporter_id", "target_id", "target_type", "reason", "description",
+                         "status", "created_at", "reviewed_by", "reviewed_at", "action_taken"),
+             self._reports),
+        ]
+        for table, columns, rows in steps:
+            self._load(table, columns, rows())
+
+        self._update_derived_columns()
+        conn.execute("ANALYZE")
+        conn.commit()
+        if self.verbose:
+            print(f"✅ {sum(self.counts.values())} lignes générées en "
+                  f"{time.perf_counter() - start:.1f} s")
+        return dict(self.counts)
+
+    # =============================================
+    # UTILISATEURS ET RELATIONS
+    # =============================================
+
+    def _users(self) -> Iterator[Sequence]:
+        rng = self._rng("users")
+        for user_id in range(1, self.volumes["users"] + 1):
+            joined = rng.randint(START_TS - 365 * DAY, END_TS - DAY)
+            lat = lon = None
+            if rng.random() < 0.9:
+                lat, lon = random_point_near(rng, spread_deg=0.1, background=0.1)
+            privacy = {"profile_visible": rng.random() < 0.9,
+                       "location_sharing": rng.random() < 0.6}
+            yield (user_id, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                   f"parent{user_id}@example.org", f"+33 6{rng.randint(10000000, 99999999)}",
+                   None, lat, lon,
+                   int(rng.random() < 0.4), int(rng.random() < 0.95), timestamp(joined),
+                   timestamp(rng.randint(joined, END_TS)), rng.randint(1, 4),
+                   self.vocabulary.text(rng, rng.randint(5, 15)) if rng.random() < 0.3 else None,
+                   f"token-{user_id:08d}" if rng.random() < 0.7 else None,
+                   privacy, timestamp(joined), timestamp(joined))
+
+    def _parent_connections(self) -> Iterator[Sequence]:
+        """Graphe à attachement préférentiel (Barabási–Albert) : degrés en loi de puissance"""
+        rng = self._rng("parent_connections")
+        links = self.volumes["parent_connections"]
+        users = self.volumes["users"]
+        # Chaque extrémité apparaît une fois par connexion : tirer dans cette
+        # liste revient à choisir un utilisateur proportionnellement à son degré
+        endpoints = array("I", range(1, links + 1))
+        self.connections: List[Tuple[int, int]] = []
+        for user_id in range(links + 1, users + 1):
+            targets = set()
+            while len(targets) < links:
+                targets.add(endpoints[rng.randrange(len(endpoints))])
+            for target in sorted(targets):
+                endpoints.append(target)
+                endpoints.append(user_id)
+                status = rng.choices(("accepted", "pending", "blocked"), (80, 15, 5))[0]
+                if status == "accepted":
+                    self.connections.append((target, user_id))
+                created = rng.randint(START_TS - 180 * DAY, END_TS - DAY)
+                # Le demandeur (user1_id) est l'un ou l'autre des deux parents
+                user1, user2 = (target, user_id) if rng.random() < 0.5 else (user_id, target)
+                yield (user1, user2, status, timestamp(created),
+                       timestamp(rng.randint(created, END_TS)),
+                       round(min(5.0, max(0.0, rng.gauss(3.0, 1.0))), 2), timestamp(created))
+
+    def _conversations(self) -> Iterator[Sequence]:
+        """Conversations privées (entre parents connectés) et de groupe"""
+        rng = self._rng("conversations")
+        self.members = [()]
+        self.conversation_created = array("q", [0])
+        for conversation_id in range(1, self.volumes["conversations"] + 1):
+            if rng.random() < 0.8 and self.connections:
+                members = rng.choice(self.connections)
+                conversation_type, title = "private", None
+            else:
+                size = rng.randint(3, 12)
+                members = tuple(dict.fromkeys(self._pick(rng, self.user_weights, size)))
+                conversation_type = "group"
+                title = f"Groupe {self.vocabulary.word(rng, 0, 200)} {conversation_id}"
+            self.members.append(tuple(members))
+            created = START_TS - rng.randint(DAY, 90 * DAY)
+            self.conversation_created.append(created)
+            yield (conversation_id, title, conversation_type, members[0], timestamp(created),
+                   timestamp(created))
+
+    def _participants(self) -> Iterator[Sequence]:
+        """Participants ; last_read_at est fixé avant les messages (les triggers comptent les non-lus)"""
+        rng = self._rng("conversation_participants")
+        for conversation_id in range(1, len(self.members)):
+            joined = timestamp(self.conversation_created[conversation_id])
+            for position, user_id in enumerate(self.members[conversation_id]):
+                last_read = None
+                if rng.random() < 0.85:
+                    last_read = timestamp(END_TS - int(rng.expovariate(1.0 / (5 * DAY))))
+                yield (conversation_id, user_id, "admin" if position == 0 else "member", joined,
+                       last_read, int(rng.random() < 0.05))
+
+    def _messages(self) -> Iterator[Sequence]:
+        """Messages en ordre chronologique, concentrés sur les conversations actives"""
+        rng = self._rng("messages")
+        count = self.volumes["messages"]
+        weights = self._weights(rng, len(self.members) - 1, 1.1)
+        last_message: Dict[int, int] = {}
+        self.message_conversations = array("I")
+        recent = END_TS - 2 * DAY
+        for chunk_start in range(0, count, 100_000):
+            chunk = self._pick(rng, weights, min(100_000, count - chunk_start))
+            for offset, conversation_id in enumerate(chunk):
+                message_id = chunk_start + offset + 1
+                sent = self._chrono(message_id - 1, count)
+                self.message_conversations.append(conversation_id)
+                reply_to = last_message.get(conversation_id) if rng.random() < 0.08 else None
+                last_message[conversation_id] = message_id
+                draw = rng.random()
+                media_url = location = None
+                if draw < 0.03:
+                    message_type, content = "image", "Photo"
+                    media_url = f"https://cdn.example.org/messages/{message_id}.jpg"
+                elif draw < 0.05:
+                    message_type, content = "location", "Position partagée"
+                    lat, lon = random_point_near(rng, spread_deg=0.05)
+                    location = {"latitude": round(lat, 6), "longitude": round(lon, 6)}
+                else:
+                    message_type = "text"
+                    content = self.vocabulary.text(rng, rng.randint(3, 20))
+                yield (message_id, conversation_id, rng.choice(self.members[conversation_id]),
+                       content, message_type, media_url, timestamp(sent), reply_to,
+                       "read" if sent < recent else "delivered", location)
+
+    def _message_reactions(self) -> Iterator[Sequence]:
+        rng = self._rng("message_reactions")
+        messages = len(self.message_conversations)
+        seen = set()
+        for _ in range(self.volumes["message_reactions"]):
+            message_id = rng.randint(1, messages)
+            user_id = rng.choice(self.members[self.message_conversations[message_id - 1]])
+            reaction = rng.choice(REACTIONS)
+            if (message_id, user_id, reaction) in seen:
+                continue
+            seen.add((message_id, user_id, reaction))
+            reacted = self._chrono(message_id - 1, messages) + int(rng.expovariate(1 / 3600.0))
+            yield message_id, user_id, reaction, timestamp(min(reacted, END_TS))
+
+    # =============================================
+    # ALERTES ET ENTRAIDE
+    # =============================================
+
+    def _community_alerts(self) -> Iterator[Sequence]:
+        """Alertes regroupées autour des villes (5 % hors agglomération)"""
+        rng = self._rng("community_alerts")
+        count = self.volumes["community_alerts"]
+        users = self._pick(rng, self.user_weights, count)
+        for alert_id in range(1, count + 1):
+            created = self._chrono(alert_id - 1, count)
+            lat, lon = random_point_near(rng, spread_deg=0.08, background=0.05)
+            alert_type = rng.choice(ALERT_TYPES)
+            resolved = rng.random() < 0.4
+            resolved_at = min(END_TS, created + int(rng.expovariate(1 / (6 * 3600.0))))
+            media = ([f"https://cdn.example.org/alerts/{alert_id}_{n}.jpg"
+                      for n in range(rng.randint(1, 3))] if rng.random() < 0.2 else None)
+            yield (alert_id, users[alert_id - 1],
+                   f"{alert_type.replace('_', ' ').capitalize()} : {self.vocabulary.text(rng, 3)}",
+                   self.vocabulary.text(rng, rng.randint(10, 40)), alert_type,
+                   rng.choices(("low", "medium", "high", "critical"), (30, 45, 20, 5))[0],
+                   lat, lon, None, timestamp(created),
+                   timestamp(resolved_at if resolved else created), int(resolved),
+                   rng.randint(1, self.volumes["users"]) if resolved else None,
+                   timestamp(resolved_at) if resolved else None,
+                   int(rng.paretovariate(1.3) * 10), media)
+
+    def _alert_comments(self) -> Iterator[Sequence]:
+        rng = self._rng("alert_comments")
+        alerts = self.volumes["community_alerts"]
+        count = self.volumes["alert_comments"]
+        users = self._pick(rng, self.user_weights, count)
+        for index in range(count):
+            alert_id = rng.randint(1, alerts)
+            created = self._chrono(alert_id - 1, alerts) + int(rng.expovariate(1 / (6 * 3600.0)))
+            helpful = rng.random() < 0.2
+            yield (alert_id, users[index], self.vocabulary.text(rng, rng.randint(3, 25)),
+                   timestamp(min(created, END_TS)), int(helpful),
+                   rng.randint(1, 20) if helpful else 0)
+
+    def _help_requests(self) -> Iterator[Sequence]:
+        rng = self._rng("help_requests")
+        count = self.volumes["help_requests"]
+        users = self._pick(rng, self.user_weights, count)
+        for request_id in range(1, count + 1):
+            created = self._chrono(request_id - 1, count)
+            lat = lon = None
+            if rng.random() < 0.8:
+                lat, lon = random_point_near(rng, spread_deg=0.08)
+            yield (request_id, users[request_id - 1], self.vocabulary.text(rng, 5),
+                   self.vocabulary.text(rng, rng.randint(10, 40)), rng.choice(HELP_CATEGORIES),
+                   rng.choices(("low", "normal", "high", "urgent"), (20, 55, 20, 5))[0],
+                   lat, lon, timestamp(created), timestamp(created), int(rng.random() < 0.6))
+
+    def _help_responses(self) -> Iterator[Sequence]:
+        rng = self._rng("help_responses")
+        requests = self.volumes["help_requests"]
+        count = self.volumes["help_responses"]
+        users = self._pick(rng, self.user_weights, count)
+        for index in range(count):
+            request_id = rng.randint(1, requests)
+            created = self._chrono(request_id - 1, requests) + int(rng.expovariate(1 / 7200.0))
+            accepted = rng.random() < 0.3
+            yield (request_id, users[index], self.vocabulary.text(rng, rng.randint(5, 30)),
+                   rng.choice(("message", "phone", "email")), timestamp(min(created, END_TS)),
+                   int(accepted), float(rng.randint(3, 5)) if accepted else None)
+
+    # =============================================
+    # ÉDUCATION ET CONSEILS
+    # =============================================
+
+    def _educational_content(self) -> Iterator[Sequence]:
+        rng = self._rng("educational_content")
+        count = self.volumes["educational_content"]
+        for content_id in range(1, count + 1):
+            created = self._chrono(content_id - 1, count)
+            yield (content_id, rng.choice(self.categories), self.vocabulary.text(rng, rng.randint(4, 8)),
+                   self.vocabulary.text(rng, rng.randint(80, 200)),
+                   rng.choices(("article", "video", "quiz"), (60, 25, 15))[0],
+                   rng.choice(("beginner", "intermediate", "advanced")), rng.randint(3, 30),
+                   int(rng.paretovariate(1.2) * 50), timestamp(created), timestamp(created),
+                   [self.vocabulary.word(rng, 0, 500) for _ in range(3)],
+                   f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                   int(rng.paretovariate(1.5) * 5))
+
+    def _quiz_questions(self) -> Iterator[Sequence]:
+        rng = self._rng("quiz_questions")
+        for content_id in range(1, self.volumes["educational_content"] + 1):
+            for order in range(self.volumes["quiz_questions"]):
+                options = [self.vocabulary.text(rng, rng.randint(1, 4)) for _ in range(4)]
+                yield (content_id, self.vocabulary.text(rng, rng.randint(6, 12)) + " ?", options,
+                       rng.choice(options), self.vocabulary.text(rng, 12), 10, order)
+
+    def _user_progress(self) -> Iterator[Sequence]:
+        """Progression : utilisateurs actifs et contenus populaires surreprésentés"""
+        rng = self._rng("user_progress")
+        contents = self.volumes["educational_content"]
+        popularity = list(itertools.accumulate(1.0 / rank for rank in range(1, contents + 1)))
+        max_score = 10 * self.volumes["quiz_questions"]
+        seen = set()
+        remaining = self.volumes["user_progress"]
+        attempts = 0
+        while remaining and attempts < 5 * self.volumes["user_progress"]:
+            batch = min(remaining, 50_000)
+            attempts += batch
+            for user_id, content_id in zip(self._pick(rng, self.user_weights, batch),
+                                           self._pick(rng, popularity, batch)):
+                if (user_id, content_id) in seen:
+                    continue
+                seen.add((user_id, content_id))
+                remaining -= 1
+                status = rng.choices(("completed", "in_progress", "not_started"), (50, 35, 15))[0]
+                started = rng.randint(START_TS, END_TS - DAY)
+                time_spent = rng.randint(60, 3600) if status != "not_started" else 0
+                completed = started + time_spent + rng.randint(0, 7 * DAY)
+                yield (user_id, content_id, status,
+                       rng.randint(max_score // 2, max_score) if status == "completed" else 0,
+                       time_spent, timestamp(started) if status != "not_started" else None,
+                       timestamp(min(completed, END_TS)) if status == "completed" else None,
+                       timestamp(min(completed, END_TS)),
+                       rng.randint(1, 3) if status != "not_started" else 0)
+
+    def _parenting_advice(self) -> Iterator[Sequence]:
+        rng = self._rng("parenting_advice")
+        count = self.volumes["parenting_advice"]
+        authors = self._pick(rng, self.user_weights, count)
+        for advice_id in range(1, count + 1):
+            created = self._chrono(advice_id - 1, count)
+            yield (advice_id, authors[advice_id - 1], self.vocabulary.text(rng, rng.randint(4, 8)),
+                   self.vocabulary.text(rng, rng.randint(40, 150)), rng.choice(ADVICE_CATEGORIES),
+                   rng.choice(AGE_GROUPS), [self.vocabulary.word(rng, 0, 500) for _ in range(3)],
+                   int(rng.paretovariate(1.2) * 20), timestamp(created), timestamp(created),
+                   int(rng.random() < 0.02), int(rng.paretovariate(1.5) * 3),
+                   int(rng.paretovariate(2.0)))
+
+    def _advice_comments(self) -> Iterator[Sequence]:
+        """Commentaires ; 20 % répondent au dernier commentaire du même conseil"""
+        rng = self._rng("advice_comments")
+        advices = self.volumes["parenting_advice"]
+        count = self.volumes["advice_comments"]
+        users = self._pick(rng, self.user_weights, count)
+        last_comment: Dict[int, int] = {}
+        for comment_id in range(1, count + 1):
+            advice_id = rng.randint(1, advices)
+            parent = last_comment.get(advice_id) if rng.random() < 0.2 else None
+            last_comment[advice_id] = comment_id
+            created = self._chrono(advice_id - 1, advices) + int(rng.expovariate(1 / (2 * DAY)))
+            yield (comment_id, advice_id, users[comment_id - 1],
+                   self.vocabulary.text(rng, rng.randint(5, 30)), timestamp(min(created, END_TS)),
+                   int(rng.paretovariate(2.0)) - 1, parent)
+
+    # =============================================
+    # ACTIVITÉ
+    # =============================================
+
+    def _target(self, rng: random.Random, target_type: str) -> int:
+        """Identifiant existant pour un type de cible"""
+        table = {"content": "educational_content", "advice": "parenting_advice",
+                 "alert": "community_alerts", "user": "users", "comment": "advice_comments",
+                 "message": "messages"}[target_type]
+        return rng.randint(1, self.volumes[table])
+
+    def _user_interactions(self) -> Iterator[Sequence]:
+        rng = self._rng("user_interactions")
+        count = self.volumes["user_interactions"]
+        for chunk_start in range(0, count, 100_000):
+            chunk = self._pick(rng, self.user_weights, min(100_000, count - chunk_start))
+            for offset, user_id in enumerate(chunk):
+                interaction = rng.choices(("view", "like", "share", "comment"), (70, 18, 4, 8))[0]
+                target_type = rng.choices(("content", "advice", "alert"), (40, 35, 25))[0]
+                data = ({"source": rng.choice(("feed", "search", "notification")),
+                         "duration": rng.randint(5, 600)} if interaction == "view" else None)
+                yield (user_id, interaction, self._target(rng, target_type), target_type, data,
+                       timestamp(self._chrono(chunk_start + offset, count)))
+
+    def _ratings(self) -> Iterator[Sequence]:
+        """Notes uniques par (utilisateur, cible) sur les contenus, conseils et parents"""
+        rng = self._rng("ratings")
+        count = self.volumes["ratings"]
+        seen = set()
+        users = self._pick(rng, self.user_weights, count)
+        for user_id in users:
+            target_type = rng.choices(("content", "advice", "user"), (50, 30, 20))[0]
+            target_id = self._target(rng, target_type)
+            if (user_id, target_id, target_type) in seen or \
+                    (target_type == "user" and target_id == user_id):
+                continue
+            seen.add((user_id, target_id, target_type))
+            yield (user_id, target_id, target_type,
+                   float(rng.choices((1, 2, 3, 4, 5), (5, 5, 15, 35, 40))[0]),
+                   self.vocabulary.text(rng, rng.randint(5, 25)) if rng.random() < 0.3 else None,
+                   timestamp(rng.randint(START_TS, END_TS)), int(rng.random() < 0.1))
+
+    def _notifications(self) -> Iterator[Sequence]:
+        """Notifications chronologiques ; les plus anciennes sont presque toutes lues"""
+        rng = self._rng("notifications")
+        count = self.volumes["notifications"]
+        week_ago = END_TS - 7 * DAY
+        for chunk_start in range(0, count, 100_000):
+            chunk = self._pick(rng, self.user_weights, min(100_000, count - chunk_start))
+            for offset, user_id in enumerate(chunk):
+                created = self._chrono(chunk_start + offset, count)
+                kind = rng.choices(NOTIFICATION_TYPES, (25, 40, 15, 15, 5))[0]
+                if kind == "alert":
+                    data = {"alert_id": self._target(rng, "alert")}
+                elif kind == "message":
+                    data = {"conversation_id": rng.randint(1, len(self.members) - 1)}
+                elif kind == "advice":
+                    data = {"advice_id": self._target(rng, "advice")}
+                elif kind == "connection":
+                    data = {"user_id": self._target(rng, "user")}
+                else:
+                    data = None
+                is_read = rng.random() < (0.95 if created < week_ago else 0.4)
+                read_at = min(END_TS, created + int(rng.expovariate(1 / 3600.0)))
+                yield (user_id, f"Notification {kind}", self.vocabulary.text(rng, rng.randint(5, 15)),
+                       kind, data, int(is_read), timestamp(created),
+                       timestamp(read_at) if is_read else None,
+                       "high" if kind == "alert" else "normal")
+
+    def _reports(self) -> Iterator[Sequence]:
+        rng = self._rng("reports")
+        count = self.volumes["reports"]
+        reporters = self._pick(rng, self.user_weights, count)
+        for reporter_id in reporters:
+            target_type = rng.choices(("alert", "message", "advice", "comment", "user"),
+                                      (30, 25, 15, 15, 15))[0]
+            created = rng.randint(START_TS, END_TS)
+            status = rng.choices(("pending", "reviewed", "dismissed"), (60, 25, 15))[0]
+            reviewed = status != "pending"
+            yield (reporter_id, self._target(rng, target_type), target_type,
+                   rng.choice(REPORT_REASONS),
+                   self.vocabulary.text(rng, rng.randint(5, 20)) if rng.random() < 0.5 else None,
+                   status, timestamp(created),
+                   rng.randint(1, self.volumes["users"]) if reviewed else None,
+                   timestamp(min(END_TS, created + rng.randint(3600, 3 * DAY))) if reviewed else None,
+                   rng.choice(("content_removed", "warning", "none")) if status == "reviewed" else None)
+
+    def _update_derived_columns(self):
+        """Recalcule les colonnes dérivées des tables générées (ensembliste, un GROUP BY par colonne)"""
+        conn = self.db_helper.connect()
+        # Alertes historiques : considérées comme déjà diffusées
+        conn.execute("UPDATE alert_fanout SET status = 'done', finished_at = queued_at")
+        # Connexions chargées d'un bloc : les instantanés du graphe partent de la table
+        conn.execute("DELETE FROM connection_changes")
+        # Les moyennes des notes sont maintenues par trigger (rating_aggregates)
+        conn.execute('''
+            UPDATE help_requests SET responses_count = agg.total
+            FROM (SELECT request_id, COUNT(*) AS total FROM help_responses GROUP BY request_id) AS agg
+            WHERE agg.request_id = help_requests.id
+        ''')
+        conn.commit()
+
+
+def generate_database(db_path: str, scale: float = 1.0, seed: int = 42,
+                      verbose: bool = True) -> Dict[str, int]:
+    """
+    Crée une base au schéma courant et la remplit de données synthétiques
+
+    Args:
+        db_path: Chemin de la base à créer (ne doit pas contenir d'utilisateurs)
+        scale: Facteur appliqué aux volumes de SyntheticDataGenerator.VOLUMES
+        seed: Graine du générateur
+        verbose: Affiche la progression
+
+    Returns:
+        Nombre de lignes insérées par table
+    """
+    db_helper = DatabaseHelper(db_path)
+    try:
+        db_helper.create_tables()
+        return SyntheticDataGenerator(db_helper, scale=scale, seed=seed, verbose=verbose).generate()
+    finally:
+        db_helper.close()
+
+
+def main():
+    """Point d'entrée en ligne de commande"""
+    parser = argparse.ArgumentParser(description="Génère une base Child Security synthétique")
+    parser.add_argument("db_path", help="Base à créer")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Facteur de volume (1.0 : 100k utilisateurs, 2M messages)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if os.path.exists(args.db_path):
+        parser.error(f"{args.db_path} existe déjà")
+    counts = generate_database(args.db_path, scale=args.scale, seed=args.seed)
+    print(f"\n📊 {args.db_path} ({os.path.getsize(args.db_path) / 1e6:.1f} Mo)")
+    for table, rows in counts.items():
+        print(f"  - {table}: {rows}")
+
+
+if __name__ == "__main__":
+    main()
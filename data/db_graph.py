@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Graphe des connexions entre parents en mémoire
+
+Les connexions acceptées (parent_connections) sont chargées dans un
+instantané CSR : pour chaque utilisateur, ses voisins occupent une plage
+contiguë de tableaux compacts (array). Les parcours à deux sauts (amis
+d'amis, connexions communes, suggestions) ne font alors plus aucune
+auto-jointure SQL.
+
+L'instantané est tenu à jour par refresh() : les changements journalisés
+par trigger dans connection_changes (migration 7) sont appliqués à une
+couche de modifications, refondue dans le CSR lorsqu'elle devient trop
+volumineuse.
+"""
+
+import heapq
+import math
+import threading
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from db_setting import DatabaseHelper, haversine_m
+
+# Note de confiance maximale (parent_connections.trust_score)
+MAX_TRUST = 5.0
+
+
+class ConnectionGraph:
+    """Instantané CSR des connexions acceptées, mis à jour incrémentalement"""
+
+    # Distance (mètres) à laquelle la proximité divise le score par deux
+    PROXIMITY_SCALE_M = 10000.0
+
+    # Facteur de proximité d'un utilisateur sans position connue
+    UNKNOWN_PROXIMITY = 0.5
+
+    def __init__(self, db_helper: DatabaseHelper, compact_ratio: float = 0.1):
+        """
+        Initialise le graphe (l'instantané est chargé par load())
+
+        Args:
+            db_helper: Accès à la base (une connexion par thread en mode pool)
+            compact_ratio: Part de modifications (par rapport au nombre
+                           d'arêtes) au-delà de laquelle refresh() refond le CSR
+        """
+        self.db_helper = db_helper
+        self.compact_ratio = compact_ratio
+        self.seq = 0
+        # CSR : voisins de u = targets[offsets[u]:offsets[u + 1]] (triés)
+        self._offsets = array("q", [0])
+        self._targets = array("i")
+        self._trust = array("d")
+        # Couche de modifications : u -> {v: confiance, ou None si retirée}
+        self._delta: Dict[int, Dict[int, Optional[float]]] = {}
+        self._delta_edges = 0
+        self._latitudes = array("d")
+        self._longitudes = array("d")
+        self._lock = threading.RLock()
+
+    # =============================================
+    # CHARGEMENT ET MISE À JOUR
+    # =============================================
+
+    def load(self) -> "ConnectionGraph":
+        """
+        Charge l'instantané complet
+
+        Les deux sens de chaque arête sont lus déjà triés par (source, cible)
+        grâce aux index couvrants d'adjacence : le CSR est rempli en une passe.
+        Arêtes et séquence du journal sont lues dans la même transaction.
+        """
+        conn = self.db_helper.connect()
+        if conn.in_transaction:
+            conn.commit()
+        offsets, targets, trust = array("q", [0]), array("i"), array("d")
+        conn.execute("BEGIN")
+        try:
+            # Séquence AUTOINCREMENT : sans trou, même après une purge du journal
+            seq = conn.execute('''
+                SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'connection_changes'
+            ''').fetchone()[0]
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute('''
+                SELECT user1_id, user2_id, trust_score FROM parent_connections
+                WHERE status = 'accepted'
+                UNION ALL
+                SELECT user2_id, user1_id, trust_score FROM parent_connections
+                WHERE status = 'accepted'
+                ORDER BY 1, 2
+            ''')
+            source = 0
+            for user_id, other_id, score in cursor:
+                if user_id != source:
+                    # Utilisateurs sans connexion entre source et user_id
+                    offsets.extend([len(targets)] * (user_id - source))
+                    source = user_id
+                targets.append(other_id)
+                trust.append(score if score is not None else 0.0)
+            offsets.append(len(targets))
+            latitudes, longitudes = self._read_positions(conn, 0, array("d"), array("d"))
+        finally:
+            conn.commit()
+        with self._lock:
+            self._offsets, self._targets, self._trust = offsets, targets, trust
+            self._latitudes, self._longitudes = latitudes, longitudes
+            self._delta = {}
+            self._delta_edges = 0
+            self.seq = seq
+        return self
+
+    @staticmethod
+    def _read_positions(conn, after_id: int, latitudes: array,
+                        longitudes: array) -> Tuple[array, array]:
+        """Complète les positions (indexées par identifiant) des utilisateurs d'id > after_id"""
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute("SELECT id, latitude, longitude FROM users WHERE id > ? ORDER BY id",
+                       (after_id,))
+        for user_id, latitude, longitude in cursor:
+            if user_id >= len(latitudes):
+                missing = user_id + 1 - len(latitudes)
+                latitudes.extend([math.nan] * missing)
+                longitudes.extend([math.nan] * missing)
+            if latitude is not None and longitude is not None:
+                latitudes[user_id] = latitude
+                longitudes[user_id] = longitude
+        return latitudes, longitudes
+
+    def refresh(self) -> int:
+        """
+        Applique les changements journalisés depuis le dernier chargement
+
+        Si le journal a été purgé au-delà de la séquence de l'instantané
+        (voir DatabaseHelper.prune_connection_changes), l'instantané est
+        rechargé entièrement. Les positions des nouveaux utilisateurs sont
+        ajoutées ; celles des utilisateurs existants ne changent qu'au
+        prochain load().
+
+        Returns:
+            Nombre de changements appliqués (-1 en cas de rechargement complet)
+        """
+        conn = self.db_helper.connect()
+        if conn.in_transaction:
+            conn.commit()
+        oldest = conn.execute("SELECT MIN(seq) FROM connection_changes").fetchone()[0]
+        if oldest is not None and oldest > self.seq + 1:
+            self.load()
+            return -1
+        rows = conn.execute('''
+            SELECT seq, user1_id, user2_id, trust_score, accepted FROM connection_changes
+            WHERE seq > ? ORDER BY seq
+        ''', (self.seq,)).fetchall()
+        with self._lock:
+            for row in rows:
+                score = (row["trust_score"] or 0.0) if row["accepted"] else None
+                self._set_edge(row["user1_id"], row["user2_id"], score)
+                self._set_edge(row["user2_id"], row["user1_id"], score)
+            if rows:
+                self.seq = rows[-1]["seq"]
+                self._read_positions(conn, len(self._latitudes) - 1,
+                                     self._latitudes, self._longitudes)
+            if self._delta_edges > self.compact_ratio * max(len(self._targets), 1):
+                self.compact()
+        conn.commit()
+        return len(rows)
+
+    def _set_edge(self, user_id: int, other_id: int, trust: Optional[float]):
+        """Enregistre l'état d'une arête orientée dans la couche de modifications"""
+        changes = self._delta.setdefault(user_id, {})
+        if other_id not in changes:
+            self._delta_edges += 1
+        changes[other_id] = trust
+
+    def compact(self):
+        """Refond la couche de modifications dans un nouveau CSR"""
+        with self._lock:
+            if not self._delta:
+                return
+            offsets, targets, trust = array("q", [0]), array("i"), array("d")
+            last = max(len(self._offsets) - 2, max(self._delta))
+            for user_id in range(1, last + 1):
+                offsets.append(len(targets))
+                for other_id, score in sorted(self.neighbors(user_id).items()):
+                    targets.append(other_id)
+                    trust.append(score)
+            offsets.append(len(targets))
+            self._offsets, self._targets, self._trust = offsets, targets, trust
+            self._delta = {}
+            self._delta_edges = 0
+
+    # =============================================
+    # REQUÊTES
+    # =============================================
+
+    @property
+    def edge_count(self) -> int:
+        """Nombre de connexions acceptées (arêtes non orientées)"""
+        with self._lock:
+            if not self._delta:
+                return len(self._targets) // 2
+            return sum(len(self.neighbors(user_id))
+                       for user_id in range(1, max(len(self._offsets) - 2, max(self._delta)) + 1)
+                       ) // 2
+
+    def neighbors(self, user_id: int) -> Dict[int, float]:
+        """Connexions acceptées d'un utilisateur : {identifiant: trust_score}"""
+        with self._lock:
+            result: Dict[int, float] = {}
+            if 0 < user_id < len(self._offsets) - 1:
+                start, end = self._offsets[user_id], self._offsets[user_id + 1]
+                result = dict(zip(self._targets[start:end], self._trust[start:end]))
+            changes = self._delta.get(user_id)
+            if changes:
+                for other_id, score in changes.items():
+                    if score is None:
+                        result.pop(other_id, None)
+                    else:
+                        result[other_id] = score
+            return result
+
+    def mutual_connections(self, user_id: int, other_id: int) -> List[int]:
+        """Identifiants des connexions communes à deux utilisateurs (triés)"""
+        first, second = self.neighbors(user_id), self.neighbors(other_id)
+        if len(first) > len(second):
+            first, second = second, first
+        return sorted(user for user in first if user in second)
+
+    def distance_m(self, user_id: int, other_id: int) -> Optional[float]:
+        """Distance entre deux utilisateurs, ou None si une position est inconnue"""
+        if max(user_id, other_id) >= len(self._latitudes):
+            return None
+        lat1, lon1 = self._latitudes[user_id], self._longitudes[user_id]
+        lat2, lon2 = self._latitudes[other_id], self._longitudes[other_id]
+        if math.isnan(lat1) or math.isnan(lat2):
+            return None
+        return haversine_m(lat1, lon1, lat2, lon2)
+
+    def suggest_connections(self, user_id: int, k: int = 10,
+                            max_distance_m: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Suggère des parents à connecter (amis d'amis)
+
+        Chaque chemin u - m - c compte (confiance(u, m) / 5) x (confiance(m, c) / 5) ;
+        la somme est multipliée par un facteur de proximité
+        PROXIMITY_SCALE_M / (PROXIMITY_SCALE_M + distance). Les utilisateurs
+        ayant déjà une connexion avec user_id, quel que soit son statut
+        (demande en attente, blocage), sont exclus.
+
+        Args:
+            user_id: Utilisateur à qui faire des suggestions
+            k: Nombre de suggestions
+            max_distance_m: Exclut les candidats plus éloignés (ou sans position)
+
+        Returns:
+            Liste de {"user_id", "score", "mutual_count", "distance_m"} par score décroissant
+        """
+        direct = self.neighbors(user_id)
+        paths: Dict[int, float] = {}
+        mutual: Dict[int, int] = {}
+        for middle, first_trust in direct.items():
+            weight = first_trust / MAX_TRUST
+            for candidate, second_trust in self.neighbors(middle).items():
+                if candidate == user_id or candidate in direct:
+                    continue
+                paths[candidate] = paths.get(candidate, 0.0) + weight * second_trust / MAX_TRUST
+                mutual[candidate] = mutual.get(candidate, 0) + 1
+
+        scored = []
+        for candidate, path_score in paths.items():
+            distance = self.distance_m(user_id, candidate)
+            if distance is None:
+                if max_distance_m is not None:
+                    continue
+                proximity = self.UNKNOWN_PROXIMITY
+            else:
+                if max_distance_m is not None and distance > max_distance_m:
+                    continue
+                proximity = self.PROXIMITY_SCALE_M / (self.PROXIMITY_SCALE_M + distance)
+            scored.append((path_score * proximity, candidate, distance))
+
+        # Les demandes en attente et blocages ne sont pas dans le graphe :
+        # on vérifie en base un surplus de candidats
+        suggestions: List[Dict[str, Any]] = []
+        remaining = scored
+        while remaining and len(suggestions) < k:
+            best = heapq.nlargest(2 * (k - len(suggestions)), remaining)
+            linked = set(self.db_helper.get_linked_users(user_id, [c for _, c, _ in best]))
+            for score, candidate, distance in best:
+                if candidate not in linked and len(suggestions) < k:
+                    suggestions.append({
+                        "user_id": candidate,
+                        "score": round(score, 6),
+                        "mutual_count": mutual[candidate],
+                        "distance_m": round(distance) if distance is not None else None,
+                    })
+            taken = {candidate for _, candidate, _ in best}
+            remaining = [item for item in remaining if item[1] not in taken]
+        return suggestions
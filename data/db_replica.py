@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Réplicas en lecture seule de la base Child Security
+
+Un ReplicaManager rafraîchit périodiquement des copies de la base par
+sauvegarde en ligne (DatabaseHelper.backup) et les sert aux lectures
+routées par DatabaseHelper.read_connection (classements, recherche,
+tableaux de bord). Les écritures et les lectures qui doivent voir les
+écritures récentes restent sur la base principale.
+
+Chaque réplica est un fichier autonome remplacé par renommage à chaque
+rafraîchissement : les connexions ouvertes continuent de lire l'ancienne
+copie jusqu'à leur prochain usage, puis rouvrent la nouvelle. Les fichiers
+n'étant jamais modifiés en place, ils sont ouverts en immutable=1 : les
+lectures ne prennent aucun verrou et ne touchent ni au WAL ni à la mémoire
+partagée de la base principale.
+"""
+
+import itertools
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+from db_setting import ConnectionPool, DatabaseHelper, open_connection
+
+logger = logging.getLogger("child_security.replica")
+
+# PRAGMAs des connexions de lecture (sans effet d'écriture)
+READ_PRAGMAS = ("cache_size", "mmap_size", "temp_store")
+
+
+class ReplicaManager:
+    """Copies en lecture seule rafraîchies en arrière-plan et routage des lectures"""
+
+    def __init__(self, db_helper: DatabaseHelper, replicas: int = 2, interval: float = 60.0,
+                 replica_dir: Optional[str] = None, max_age: Optional[float] = None,
+                 pages: int = 1024, sleep: float = 0.0):
+        """
+        Initialise le gestionnaire (aucune copie n'est faite avant start() ou refresh())
+
+        Args:
+            db_helper: Accès à la base principale ; ses lectures routées
+                       utilisent les réplicas une fois le gestionnaire attaché
+            replicas: Nombre de copies (les threads lecteurs sont répartis entre elles)
+            interval: Délai entre deux rafraîchissements (secondes)
+            replica_dir: Dossier des copies (par défaut celui de la base)
+            max_age: Âge maximal d'une copie servie (secondes) ; au-delà, les
+                     lectures reviennent sur la base principale (par défaut illimité)
+            pages, sleep: Paramètres de la sauvegarde incrémentale (voir backup)
+        """
+        if replicas < 1:
+            raise ValueError("replicas doit être supérieur ou égal à 1")
+        self.db_helper = db_helper
+        self.interval = interval
+        self.max_age = max_age
+        self.pages = pages
+        self.sleep = sleep
+        directory = replica_dir or os.path.dirname(os.path.abspath(db_helper.db_path))
+        name = os.path.splitext(os.path.basename(db_helper.db_path))[0]
+        self.paths = [os.path.join(directory, f"{name}.replica{index}.db")
+                      for index in range(replicas)]
+        self.generation = 0
+        self.refreshed_at: Optional[float] = None
+        self.stats = {"refreshes": 0, "errors": 0, "last_seconds": 0.0, "bytes": 0}
+        self._local = threading.local()
+        self._assign = itertools.count()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "ReplicaManager":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """Fait une première copie, attache le gestionnaire et lance le rafraîchissement"""
+        if self._thread is not None:
+            return
+        if self.generation == 0:
+            self.refresh()
+        self.db_helper.replicas = self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="replica-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Détache le gestionnaire, arrête le rafraîchissement et ferme les connexions"""
+        if self.db_helper.replicas is self:
+            self.db_helper.replicas = None
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        with self._lock:
+            connections, self._connections = self._connections, []
+            # Les connexions par thread seront rouvertes après un nouveau start()
+            self.generation += 1
+        for connection in connections:
+            connection.close()
+
+    def remove_files(self):
+        """Supprime les copies (après stop())"""
+        for path in self.paths:
+            for candidate in (path, f"{path}.tmp"):
+                if os.path.exists(candidate):
+                    os.unlink(candidate)
+
+    def refresh(self) -> Dict[str, Any]:
+        """
+        Rafraîchit toutes les copies
+
+        Une seule sauvegarde en ligne de la base principale est faite ; les
+        autres copies en sont dupliquées au niveau fichier, sans nouvelle
+        lecture de la base principale.
+
+        Returns:
+            Statistiques de la sauvegarde (voir DatabaseHelper.backup) ;
+            "seconds" inclut la duplication des copies
+        """
+        with self._refresh_lock:
+            start = time.perf_counter()
+            first = self.paths[0]
+            os.makedirs(os.path.dirname(first), exist_ok=True)
+            stats = self.db_helper.backup(first, pages=self.pages, sleep=self.sleep)
+            for path in self.paths[1:]:
+                shutil.copyfile(first, f"{path}.tmp")
+                os.replace(f"{path}.tmp", path)
+            stats["seconds"] = time.perf_counter() - start
+            self.refreshed_at = time.time()
+            self.generation += 1
+            self.stats["refreshes"] += 1
+            self.stats["last_seconds"] = stats["seconds"]
+            self.stats["bytes"] = stats["bytes"]
+            return stats
+
+    def age(self) -> Optional[float]:
+        """Âge (secondes) des copies servies, None avant la première copie"""
+        return None if self.refreshed_at is None else time.time() - self.refreshed_at
+
+    def connection(self) -> Optional[sqlite3.Connection]:
+        """
+        Connexion en lecture seule du thread courant sur sa copie
+
+        Chaque thread est affecté à une copie (tourniquet) et garde sa
+        connexion jusqu'au rafraîchissement suivant. Retourne None si aucune
+        copie n'est disponible ou si elle dépasse max_age.
+        """
+        age = self.age()
+        if age is None or (self.max_age is not None and age > self.max_age):
+            return None
+        local = self._local
+        generation = self.generation
+        if getattr(local, "generation", None) != generation:
+            previous = getattr(local, "connection", None)
+            if previous is not None:
+                with self._lock:
+                    if previous in self._connections:
+                        self._connections.remove(previous)
+                previous.close()
+            if not hasattr(local, "index"):
+                local.index = next(self._assign) % len(self.paths)
+            local.connection = self._open(self.paths[local.index])
+            local.generation = generation
+        return local.connection
+
+    def _open(self, path: str) -> sqlite3.Connection:
+        """Ouvre une copie en lecture seule, sans verrouillage (immutable)"""
+        connection = open_connection(f"file:{quote(os.path.abspath(path))}?mode=ro&immutable=1",
+                                     self.db_helper.query_stats, uri=True,
+                                     check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        for name in READ_PRAGMAS:
+            connection.execute(f"PRAGMA {name} = {ConnectionPool.DEFAULT_PRAGMAS[name]}")
+        with self._lock:
+            self._connections.append(connection)
+        return connection
+
+    def _run(self):
+        """Boucle de rafraîchissement : une copie toutes les interval secondes"""
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception:
+                # Disque plein, base verrouillée... : les lecteurs gardent l'ancienne copie
+                self.stats["errors"] += 1
+                logger.exception("Échec du rafraîchissement des réplicas")
@@ -6,39 +6,1162 @@ Script de création de base de données pour l'application Child Security
 
 import sqlite3
 import os
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+import functools
+import io
+import logging
+import csv
+import json
+import glob
+import time
+import math
+import re
+import queue
+import threading
+import sys
+import weakref
+from collections import OrderedDict, deque
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime, timezone, timedelta
+from typing import Optional, List, Dict, Any, Tuple, Union, Iterator, Iterable, Callable, Sequence
+
+# Rayon moyen de la Terre (mètres), utilisé pour les calculs de distance
+EARTH_RADIUS_M = 6371008.8
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distance orthodromique en mètres entre deux points (formule de haversine)"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distance_from(lat: float, lon: float) -> Callable[[float, float], float]:
+    """
+    Distance de haversine (mètres) depuis un point fixe
+    
+    Les termes du point d'origine sont calculés une fois : à utiliser pour
+    raffiner de nombreux candidats autour du même point.
+    """
+    phi1 = math.radians(lat)
+    cos_phi1 = math.cos(phi1)
+    radians, sin, cos = math.radians, math.sin, math.cos
+    
+    def distance(lat2: float, lon2: float) -> float:
+        phi2 = radians(lat2)
+        a = sin((phi2 - phi1) / 2) ** 2 + cos_phi1 * cos(phi2) * sin(radians(lon2 - lon) / 2) ** 2
+        return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+    
+    return distance
+
+
+def bounding_box(lat: float, lon: float, radius_m: float) -> Tuple[float, float, List[Tuple[float, float]]]:
+    """
+    Calcule la boîte englobante d'un cercle de rayon donné
+    
+    Returns:
+        (lat_min, lat_max, plages de longitude) - la plage de longitude est
+        découpée en deux lorsque le cercle traverse l'antiméridien
+    """
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    lat_min = max(-90.0, lat - dlat)
+    lat_max = min(90.0, lat + dlat)
+    
+    # Près des pôles, le cercle couvre toutes les longitudes
+    cos_lat = math.cos(math.radians(max(abs(lat_min), abs(lat_max))))
+    if lat_max >= 90.0 or lat_min <= -90.0 or cos_lat < 1e-9:
+        return lat_min, lat_max, [(-180.0, 180.0)]
+    
+    dlon = math.degrees(radius_m / (EARTH_RADIUS_M * cos_lat))
+    if dlon >= 180.0:
+        return lat_min, lat_max, [(-180.0, 180.0)]
+    
+    lon_min = lon - dlon
+    lon_max = lon + dlon
+    if lon_min < -180.0:
+        return lat_min, lat_max, [(lon_min + 360.0, 180.0), (-180.0, lon_max)]
+    if lon_max > 180.0:
+        return lat_min, lat_max, [(lon_min, 180.0), (-180.0, lon_max - 360.0)]
+    return lat_min, lat_max, [(lon_min, lon_max)]
+
+
+def encode_json(value: Any) -> Optional[str]:
+    """
+    Encode une valeur en JSON compact pour les colonnes JSON stockées en TEXT
+    
+    Pas d'espace après les séparateurs et caractères non ASCII non échappés :
+    c'est la forme produite par les fonctions JSON de SQLite (json(),
+    json_patch()...), les valeurs restent donc lisibles par json_extract.
+    None est stocké comme NULL.
+    """
+    if value is None:
+        return None
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def sqlite_sort_key(value: Any) -> Tuple[int, Any]:
+    """
+    Clé de tri Python reproduisant l'ordre de SQLite entre types différents
+    
+    NULL < nombres < texte < BLOB : des lignes triées par SQLite dans
+    plusieurs bases restent comparables une fois fusionnées, même si une
+    colonne mélange NULL, entiers et chaînes.
+    """
+    if value is None:
+        return 0, 0
+    if isinstance(value, (int, float)):
+        return 1, value
+    if isinstance(value, str):
+        return 2, value
+    return 3, bytes(value)
+
+
+class _ThreadPin:
+    """Jeton d'une connexion attachée à un thread, détruit avec le thread"""
+    __slots__ = ("__weakref__",)
+
+
+class ConnectionPool:
+    """
+    Pool borné de connexions SQLite en mode WAL
+    
+    Les connexions sont créées à la demande jusqu'à `size`, puis réutilisées.
+    Un thread qui a déjà emprunté une connexion la récupère lors d'un nouvel
+    emprunt (emprunts imbriqués), ce qui évite les interblocages. Une
+    connexion attachée par pin() est rendue au pool par release(), ou à la
+    fin du thread qui la détient.
+    """
+    
+    # PRAGMAs appliqués à chaque connexion du pool
+    DEFAULT_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000,       # 16 Mo par connexion
+        "mmap_size": 268435456,     # 256 Mo
+        "busy_timeout": 5000,       # millisecondes
+        "temp_store": "MEMORY",
+    }
+    
+    def __init__(self, db_path: str, size: int = 8,
+                 pragmas: Optional[Dict[str, Any]] = None, timeout: float = 30.0,
+                 query_stats: Optional["QueryStats"] = None):
+        """
+        Initialise le pool (aucune connexion n'est ouverte immédiatement)
+        
+        Args:
+            db_path: Chemin vers le fichier de base de données
+            size: Nombre maximal de connexions ouvertes
+            pragmas: PRAGMAs à appliquer en plus de DEFAULT_PRAGMAS
+            timeout: Délai maximal d'attente d'une connexion libre (secondes)
+            query_stats: Si fourni, les connexions sont instrumentées (voir QueryStats)
+        """
+        if size < 1:
+            raise ValueError("size doit être supérieur ou égal à 1")
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self.query_stats = query_stats
+        self.pragmas = dict(self.DEFAULT_PRAGMAS)
+        self.pragmas.update(pragmas or {})
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._all: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    def _open(self) -> sqlite3.Connection:
+        """Ouvre et configure une nouvelle connexion"""
+        connection = open_connection(self.db_path, self.query_stats,
+                                     timeout=self.pragmas["busy_timeout"] / 1000.0,
+                                     check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            connection.execute(f"PRAGMA {name} = {value}")
+        return connection
+    
+    def checkout(self) -> sqlite3.Connection:
+        """Emprunte une connexion (bloque si toutes sont utilisées)"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._all) < self.size:
+                connection = self._open()
+                self._all.append(connection)
+                return connection
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"Aucune connexion libre après {self.timeout} s") from None
+    
+    def checkin(self, connection: sqlite3.Connection):
+        """Rend une connexion au pool (la transaction en cours est annulée)"""
+        with self._lock:
+            owned = connection in self._all
+        if not owned:
+            # Connexion ouverte avant un close() du pool
+            connection.close()
+            return
+        if connection.in_transaction:
+            connection.rollback()
+        self._idle.put(connection)
+    
+    def current(self) -> Optional[sqlite3.Connection]:
+        """Connexion actuellement empruntée par le thread courant"""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and connection not in self._all:
+            self._local.connection = None
+            return None
+        return connection
+    
+    @contextmanager
+    def acquire(self) -> Iterator[sqlite3.Connection]:
+        """
+        Prête une connexion au thread courant le temps d'un bloc `with`
+        
+        La transaction est validée en sortie de bloc, ou annulée si une
+        exception est levée.
+        """
+        connection = self.current()
+        if connection is not None:
+            # Emprunt imbriqué : la connexion extérieure gère la transaction
+            yield connection
+            return
+        
+        connection = self.checkout()
+        self._local.connection = connection
+        try:
+            yield connection
+            if connection.in_transaction:
+                connection.commit()
+        except BaseException:
+            if connection.in_transaction:
+                connection.rollback()
+            raise
+        finally:
+            self._local.connection = None
+            self.checkin(connection)
+    
+    def pin(self) -> sqlite3.Connection:
+        """
+        Attache durablement une connexion au thread courant (voir release)
+        
+        Le jeton rangé dans le stockage local du thread est libéré quand le
+        thread se termine : son finaliseur rend alors la connexion au pool.
+        """
+        connection = self.current()
+        if connection is None:
+            connection = self.checkout()
+            self._local.connection = connection
+            self._local.pin = _ThreadPin()
+            self._local.unpin = weakref.finalize(self._local.pin, self.checkin, connection)
+        return connection
+    
+    def release(self):
+        """Rend la connexion attachée au thread courant par pin()"""
+        unpin = getattr(self._local, "unpin", None)
+        if unpin is not None:
+            self._local.connection = None
+            self._local.pin = self._local.unpin = None
+            unpin()
+    
+    def close(self):
+        """
+        Ferme les connexions libres du pool
+        
+        Les connexions encore empruntées sont fermées lorsqu'elles sont rendues.
+        Le pool reste utilisable : de nouvelles connexions seront ouvertes.
+        """
+        with self._lock:
+            self._all.clear()
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class LRUCache:
+    """
+    Cache LRU borné avec expiration (TTL), sûr entre threads
+    
+    Les entrées les moins récemment utilisées sont évincées au-delà de
+    `max_size` ; une entrée plus ancienne que `ttl` secondes est considérée
+    comme absente.
+    """
+    
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = 300.0):
+        """
+        Args:
+            max_size: Nombre maximal d'entrées (0 désactive le cache)
+            ttl: Durée de vie d'une entrée en secondes (None : pas d'expiration)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key: Tuple) -> Tuple[bool, Any]:
+        """Retourne (trouvé, valeur)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return False, None
+    
+    def put(self, key: Tuple, value: Any):
+        """Ajoute ou remplace une entrée"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, namespace: str, key: Any = None):
+        """Supprime une entrée (namespace, key), ou tout le namespace si key est None"""
+        with self._lock:
+            if key is not None:
+                self._entries.pop((namespace, key), None)
+                return
+            for cached_key in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[cached_key]
+    
+    def clear(self):
+        """Vide le cache"""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques de succès / échecs du cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+# Journal des requêtes lentes (voir QueryStats)
+logger = logging.getLogger("child_security.db")
+
+# Instructions de la VM SQLite entre deux appels du compteur de travail
+PROGRESS_STEP = 1000
+
+# Instructions dont le plan d'exécution peut être demandé
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+def explain_query_plan(connection: sqlite3.Connection, sql: str,
+                       params: Any = ()) -> List[str]:
+    """Plan d'exécution (EXPLAIN QUERY PLAN) indenté, une ligne par nœud"""
+    depth = {0: -1}
+    lines = []
+    # Curseur brut : le plan n'est pas lui-même mesuré par l'instrumentation
+    for node_id, parent, _, detail in sqlite3.Cursor(connection).execute(
+            f"EXPLAIN QUERY PLAN {sql}", params):
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+def plan_warnings(plan: List[str]) -> List[str]:
+    """Nœuds d'un plan qui trahissent un index manquant (parcours complet, tri temporaire)"""
+    warnings = []
+    for line in plan:
+        detail = line.strip()
+        if detail.startswith("SCAN ") and "VIRTUAL TABLE" not in detail:
+            warnings.append(detail)
+        elif detail.startswith("USE TEMP B-TREE"):
+            warnings.append(detail)
+    return warnings
+
+
+@functools.lru_cache(maxsize=4096)
+def statement_template(sql: str) -> str:
+    """
+    Modèle d'une instruction : littéraux remplacés par "?", espaces normalisés
+
+    "SELECT * FROM users WHERE id IN (1, 2, 3)" et "... IN (7)" partagent
+    le modèle "SELECT * FROM users WHERE id IN (?, ...)".
+    """
+    template = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    template = re.sub(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b", "?", template)
+    template = " ".join(template.split())
+    template = re.sub(r"\(\s*\?(?:\s*,\s*\?)*\s*\)", "(?, ...)", template)
+    return re.sub(r"(\(\?, \.\.\.\))(?:\s*,\s*\(\?, \.\.\.\))+", r"\1, ...", template)
+
+
+class QueryStats:
+    """
+    Métriques d'exécution des requêtes, agrégées par modèle d'instruction
+    
+    Alimentées par les connexions InstrumentedConnection : nombre d'appels,
+    temps total (exécution et lecture des lignes), p95 sur une fenêtre des
+    derniers appels, lignes lues et travail de la VM. Les instructions plus
+    lentes que `slow_ms` sont journalisées avec leur plan d'exécution.
+    Sûr entre threads ; une même instance peut être partagée par plusieurs
+    helpers.
+    """
+    
+    def __init__(self, slow_ms: Optional[float] = None, window: int = 1024, max_slow: int = 100):
+        """
+        Args:
+            slow_ms: Seuil (ms) du journal des requêtes lentes (None : désactivé)
+            window: Nombre de mesures récentes conservées par modèle pour le p95
+            max_slow: Nombre de requêtes lentes conservées en mémoire
+        """
+        self.slow_ms = slow_ms
+        self.window = window
+        self._statements: Dict[str, Dict[str, Any]] = {}
+        self._slow: "deque[Dict[str, Any]]" = deque(maxlen=max_slow)
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+    
+    def record(self, connection: sqlite3.Connection, sql: str, params: Any, seconds: float,
+               rows: int = 0, steps: int = 0):
+        """Enregistre une exécution (appelé par InstrumentedCursor)"""
+        template = statement_template(sql)
+        elapsed_ms = seconds * 1000.0
+        with self._lock:
+            entry = self._statements.get(template)
+            if entry is None:
+                entry = self._statements[template] = {
+                    "count": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0, "vm_steps": 0,
+                    "recent": deque(maxlen=self.window), "example": (sql, params),
+                }
+            entry["count"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["rows"] += rows
+            entry["vm_steps"] += steps * PROGRESS_STEP
+            entry["recent"].append(elapsed_ms)
+        
+        if self.slow_ms is not None and elapsed_ms >= self.slow_ms:
+            self._log_slow(connection, sql, params, template, elapsed_ms, rows)
+    
+    def _log_slow(self, connection: sqlite3.Connection, sql: str, params: Any, template: str,
+                  elapsed_ms: float, rows: int):
+        """Journalise une requête lente avec son plan d'exécution"""
+        plan = None
+        if params is not None and sql.lstrip().upper().startswith(EXPLAINABLE):
+            try:
+                plan = explain_query_plan(connection, sql, params)
+            except sqlite3.Error:
+                pass
+        entry = {
+            "at": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+            "template": template,
+            "sql": " ".join(sql.split()),
+            "ms": round(elapsed_ms, 3),
+            "rows": rows,
+            "plan": plan,
+        }
+        with self._lock:
+            self._slow.append(entry)
+        logger.warning("Requête lente (%.1f ms, %d lignes): %s%s", elapsed_ms, rows, entry["sql"],
+                       "".join(f"\n    {line}" for line in plan or []))
+    
+    def snapshot(self, sort_by: str = "total_ms") -> List[Dict[str, Any]]:
+        """
+        Métriques par modèle, triées par ordre décroissant de `sort_by`
+        
+        Returns:
+            Liste de dict : "template", "count", "total_ms", "mean_ms", "p95_ms",
+            "max_ms", "rows", "vm_steps" (approximatif, par pas de PROGRESS_STEP)
+        """
+        with self._lock:
+            items = [(template, dict(entry, recent=list(entry["recent"])))
+                     for template, entry in self._statements.items()]
+        results = []
+        for template, entry in items:
+            recent = sorted(entry["recent"])
+            p95 = recent[min(len(recent) - 1, max(0, math.ceil(0.95 * len(recent)) - 1))]
+            results.append({
+                "template": template,
+                "count": entry["count"],
+                "total_ms": round(entry["total_ms"], 3),
+                "mean_ms": round(entry["total_ms"] / entry["count"], 3),
+                "p95_ms": round(p95, 3),
+                "max_ms": round(entry["max_ms"], 3),
+                "rows": entry["rows"],
+                "vm_steps": entry["vm_steps"],
+            })
+        results.sort(key=lambda result: result[sort_by], reverse=True)
+        return results
+    
+    def examples(self) -> Dict[str, Tuple[str, Any]]:
+        """Première instruction observée (SQL, paramètres) pour chaque modèle"""
+        with self._lock:
+            return {template: entry["example"] for template, entry in self._statements.items()}
+    
+    def slow_queries(self) -> List[Dict[str, Any]]:
+        """Requêtes lentes récentes, de la plus ancienne à la plus récente"""
+        with self._lock:
+            return list(self._slow)
+    
+    def reset(self):
+        """Remet les métriques à zéro"""
+        with self._lock:
+            self._statements.clear()
+            self._slow.clear()
+            self.started_at = time.time()
+    
+    def prometheus(self, prefix: str = "child_security_sql") -> str:
+        """Métriques au format texte de Prometheus (une série par modèle)"""
+        lines = []
+        metrics = (("calls_total", "counter", "count", 1),
+                   ("seconds_total", "counter", "total_ms", 1000.0),
+                   ("p95_seconds", "gauge", "p95_ms", 1000.0),
+                   ("rows_total", "counter", "rows", 1))
+        snapshot = self.snapshot()
+        for name, kind, key, divisor in metrics:
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for result in snapshot:
+                label = (result["template"].replace("\\", "\\\\").replace('"', '\\"')
+                         .replace("\n", " "))
+                lines.append(f'{prefix}_{name}{{statement="{label}"}} {result[key] / divisor:g}')
+        return "\n".join(lines) + "\n"
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Curseur qui mesure ses instructions pour QueryStats
+    
+    Le temps d'une instruction comprend son exécution et la lecture de ses
+    lignes ; la mesure est enregistrée quand les lignes sont épuisées, à
+    l'instruction suivante, ou à la fermeture du curseur.
+    """
+    
+    _pending: Optional[List[Any]] = None
+    
+    def execute(self, sql: str, parameters: Any = ()) -> "InstrumentedCursor":
+        self._record()
+        steps = self.connection.progress_steps[0]
+        start = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        finally:
+            self._pending = [sql, parameters, steps, time.perf_counter() - start, 0]
+            if self.description is None:
+                self._record()
+        return self
+    
+    def executemany(self, sql: str, seq_of_parameters: Iterable[Any]) -> "InstrumentedCursor":
+        self._record()
+        steps = self.connection.progress_steps[0]
+        start = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            # Pas de paramètres représentatifs : pas de plan pour executemany
+            self._pending = [sql, None, steps, time.perf_counter() - start, max(0, self.rowcount)]
+            self._record()
+        return self
+    
+    def executescript(self, sql_script: str) -> "InstrumentedCursor":
+        self._record()
+        steps = self.connection.progress_steps[0]
+        start = time.perf_counter()
+        try:
+            super().executescript(sql_script)
+        finally:
+            self._pending = [sql_script, None, steps, time.perf_counter() - start, 0]
+            self._record()
+        return self
+    
+    def _timed(self, method: Callable[..., Any], *args: Any) -> Any:
+        """Appelle une méthode de lecture en ajoutant sa durée à l'instruction en cours"""
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            if self._pending is not None:
+                self._pending[3] += time.perf_counter() - start
+    
+    def fetchone(self) -> Any:
+        row = self._timed(super().fetchone)
+        if self._pending is not None:
+            if row is None:
+                self._record()
+            else:
+                self._pending[4] += 1
+        return row
+    
+    def fetchmany(self, size: Optional[int] = None) -> List[Any]:
+        size = self.arraysize if size is None else size
+        rows = self._timed(super().fetchmany, size)
+        if self._pending is not None:
+            self._pending[4] += len(rows)
+            if len(rows) < size:
+                self._record()
+        return rows
+    
+    def fetchall(self) -> List[Any]:
+        rows = self._timed(super().fetchall)
+        if self._pending is not None:
+            self._pending[4] += len(rows)
+            self._record()
+        return rows
+    
+    def __next__(self) -> Any:
+        try:
+            row = self._timed(super().__next__)
+        except StopIteration:
+            self._record()
+            raise
+        if self._pending is not None:
+            self._pending[4] += 1
+        return row
+    
+    def close(self):
+        self._record()
+        super().close()
+    
+    def __del__(self):
+        try:
+            self._record()
+        except Exception:
+            pass
+    
+    def _record(self):
+        """Transmet la mesure de l'instruction en cours à QueryStats"""
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        sql, parameters, steps, seconds, rows = pending
+        connection = self.connection
+        if connection.query_stats is not None:
+            connection.query_stats.record(connection, sql, parameters, seconds, rows,
+                                          connection.progress_steps[0] - steps)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """
+    Connexion dont les instructions sont mesurées (voir QueryStats)
+    
+    Créée par sqlite3.connect(..., factory=InstrumentedConnection) ; un
+    progress handler compte le travail de la VM par pas de PROGRESS_STEP
+    instructions.
+    """
+    
+    query_stats: Optional[QueryStats] = None
+    
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        # Compteur mutable : le handler ne référence pas la connexion (pas de cycle)
+        steps = self.progress_steps = [0]
+        
+        def count_steps() -> int:
+            steps[0] += 1
+            return 0
+        self.set_progress_handler(count_steps, PROGRESS_STEP)
+    
+    def cursor(self, factory: Optional[Callable[..., sqlite3.Cursor]] = None) -> sqlite3.Cursor:
+        return super().cursor(factory or InstrumentedCursor)
+    
+    def execute(self, sql: str, parameters: Any = ()) -> sqlite3.Cursor:
+        return self.cursor().execute(sql, parameters)
+    
+    def executemany(self, sql: str, seq_of_parameters: Iterable[Any]) -> sqlite3.Cursor:
+        return self.cursor().executemany(sql, seq_of_parameters)
+    
+    def executescript(self, sql_script: str) -> sqlite3.Cursor:
+        return self.cursor().executescript(sql_script)
+
+
+def open_connection(db_path: str, query_stats: Optional[QueryStats] = None,
+                    **kwargs: Any) -> sqlite3.Connection:
+    """sqlite3.connect, avec une connexion instrumentée si query_stats est fourni"""
+    if query_stats is None:
+        return sqlite3.connect(db_path, **kwargs)
+    connection = sqlite3.connect(db_path, factory=InstrumentedConnection, **kwargs)
+    connection.query_stats = query_stats
+    return connection
+
 
 class DatabaseHelper:
     """Helper class pour la gestion de la base de données SQLite"""
     
-    def __init__(self, db_path: str = "base_donnée.db"):
+    def __init__(self, db_path: str = "base_donnée.db", pool_size: int = 0,
+                 pragmas: Optional[Dict[str, Any]] = None, archive_dir: Optional[str] = None,
+                 cache_size: int = 1024, cache_ttl: Optional[float] = 300.0,
+                 query_stats: Optional[QueryStats] = None, lazy_schema: bool = False):
         """
         Initialise la connexion à la base de données
         
         Args:
             db_path: Chemin vers le fichier de base de données
+            pool_size: Si > 0, active le mode pool (WAL, une connexion par thread)
+            pragmas: PRAGMAs supplémentaires pour les connexions du pool
+            archive_dir: Dossier des archives mensuelles (par défaut "archives"
+                         à côté de la base)
+            cache_size: Nombre d'entrées du cache de données de référence (0 : désactivé)
+            cache_ttl: Durée de vie des entrées du cache en secondes
+            query_stats: Active l'instrumentation des requêtes (voir query_metrics)
+            lazy_schema: Diffère la création des tables d'agrégats rarement
+                         utilisées (SCHEMA_GROUPS) jusqu'à leur premier accès
         """
         self.db_path = db_path
+        self.archive_dir = archive_dir or os.path.join(
+            os.path.dirname(os.path.abspath(db_path)), "archives")
         self.connection: Optional[sqlite3.Connection] = None
+        self.pool: Optional[ConnectionPool] = None
+        self.query_stats = query_stats
+        if pool_size > 0:
+            self.pool = ConnectionPool(db_path, pool_size, pragmas, query_stats=query_stats)
+        self.cache = LRUCache(cache_size, cache_ttl)
+        # Réplicas en lecture seule (voir db_replica.ReplicaManager et read_connection)
+        self.replicas: Optional[Any] = None
+        self.lazy_schema = lazy_schema
+        # Groupes différés encore à créer (lus une fois dans schema_state)
+        self._deferred_groups: Optional[set] = None
         
     def connect(self) -> sqlite3.Connection:
-        """Établit la connexion à la base de données"""
+        """
+        Établit la connexion à la base de données
+        
+        En mode pool, retourne la connexion du thread courant : celle prêtée
+        par acquire(), ou à défaut une connexion attachée au thread jusqu'à
+        l'appel de release() ou la fin du thread.
+        """
+        if self.pool is not None:
+            return self.pool.pin()
         if not self.connection:
-            self.connection = sqlite3.connect(self.db_path)
+            self.connection = open_connection(self.db_path, self.query_stats)
             self.connection.row_factory = sqlite3.Row  # Pour accéder aux colonnes par nom
         return self.connection
     
+    @contextmanager
+    def acquire(self) -> Iterator[sqlite3.Connection]:
+        """
+        Fournit une connexion pour la durée d'un bloc `with`
+        
+        En mode pool, la connexion est empruntée puis rendue en fin de bloc ;
+        la transaction est validée, ou annulée en cas d'exception. Sans pool,
+        la connexion unique est utilisée avec la même sémantique transactionnelle.
+        """
+        if self.pool is not None:
+            with self.pool.acquire() as connection:
+                yield connection
+            return
+        
+        connection = self.connect()
+        try:
+            yield connection
+            if connection.in_transaction:
+                connection.commit()
+        except BaseException:
+            if connection.in_transaction:
+                connection.rollback()
+            raise
+    
+    def release(self):
+        """Rend au pool la connexion attachée au thread courant par connect()"""
+        if self.pool is not None:
+            self.pool.release()
+    
     def close(self):
         """Ferme la connexion à la base de données"""
+        if self.pool is not None:
+            self.pool.close()
         if self.connection:
             self.connection.close()
             self.connection = None
     
+    # =============================================
+    # MIGRATIONS DU SCHÉMA
+    # =============================================
+    
+    # Étapes de migration ordonnées : (version, description, méthode, transactionnelle).
+    # La version courante est stockée dans PRAGMA user_version. Une étape non
+    # transactionnelle gère elle-même ses transactions (réécriture par lots).
+    MIGRATIONS = [
+        (1, "Schéma initial", "_migration_initial_schema", True),
+        (2, "Index spatiaux R*Tree", "_migration_spatial_indexes", True),
+        (3, "Historique paginé et compteurs de messagerie", "_migration_conversation_counters", True),
+        (4, "Recherche plein texte FTS5", "_migration_search_indexes", True),
+        (5, "Index de rétention (created_at)", "_migration_retention_indexes", True),
+        (6, "File de diffusion des alertes", "_migration_alert_fanout", True),
+        (7, "Index d'adjacence et journal des connexions", "_migration_connection_graph", True),
+        (8, "Agrégats des évaluations", "_migration_rating_aggregates", True),
+        (9, "Agrégats de progression", "_migration_progress_rollups", True),
+        (10, "Colonnes JSON compactes et clés indexées", "_migration_json_columns", False),
+        (11, "File de modération des signalements", "_migration_moderation_queue", True),
+        (12, "Empreinte du schéma et groupes différés", "_migration_schema_state", True),
+        (13, "Index d'historique des messages allégé", "_migration_message_history_index", True),
+        (14, "Signalements vus à la réservation", "_migration_moderation_claims", True),
+    ]
+    SCHEMA_VERSION = MIGRATIONS[-1][0]
+    
+    # Groupes de tables dérivées rarement utilisées, créés au premier accès
+    # avec lazy_schema (voir ensure_schema_group) : nom -> (version de la
+    # migration qui les crée, table source dont les triggers les alimentent).
+    # Seules les tables de la migration du groupe sont différées, pas les
+    # tables sources : "education" diffère les agrégats de progression
+    # (progress_user_category, progress_content_daily), les tables
+    # éducatives de la migration 1 restent créées d'emblée (l'index plein
+    # texte, la recopie des notes et le cache en dépendent) ; "moderation"
+    # diffère moderation_queue, pas reports.
+    SCHEMA_GROUPS = {
+        "education": (9, "user_progress"),
+        "moderation": (11, "reports"),
+    }
+    
+    # Schéma de référence de la version courante (voir verify_schema) :
+    # (objet -> définition, objet -> version qui le crée), construit une fois
+    _reference_schema: Optional[Tuple[Dict[str, str], Dict[str, int]]] = None
+    
+    def schema_version(self) -> int:
+        """Version du schéma de la base (PRAGMA user_version)"""
+        return self.connect().execute("PRAGMA user_version").fetchone()[0]
+    
+    def migrate(self, target: Optional[int] = None) -> List[int]:
+        """
+        Applique les migrations en attente
+        
+        Si la base est déjà à jour, aucune instruction DDL n'est exécutée :
+        PRAGMA user_version est lu, puis l'empreinte du schéma n'est
+        recalculée que si SQLite signale un changement de schéma depuis la
+        dernière migration (voir _check_schema).
+        
+        Sur une base neuve, les étapes transactionnelles consécutives sont
+        appliquées dans une seule transaction. Avec lazy_schema, les
+        migrations des groupes de SCHEMA_GROUPS sont différées jusqu'au
+        premier accès (ensure_schema_group).
+        
+        Args:
+            target: Version à atteindre (par défaut SCHEMA_VERSION)
+            
+        Returns:
+            Liste des versions appliquées (ou différées)
+        """
+        target = self.SCHEMA_VERSION if target is None else target
+        conn = self.connect()
+        current = self.schema_version()
+        if current > self.SCHEMA_VERSION:
+            raise RuntimeError(f"Version de schéma {current} plus récente que le code "
+                               f"({self.SCHEMA_VERSION})")
+        if current >= target:
+            if current == self.SCHEMA_VERSION:
+                self._check_schema(conn)
+            return []
+        if conn.in_transaction:
+            conn.commit()
+        
+        # auto_vacuum ne peut être choisi que sur une base encore vide
+        fresh = current == 0 and not conn.execute("SELECT 1 FROM sqlite_master").fetchone()
+        if fresh:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        
+        deferred = {version: name for name, (version, _) in self.SCHEMA_GROUPS.items()} \
+            if self.lazy_schema else {}
+        steps = [step for step in self.MIGRATIONS if step[0] <= target]
+        applied: List[int] = []
+        messages: List[str] = []
+        for index, (version, description, method, transactional) in enumerate(steps):
+            if not transactional:
+                if self.schema_version() >= version:
+                    continue
+                getattr(self, method)(conn)
+                conn.execute(f"PRAGMA user_version = {version}")
+            else:
+                # BEGIN IMMEDIATE : un seul processus applique une étape donnée
+                if not conn.in_transaction:
+                    conn.execute("BEGIN IMMEDIATE")
+                    if self.schema_version() >= version:
+                        conn.rollback()
+                        continue
+                try:
+                    if version in deferred:
+                        self._defer_schema_group(conn.cursor(), deferred[version])
+                    else:
+                        getattr(self, method)(conn.cursor())
+                    conn.execute(f"PRAGMA user_version = {version}")
+                    # Base neuve : la transaction reste ouverte pour l'étape suivante
+                    following = steps[index + 1] if index + 1 < len(steps) else None
+                    if not (fresh and following is not None and following[3]):
+                        conn.commit()
+                except BaseException:
+                    conn.rollback()
+                    raise
+            applied.append(version)
+            messages.append(f"⏸️ Migration {version} différée: {description} "
+                            f"(groupe {deferred[version]})" if version in deferred else
+                            f"✅ Migration {version} appliquée: {description}")
+            if not conn.in_transaction:
+                for message in messages:
+                    print(message)
+                messages.clear()
+        if applied:
+            self._deferred_groups = None
+            if self.schema_version() == self.SCHEMA_VERSION:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._record_schema(conn.cursor())
+                    conn.commit()
+                except BaseException:
+                    conn.rollback()
+                    raise
+            self.invalidate_cache()
+        return applied
+    
     def create_tables(self):
-        """Crée toutes les tables nécessaires"""
-        cursor = self.connect().cursor()
+        """
+        Crée toutes les tables nécessaires
+        
+        Le schéma est versionné : seules les migrations en attente sont
+        appliquées, une base à jour ne repasse pas par les instructions DDL.
+        """
+        if self.migrate():
+            print("✅ Toutes les tables ont été créées avec succès!")
+        else:
+            print(f"✅ Schéma déjà à jour (version {self.SCHEMA_VERSION})")
+    
+    def _migration_schema_state(self, cursor):
+        """Migration 12 : état du schéma (empreinte, groupes différés)"""
+        self._create_schema_state(cursor)
+    
+    def _create_schema_state(self, cursor):
+        """
+        Crée la table clé/valeur de l'état du schéma : empreinte et définitions
+        enregistrées par la dernière migration, compteur de schéma de SQLite
+        correspondant, groupes différés ("deferred.<groupe>")
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schema_state (
+                key TEXT PRIMARY KEY,
+                value
+            ) WITHOUT ROWID
+        ''')
+    
+    def _migration_message_history_index(self, cursor):
+        """
+        Migration 13 : idx_messages_history ne couvre plus le contenu des messages
+        
+        L'ancienne version recopiait toutes les colonnes (content,
+        location_data, media_url...), doublant la taille de la table et le
+        coût des écritures ; idx_messages_conversation, dont elle reprend
+        la clé, est supprimé.
+        """
+        cursor.execute("DROP INDEX IF EXISTS idx_messages_conversation")
+        columns = {row[2] for row in cursor.execute("PRAGMA index_info(idx_messages_history)")}
+        if "content" in columns:
+            cursor.execute("DROP INDEX idx_messages_history")
+        self._create_indexes(cursor)
+    
+    @staticmethod
+    def _schema_catalogue(conn: sqlite3.Connection) -> Dict[str, str]:
+        """Définitions des objets du schéma (hors objets internes), espaces normalisés"""
+        rows = conn.execute('''
+            SELECT name, type, tbl_name, sql FROM sqlite_master
+            WHERE name NOT LIKE 'sqlite_%'
+        ''').fetchall()
+        return {row[0]: f"{row[1]} {row[2]}: {' '.join((row[3] or '').split())}" for row in rows}
+    
+    @staticmethod
+    def _fingerprint(catalogue: Dict[str, str]) -> str:
+        """Empreinte SHA-256 d'un catalogue de définitions"""
+        # Import local : hashlib (OpenSSL) ne sert qu'après un changement de schéma
+        import hashlib
+        return hashlib.sha256(json.dumps(catalogue, sort_keys=True).encode("utf-8")).hexdigest()
+    
+    def _record_schema(self, cursor):
+        """Enregistre l'empreinte du schéma courant (dans la transaction de l'appelant)"""
+        catalogue = self._schema_catalogue(cursor.connection)
+        cookie = cursor.execute("PRAGMA schema_version").fetchone()[0]
+        cursor.executemany("INSERT OR REPLACE INTO schema_state (key, value) VALUES (?, ?)", [
+            ("fingerprint", self._fingerprint(catalogue)),
+            ("catalogue", encode_json(catalogue)),
+            ("schema_cookie", cookie),
+        ])
+    
+    def _check_schema(self, conn: sqlite3.Connection):
+        """
+        Vérifie à moindre coût qu'une base à jour n'a pas changé hors migrations
+        
+        PRAGMA schema_version est incrémenté par SQLite à chaque modification
+        du schéma : tant qu'il vaut la valeur enregistrée, une seule lecture
+        suffit. Sinon l'empreinte est recalculée ; un écart (index ou trigger
+        supprimé, définition modifiée) est signalé dans le journal.
+        """
+        try:
+            row = conn.execute('''
+                SELECT s.value, p.schema_version FROM pragma_schema_version p
+                LEFT JOIN schema_state s ON s.key = 'schema_cookie'
+            ''').fetchone()
+        except sqlite3.OperationalError:
+            return
+        if row[0] == row[1]:
+            return
+        recorded = dict(conn.execute(
+            "SELECT key, value FROM schema_state WHERE key IN ('fingerprint', 'catalogue')").fetchall())
+        catalogue = self._schema_catalogue(conn)
+        if "fingerprint" in recorded and self._fingerprint(catalogue) != recorded["fingerprint"]:
+            expected = json.loads(recorded.get("catalogue") or "{}")
+            logger.warning("Schéma de %s modifié hors migrations : manquants %s, inattendus %s, "
+                           "modifiés %s", self.db_path,
+                           sorted(set(expected) - set(catalogue)),
+                           sorted(set(catalogue) - set(expected)),
+                           sorted(name for name in catalogue
+                                  if name in expected and catalogue[name] != expected[name]))
+            return
+        # Changement sans effet sur les définitions (ANALYZE, index reconstruit...),
+        # ou première vérification : l'empreinte courante devient la référence
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self._record_schema(conn.cursor())
+            conn.commit()
+        except sqlite3.OperationalError:
+            # Base occupée : le compteur sera mis à jour au prochain démarrage
+            if conn.in_transaction:
+                conn.rollback()
+    
+    @classmethod
+    def _reference_catalogue(cls) -> Tuple[Dict[str, str], Dict[str, int]]:
+        """Schéma de référence : base en mémoire migrée étape par étape (une fois)"""
+        if cls._reference_schema is None:
+            reference = cls(":memory:", cache_size=0)
+            versions: Dict[str, int] = {}
+            try:
+                with redirect_stdout(io.StringIO()):
+                    for version, _, _, _ in cls.MIGRATIONS:
+                        reference.migrate(version)
+                        for name in cls._schema_catalogue(reference.connect()):
+                            versions.setdefault(name, version)
+                catalogue = cls._schema_catalogue(reference.connect())
+            finally:
+                reference.close()
+            cls._reference_schema = (catalogue, versions)
+        return cls._reference_schema
+    
+    def verify_schema(self, integrity: bool = False) -> Dict[str, Any]:
+        """
+        Compare le schéma de la base au schéma de référence de la version courante
+        
+        Les objets des groupes différés (lazy_schema) ne sont pas comptés
+        comme manquants.
+        
+        Args:
+            integrity: Exécute aussi PRAGMA quick_check (lecture de toute la base)
+        
+        Returns:
+            "version", "expected_version", "fingerprint" (schéma actuel),
+            "recorded_fingerprint" (dernière migration), listes "missing",
+            "unexpected", "changed" et "deferred_groups", "integrity" et "ok"
+        """
+        conn = self.connect()
+        expected, versions = self._reference_catalogue()
+        actual = self._schema_catalogue(conn)
+        deferred = self._pending_groups()
+        deferred_versions = {self.SCHEMA_GROUPS[name][0] for name in deferred}
+        try:
+            recorded = conn.execute(
+                "SELECT value FROM schema_state WHERE key = 'fingerprint'").fetchone()
+        except sqlite3.OperationalError:
+            recorded = None
+        
+        version = self.schema_version()
+        result = {
+            "version": version,
+            "expected_version": self.SCHEMA_VERSION,
+            "fingerprint": self._fingerprint(actual),
+            "recorded_fingerprint": recorded[0] if recorded else None,
+            "missing": sorted(name for name in expected
+                              if name not in actual and versions[name] not in deferred_versions),
+            "unexpected": sorted(name for name in actual if name not in expected),
+            "changed": sorted(name for name in actual
+                              if name in expected and actual[name] != expected[name]),
+            "deferred_groups": sorted(deferred),
+            "integrity": None,
+        }
+        if integrity:
+            result["integrity"] = "; ".join(row[0] for row in conn.execute("PRAGMA quick_check"))
+        result["ok"] = (version == self.SCHEMA_VERSION and not result["missing"]
+                        and not result["unexpected"] and not result["changed"]
+                        and result["integrity"] in (None, "ok"))
+        return result
+    
+    def _defer_schema_group(self, cursor, name: str):
+        """Enregistre un groupe de tables à créer au premier accès"""
+        self._create_schema_state(cursor)
+        cursor.execute("INSERT OR REPLACE INTO schema_state (key, value) VALUES (?, ?)",
+                       (f"deferred.{name}", self.SCHEMA_GROUPS[name][0]))
+    
+    def _pending_groups(self) -> set:
+        """Groupes différés encore à créer (schema_state lu une fois par instance)"""
+        if self._deferred_groups is None:
+            try:
+                rows = self.connect().execute(
+                    "SELECT substr(key, 10) FROM schema_state WHERE key LIKE 'deferred.%'").fetchall()
+            except sqlite3.OperationalError:
+                rows = []  # Base antérieure à la version 12
+            self._deferred_groups = {row[0] for row in rows}
+        return self._deferred_groups
+    
+    def ensure_schema_group(self, name: str) -> bool:
+        """
+        Crée un groupe de tables différé (lazy_schema) s'il ne l'est pas encore
+        
+        Appelée par les méthodes qui utilisent les tables du groupe : après
+        la première lecture de schema_state, le coût est celui d'un test
+        d'appartenance. La migration du groupe, rattrapage depuis la table
+        source compris, est appliquée dans une seule transaction.
         
+        Returns:
+            True si le groupe vient d'être créé
+        """
+        if name not in self.SCHEMA_GROUPS:
+            raise ValueError(f"Groupe de tables inconnu: {name}")
+        if name not in self._pending_groups():
+            return False
+        version = self.SCHEMA_GROUPS[name][0]
+        description, method = next((step[1], step[2]) for step in self.MIGRATIONS
+                                   if step[0] == version)
+        conn = self.connect()
+        if conn.in_transaction:
+            conn.commit()
+        created = False
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Un autre processus a pu créer le groupe depuis la lecture de schema_state
+            if conn.execute("SELECT 1 FROM schema_state WHERE key = ?",
+                            (f"deferred.{name}",)).fetchone():
+                getattr(self, method)(conn.cursor())
+                conn.execute("DELETE FROM schema_state WHERE key = ?", (f"deferred.{name}",))
+                self._record_schema(conn.cursor())
+                created = True
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        self._deferred_groups.discard(name)
+        if created:
+            print(f"✅ Groupe {name} créé au premier accès: {description}")
+        return created
+    
+    def _migration_initial_schema(self, cursor):
+        """Migration 1 : tables, index et données initiales"""
         # =============================================
         # TABLES POUR LA COMMUNAUTÉ ET LE CHAT
         # =============================================
@@ -429,88 +1552,3164 @@ class DatabaseHelper:
         
         # Insertion des données initiales
         self._insert_initial_data(cursor)
+    
+    def _migration_spatial_indexes(self, cursor):
+        """Migration 2 : index R*Tree des alertes et des utilisateurs"""
+        self._create_spatial_indexes(cursor)
+    
+    def _migration_conversation_counters(self, cursor):
+        """Migration 3 : index de l'historique et compteurs dénormalisés"""
+        self._create_indexes(cursor)
+        self._ensure_column(cursor, "conversation_participants", "unread_count", "INTEGER DEFAULT 0")
+        self._create_counter_triggers(cursor)
+        
+        # Initialisation des compteurs pour les données existantes
+        cursor.execute('''
+            UPDATE conversation_participants
+            SET unread_count = (
+                SELECT COUNT(*) FROM messages m
+                WHERE m.conversation_id = conversation_participants.conversation_id
+                  AND m.sender_id != conversation_participants.user_id
+                  AND (conversation_participants.last_read_at IS NULL
+                       OR m.sent_at > conversation_participants.last_read_at)
+            )
+        ''')
+        cursor.execute('''
+            UPDATE conversations
+            SET last_message_at = (
+                SELECT MAX(sent_at) FROM messages WHERE conversation_id = conversations.id
+            )
+            WHERE EXISTS (SELECT 1 FROM messages WHERE conversation_id = conversations.id)
+        ''')
+        cursor.execute('''
+            UPDATE conversations
+            SET participants_count = (
+                SELECT COUNT(*) FROM conversation_participants cp
+                WHERE cp.conversation_id = conversations.id AND cp.is_active = 1
+            )
+            WHERE EXISTS (SELECT 1 FROM conversation_participants cp
+                          WHERE cp.conversation_id = conversations.id)
+        ''')
+    
+    def _migration_search_indexes(self, cursor):
+        """Migration 4 : index plein texte FTS5"""
+        self._create_search_indexes(cursor)
+    
+    def _migration_retention_indexes(self, cursor):
+        """Migration 5 : index par date pour l'archivage et le fil de notifications"""
+        self._create_indexes(cursor)
+    
+    def _migration_alert_fanout(self, cursor):
+        """
+        Migration 6 : file de diffusion des alertes (voir fan_out_alert)
         
-        self.connection.commit()
-        print("✅ Toutes les tables ont été créées avec succès!")
+        Chaque nouvelle alerte est mise en file par trigger ; les alertes
+        existantes ne sont pas rediffusées.
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS alert_fanout (
+                alert_id INTEGER PRIMARY KEY,
+                status TEXT NOT NULL DEFAULT 'pending',
+                last_user_id INTEGER NOT NULL DEFAULT 0,
+                recipients INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                lease_until TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                queued_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                finished_at TEXT,
+                FOREIGN KEY (alert_id) REFERENCES community_alerts (id) ON DELETE CASCADE
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_alert_fanout_status
+            ON alert_fanout(status, queued_at)
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS community_alerts_fanout
+            AFTER INSERT ON community_alerts
+            BEGIN
+                INSERT OR IGNORE INTO alert_fanout (alert_id) VALUES (NEW.id);
+            END
+        ''')
     
-    def _create_indexes(self, cursor):
-        """Crée les index pour optimiser les performances"""
-        indexes = [
-            "CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)",
-            "CREATE INDEX IF NOT EXISTS idx_users_location ON users(latitude, longitude)",
-            "CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages(conversation_id, sent_at)",
-            "CREATE INDEX IF NOT EXISTS idx_alerts_location ON community_alerts(latitude, longitude)",
-            "CREATE INDEX IF NOT EXISTS idx_alerts_type ON community_alerts(alert_type, created_at)",
-            "CREATE INDEX IF NOT EXISTS idx_notifications_user ON notifications(user_id, is_read)",
-            "CREATE INDEX IF NOT EXISTS idx_user_progress_user ON user_progress(user_id, progress_status)",
-            "CREATE INDEX IF NOT EXISTS idx_connections_users ON parent_connections(user1_id, user2_id)",
-        ]
+    def _migration_connection_graph(self, cursor):
+        """
+        Migration 7 : index d'adjacence et journal des connexions acceptées
         
-        for index_sql in indexes:
-            cursor.execute(index_sql)
+        idx_connections_users doublonnait l'index de la contrainte
+        UNIQUE(user1_id, user2_id) et ne servait pas la recherche par
+        user2_id : il est remplacé par les index de INDEXES.
+        """
+        cursor.execute("DROP INDEX IF EXISTS idx_connections_users")
+        self._create_indexes(cursor)
+        self._create_connection_log(cursor)
     
-    def _insert_initial_data(self, cursor):
-        """Insère les données initiales nécessaires"""
-        # Catégories éducatives par défaut
-        categories = [
-            ("Sécurité Internet", "Apprendre à naviguer en sécurité sur internet", "🌐", 1),
-            ("Prévention des Dangers", "Identifier et éviter les situations dangereuses", "⚠️", 2),
-            ("Communication", "Développer une communication ouverte avec votre enfant", "💬", 3),
-            ("Premiers Secours", "Gestes de premiers secours pour enfants", "🚑", 4),
-            ("Éducation Émotionnelle", "Aider votre enfant à gérer ses émotions", "❤️", 5),
-        ]
+    def _create_connection_log(self, cursor):
+        """
+        Crée le journal des changements du graphe des connexions acceptées
         
-        cursor.executemany('''
-            INSERT OR IGNORE INTO education_categories (name, description, icon, sort_order)
-            VALUES (?, ?, ?, ?)
-        ''', categories)
+        Chaque ajout (accepted = 1) ou retrait (accepted = 0) d'une arête
+        acceptée est journalisé par trigger avec un numéro de séquence
+        croissant : un instantané en mémoire (voir db_graph.ConnectionGraph)
+        se met à jour en relisant les entrées postérieures à sa séquence.
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS connection_changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                user1_id INTEGER NOT NULL,
+                user2_id INTEGER NOT NULL,
+                trust_score REAL,
+                accepted INTEGER NOT NULL,
+                changed_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS parent_connections_log_insert
+            AFTER INSERT ON parent_connections
+            WHEN NEW.status = 'accepted'
+            BEGIN
+                INSERT INTO connection_changes (user1_id, user2_id, trust_score, accepted)
+                VALUES (NEW.user1_id, NEW.user2_id, NEW.trust_score, 1);
+            END
+        ''')
+        # Retrait de l'ancienne arête puis ajout de la nouvelle (statut,
+        # confiance ou extrémités modifiés)
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS parent_connections_log_update
+            AFTER UPDATE OF user1_id, user2_id, status, trust_score ON parent_connections
+            WHEN OLD.status = 'accepted' OR NEW.status = 'accepted'
+            BEGIN
+                INSERT INTO connection_changes (user1_id, user2_id, trust_score, accepted)
+                SELECT OLD.user1_id, OLD.user2_id, OLD.trust_score, 0
+                WHERE OLD.status = 'accepted';
+                INSERT INTO connection_changes (user1_id, user2_id, trust_score, accepted)
+                SELECT NEW.user1_id, NEW.user2_id, NEW.trust_score, 1
+                WHERE NEW.status = 'accepted';
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS parent_connections_log_delete
+            AFTER DELETE ON parent_connections
+            WHEN OLD.status = 'accepted'
+            BEGIN
+                INSERT INTO connection_changes (user1_id, user2_id, trust_score, accepted)
+                VALUES (OLD.user1_id, OLD.user2_id, OLD.trust_score, 0);
+            END
+        ''')
+    
+    def _migration_rating_aggregates(self, cursor):
+        """
+        Migration 8 : agrégats des évaluations (nombre et somme des notes par cible)
         
-        print("✅ Données initiales insérées!")
-
-def main():
-    """Fonction principale pour créer la base de données"""
-    print("🚀 Création de la base de données Child Security...")
+        Les agrégats sont calculés pour les notes existantes, puis recopiés
+        dans les colonnes de moyenne des cibles (voir RATING_TARGETS).
+        """
+        self._create_indexes(cursor)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS rating_aggregates (
+                target_type TEXT NOT NULL,
+                target_id INTEGER NOT NULL,
+                rating_count INTEGER NOT NULL DEFAULT 0,
+                rating_sum REAL NOT NULL DEFAULT 0,
+                average REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (target_type, target_id)
+            ) WITHOUT ROWID
+        ''')
+        # Classement par moyenne sans tri (get_top_rated)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_rating_aggregates_top
+            ON rating_aggregates(target_type, average DESC, rating_count DESC, target_id)
+        ''')
+        self._create_rating_triggers(cursor)
+        for target_type in self._rating_target_types(cursor):
+            self._refresh_rating_aggregates(cursor, target_type)
     
-    # Création du dossier de données s'il n'existe pas
-    data_dir = "data"
-    if not os.path.exists(data_dir):
-        os.makedirs(data_dir)
+    # Cibles dont la note moyenne est recopiée dans une colonne :
+    # target_type -> (table, colonne, valeur sans note, colonne de libellé)
+    RATING_TARGETS = {
+        "content": ("educational_content", "average_rating", 0.0, "title"),
+        "advice": ("parenting_advice", "average_rating", 0.0, "title"),
+        "user": ("users", "rating", 4.0, "name"),
+    }
     
-    # Initialisation de la base de données
-    db_path = os.path.join(data_dir, "child_security_complete.db")
-    db_helper = DatabaseHelper(db_path)
+    def _rating_writeback_sql(self, row: str) -> str:
+        """Recopie de la moyenne de la cible de la ligne row ("NEW" ou "OLD") dans sa table"""
+        statements = []
+        for target_type, (table, column, default, _) in self.RATING_TARGETS.items():
+            statements.append(f'''
+                UPDATE {table} SET {column} = COALESCE((
+                    SELECT ROUND(average, 2) FROM rating_aggregates
+                    WHERE target_type = '{target_type}' AND target_id = {row}.target_id
+                ), {default})
+                WHERE {row}.target_type = '{target_type}' AND id = {row}.target_id;''')
+        return "".join(statements)
     
-    try:
-        # Création des tables
-        db_helper.create_tables()
-        
-        print(f"✅ Base de données créée avec succès: {db_path}")
-        print("📊 Tables créées:")
-        print("  - users (utilisateurs/parents)")
-        print("  - parent_connections (connexions entre parents)")
-        print("  - conversations (conversations)")
-        print("  - conversation_participants (participants)")
-        print("  - messages (messages)")
-        print("  - message_reactions (réactions)")
-        print("  - community_alerts (alertes communautaires)")
-        print("  - alert_comments (commentaires d'alertes)")
-        print("  - help_requests (demandes d'aide)")
-        print("  - help_responses (réponses d'aide)")
-        print("  - education_categories (catégories éducatives)")
-        print("  - educational_content (contenu éducatif)")
-        print("  - quiz_questions (questions de quiz)")
-        print("  - user_progress (progression utilisateur)")
-        print("  - parenting_advice (conseils parentaux)")
-        print("  - advice_comments (commentaires de conseils)")
-        print("  - user_interactions (interactions utilisateur)")
-        print("  - ratings (évaluations)")
-        print("  - notifications (notifications)")
-        print("  - reports (signalements)")
+    def _create_rating_triggers(self, cursor):
+        """
+        Crée les triggers qui maintiennent rating_aggregates et les colonnes de moyenne
         
+        Chaque note ajoutée ou retirée met à jour le nombre et la somme de sa
+        cible en O(1), sans relire les autres notes. Une cible sans note n'a
+        pas de ligne d'agrégat et reprend la valeur par défaut de sa colonne.
+        """
+        add = '''
+                INSERT INTO rating_aggregates (target_type, target_id, rating_count, rating_sum, average)
+                VALUES (NEW.target_type, NEW.target_id, 1, NEW.rating, NEW.rating)
+                ON CONFLICT (target_type, target_id) DO UPDATE SET
+                    rating_count = rating_count + 1,
+                    rating_sum = rating_sum + excluded.rating_sum,
+                    average = (rating_sum + excluded.rating_sum) / (rating_count + 1);'''
+        remove = '''
+                UPDATE rating_aggregates SET
+                    rating_count = rating_count - 1,
+                    rating_sum = rating_sum - OLD.rating,
+                    average = CASE WHEN rating_count > 1
+                                   THEN (rating_sum - OLD.rating) / (rating_count - 1) ELSE 0 END
+                WHERE target_type = OLD.target_type AND target_id = OLD.target_id;
+                DELETE FROM rating_aggregates
+                WHERE target_type = OLD.target_type AND target_id = OLD.target_id
+                  AND rating_count <= 0;'''
+        
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS ratings_aggregates_insert
+            AFTER INSERT ON ratings
+            BEGIN{add}{self._rating_writeback_sql("NEW")}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS ratings_aggregates_delete
+            AFTER DELETE ON ratings
+            BEGIN{remove}{self._rating_writeback_sql("OLD")}
+            END
+        ''')
+        # Note modifiée ou déplacée : retrait de l'ancienne valeur puis ajout de la nouvelle
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS ratings_aggregates_update
+            AFTER UPDATE OF target_type, target_id, rating ON ratings
+            BEGIN{remove}{self._rating_writeback_sql("OLD")}{add}{self._rating_writeback_sql("NEW")}
+            END
+        ''')
+    
+    def _rating_target_types(self, cursor) -> List[str]:
+        """
+        Types de cibles présents dans ratings, rating_aggregates ou RATING_TARGETS
+        
+        Les types distincts de ratings sont lus par sauts dans
+        idx_ratings_target (une recherche par type, pas de parcours complet).
+        """
+        types = set(self.RATING_TARGETS)
+        types.update(row[0] for row in cursor.execute(
+            "SELECT DISTINCT target_type FROM rating_aggregates"))
+        target_type = cursor.execute("SELECT MIN(target_type) FROM ratings").fetchone()[0]
+        while target_type is not None:
+            types.add(target_type)
+            target_type = cursor.execute("SELECT MIN(target_type) FROM ratings WHERE target_type > ?",
+                                         (target_type,)).fetchone()[0]
+        return sorted(types)
+    
+    def _refresh_rating_aggregates(self, cursor, target_type: str, first_id: int = 0,
+                                   last_id: Optional[int] = None) -> Tuple[int, int]:
+        """
+        Recalcule depuis ratings les agrégats des cibles d'id compris entre first_id et last_id
+        
+        Seules les lignes dont la valeur change sont écrites.
+        
+        Returns:
+            (agrégats corrigés, colonnes de moyenne corrigées)
+        """
+        last_id = (1 << 63) - 1 if last_id is None else last_id
+        params = (target_type, first_id, last_id)
+        changed = cursor.execute('''
+            INSERT INTO rating_aggregates (target_type, target_id, rating_count, rating_sum, average)
+            SELECT target_type, target_id, COUNT(*), SUM(rating), AVG(rating) FROM ratings
+            WHERE target_type = ? AND target_id BETWEEN ? AND ?
+            GROUP BY target_id
+            ON CONFLICT (target_type, target_id) DO UPDATE SET
+                rating_count = excluded.rating_count,
+                rating_sum = excluded.rating_sum,
+                average = excluded.average
+            WHERE rating_count != excluded.rating_count OR rating_sum != excluded.rating_sum
+        ''', params).rowcount
+        changed += cursor.execute('''
+            DELETE FROM rating_aggregates
+            WHERE target_type = ? AND target_id BETWEEN ? AND ?
+              AND NOT EXISTS (SELECT 1 FROM ratings r
+                              WHERE r.target_type = rating_aggregates.target_type
+                                AND r.target_id = rating_aggregates.target_id)
+        ''', params).rowcount
+        
+        if target_type not in self.RATING_TARGETS:
+            return changed, 0
+        table, column, default, _ = self.RATING_TARGETS[target_type]
+        columns = cursor.execute(f'''
+            UPDATE {table} SET {column} = expected.value
+            FROM (
+                SELECT t.id, COALESCE((
+                    SELECT ROUND(a.average, 2) FROM rating_aggregates a
+                    WHERE a.target_type = ? AND a.target_id = t.id
+                ), {default}) AS value
+                FROM {table} t WHERE t.id BETWEEN ? AND ?
+            ) AS expected
+            WHERE {table}.id = expected.id AND {table}.{column} IS NOT expected.value
+        ''', params).rowcount
+        return changed, columns
+    
+    def _migration_progress_rollups(self, cursor):
+        """
+        Migration 9 : agrégats de progression par utilisateur et catégorie,
+        et par contenu et jour (voir db_analytics.ProgressAnalytics)
+        """
+        self._create_indexes(cursor)
+        for table, key in (("progress_user_category", "user_id INTEGER NOT NULL, "
+                                                       "category_id INTEGER NOT NULL"),
+                           ("progress_content_daily", "content_id INTEGER NOT NULL, "
+                                                       "day TEXT NOT NULL")):
+            measures = ", ".join(f"{name} INTEGER NOT NULL DEFAULT 0"
+                                 for name, _ in self.PROGRESS_MEASURES)
+            primary_key = "user_id, category_id" if table == "progress_user_category" \
+                else "content_id, day"
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    {key}, {measures},
+                    PRIMARY KEY ({primary_key})
+                ) WITHOUT ROWID
+            ''')
+        # Classements par catégorie (category_id = 0 : toutes catégories)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_progress_user_category_rank
+            ON progress_user_category(category_id, score_sum DESC, user_id)
+        ''')
+        self._create_progress_triggers(cursor)
+        self._refresh_progress_rollups(cursor, "progress_user_category")
+        self._refresh_progress_rollups(cursor, "progress_content_daily")
+    
+    # Mesures des agrégats de progression : (colonne, contribution d'une ligne
+    # de user_progress, "{row}" étant NEW, OLD ou un alias de table)
+    PROGRESS_MEASURES = [
+        ("tracked", "1"),
+        ("in_progress", "{row}.progress_status = 'in_progress'"),
+        ("completed", "{row}.progress_status = 'completed'"),
+        ("score_sum", "CASE WHEN {row}.progress_status = 'completed' THEN COALESCE({row}.score, 0) "
+                      "ELSE 0 END"),
+        ("time_spent", "COALESCE({row}.time_spent, 0)"),
+        ("attempts", "COALESCE({row}.attempts_count, 0)"),
+    ]
+    
+    # Jour de rattachement d'une ligne : début du contenu, ou à défaut dernier accès
+    PROGRESS_DAY = "COALESCE(date(COALESCE({row}.started_at, {row}.last_accessed)), '')"
+    
+    def _progress_measures(self, row: str, aggregate: bool = False) -> str:
+        """Expressions des mesures d'une ligne (ou leurs sommes) pour un SELECT"""
+        template = "SUM({expr})" if aggregate else "{expr}"
+        return ", ".join(template.format(expr=expr.format(row=row))
+                         for _, expr in self.PROGRESS_MEASURES)
+    
+    def _progress_upsert(self, table: str, key_columns: str, select: str, additive: bool) -> str:
+        """
+        INSERT ... SELECT d'agrégats de progression, cumulés (additive) ou
+        remplacés en cas de conflit ; dans ce cas seules les lignes qui
+        changent sont écrites
+        """
+        names = [name for name, _ in self.PROGRESS_MEASURES]
+        if additive:
+            assignments = ", ".join(f"{name} = {name} + excluded.{name}" for name in names)
+            condition = ""
+        else:
+            assignments = ", ".join(f"{name} = excluded.{name}" for name in names)
+            condition = "WHERE " + " OR ".join(f"{name} != excluded.{name}" for name in names)
+        return f'''
+                INSERT INTO {table} ({key_columns}, {", ".join(names)})
+                {select}
+                ON CONFLICT ({key_columns}) DO UPDATE SET {assignments} {condition};'''
+    
+    def _progress_rollup_sql(self, row: str, sign: int) -> str:
+        """
+        Ajout (sign = 1) ou retrait (sign = -1) de la contribution d'une ligne
+        de user_progress ("NEW" ou "OLD") aux deux tables d'agrégats
+        
+        Chaque utilisateur a une ligne par catégorie et une ligne de total
+        (category_id = 0), qui compte aussi les contenus supprimés.
+        """
+        day = self.PROGRESS_DAY.format(row=row)
+        category = f"(SELECT category_id FROM educational_content WHERE id = {row}.content_id)"
+        if sign > 0:
+            measures = self._progress_measures(row)
+            return "".join([
+                self._progress_upsert("progress_user_category", "user_id, category_id", f'''
+                SELECT {row}.user_id, category_id, {measures}
+                FROM educational_content WHERE id = {row}.content_id''', additive=True),
+                self._progress_upsert("progress_user_category", "user_id, category_id", f'''
+                SELECT {row}.user_id, 0, {measures} WHERE true''', additive=True),
+                self._progress_upsert("progress_content_daily", "content_id, day", f'''
+                SELECT {row}.content_id, {day}, {measures} WHERE true''', additive=True),
+            ])
+        
+        assignments = ", ".join(f"{name} = {name} - ({expr.format(row=row)})"
+                                for name, expr in self.PROGRESS_MEASURES)
+        statements = []
+        for table, condition in (
+                ("progress_user_category", f"user_id = {row}.user_id AND category_id = {category}"),
+                ("progress_user_category", f"user_id = {row}.user_id AND category_id = 0"),
+                ("progress_content_daily", f"content_id = {row}.content_id AND day = {day}")):
+            statements.append(f'''
+                UPDATE {table} SET {assignments} WHERE {condition};
+                DELETE FROM {table} WHERE {condition} AND tracked <= 0;''')
+        return "".join(statements)
+    
+    def _progress_category_rebuild_sql(self, content: str, categories: str, exclude: str) -> str:
+        """
+        Recalcule les lignes par catégorie des utilisateurs ayant progressé
+        sur un contenu (changement de catégorie ou suppression du contenu)
+        """
+        users = f"(SELECT user_id FROM user_progress WHERE content_id = {content})"
+        return f'''
+                DELETE FROM progress_user_category
+                WHERE category_id IN ({categories}) AND user_id IN {users};''' + \
+            self._progress_upsert("progress_user_category", "user_id, category_id", f'''
+                SELECT up.user_id, ec.category_id, {self._progress_measures("up", aggregate=True)}
+                FROM user_progress up JOIN educational_content ec ON ec.id = up.content_id
+                WHERE ec.category_id IN ({categories}) AND up.content_id != {exclude}
+                  AND up.user_id IN {users}
+                GROUP BY up.user_id, ec.category_id''', additive=False)
+    
+    def _create_progress_triggers(self, cursor):
+        """
+        Crée les triggers qui maintiennent progress_user_category et progress_content_daily
+        
+        Une ligne de user_progress insérée, modifiée ou supprimée ne touche
+        que les agrégats de son utilisateur (catégorie et total) et de son
+        contenu au jour de rattachement.
+        """
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS user_progress_rollups_insert
+            AFTER INSERT ON user_progress
+            BEGIN{self._progress_rollup_sql("NEW", 1)}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS user_progress_rollups_delete
+            AFTER DELETE ON user_progress
+            BEGIN{self._progress_rollup_sql("OLD", -1)}
+            END
+        ''')
+        # Les accès (last_accessed) sans effet sur les mesures ni sur le jour
+        # de rattachement ne touchent pas aux agrégats
+        changed = " OR ".join([f"OLD.{column} IS NOT NEW.{column}" for column in (
+            "user_id", "content_id", "progress_status", "score", "time_spent", "attempts_count")]
+            + [f"{self.PROGRESS_DAY.format(row='OLD')} IS NOT {self.PROGRESS_DAY.format(row='NEW')}"])
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS user_progress_rollups_update
+            AFTER UPDATE OF user_id, content_id, progress_status, score, time_spent,
+                            attempts_count, started_at, last_accessed ON user_progress
+            WHEN {changed}
+            BEGIN{self._progress_rollup_sql("OLD", -1)}{self._progress_rollup_sql("NEW", 1)}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS user_progress_rollups_category
+            AFTER UPDATE OF category_id ON educational_content
+            WHEN OLD.category_id IS NOT NEW.category_id
+            BEGIN{self._progress_category_rebuild_sql("NEW.id", "OLD.category_id, NEW.category_id", "-1")}
+            END
+        ''')
+        # Avant suppression : les lignes de progression du contenu existent encore
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS user_progress_rollups_content_delete
+            BEFORE DELETE ON educational_content
+            BEGIN{self._progress_category_rebuild_sql("OLD.id", "OLD.category_id", "OLD.id")}
+            END
+        ''')
+    
+    def _refresh_progress_rollups(self, cursor, table: str, first_id: int = 0,
+                                  last_id: Optional[int] = None) -> int:
+        """
+        Recalcule depuis user_progress les agrégats d'une plage d'identifiants
+        (utilisateurs pour progress_user_category, contenus pour progress_content_daily)
+        
+        Seules les lignes dont la valeur change sont écrites.
+        
+        Returns:
+            Nombre de lignes d'agrégats corrigées
+        """
+        last_id = (1 << 63) - 1 if last_id is None else last_id
+        params = (first_id, last_id)
+        measures = self._progress_measures("up", aggregate=True)
+        if table == "progress_user_category":
+            key_columns = "user_id, category_id"
+            selects = [f'''
+                SELECT up.user_id, ec.category_id, {measures}
+                FROM user_progress up JOIN educational_content ec ON ec.id = up.content_id
+                WHERE up.user_id BETWEEN ? AND ?
+                GROUP BY up.user_id, ec.category_id''', f'''
+                SELECT up.user_id, 0, {measures} FROM user_progress up
+                WHERE up.user_id BETWEEN ? AND ?
+                GROUP BY up.user_id''']
+            stale = '''
+                DELETE FROM progress_user_category
+                WHERE user_id BETWEEN ? AND ?
+                  AND (user_id, category_id) NOT IN (
+                      SELECT up.user_id, ec.category_id
+                      FROM user_progress up JOIN educational_content ec ON ec.id = up.content_id
+                      WHERE up.user_id BETWEEN ? AND ?
+                      UNION ALL
+                      SELECT user_id, 0 FROM user_progress WHERE user_id BETWEEN ? AND ?)
+            '''
+        elif table == "progress_content_daily":
+            key_columns = "content_id, day"
+            selects = [f'''
+                SELECT up.content_id, {self.PROGRESS_DAY.format(row="up")} AS day, {measures}
+                FROM user_progress up
+                WHERE up.content_id BETWEEN ? AND ?
+                GROUP BY up.content_id, day''']
+            stale = f'''
+                DELETE FROM progress_content_daily
+                WHERE content_id BETWEEN ? AND ?
+                  AND (content_id, day) NOT IN (
+                      SELECT up.content_id, {self.PROGRESS_DAY.format(row="up")}
+                      FROM user_progress up WHERE up.content_id BETWEEN ? AND ?)
+            '''
+        else:
+            raise ValueError(f"Table d'agrégats inconnue: {table}")
+        
+        changed = 0
+        for select in selects:
+            changed += cursor.execute(self._progress_upsert(table, key_columns, select, additive=False),
+                                      params).rowcount
+        return changed + cursor.execute(stale, params * stale.count("BETWEEN")).rowcount
+    
+    # Colonnes JSON stockées en TEXT (voir get_json, set_json, patch_json)
+    JSON_COLUMNS = {
+        "users": ("privacy_settings",),
+        "conversations": ("conversation_settings",),
+        "messages": ("location_data",),
+        "notifications": ("data",),
+        "user_interactions": ("interaction_data",),
+        "community_alerts": ("media_urls",),
+    }
+    
+    # Clés JSON filtrées souvent, extraites en colonnes générées VIRTUAL :
+    # table -> ((colonne générée, type, colonne JSON, chemin), ...)
+    JSON_FIELDS = {
+        "users": (("location_sharing", "INTEGER", "privacy_settings", "$.location_sharing"),
+                  ("profile_visible", "INTEGER", "privacy_settings", "$.profile_visible")),
+        "notifications": (("data_alert_id", "INTEGER", "data", "$.alert_id"),),
+        "user_interactions": (("interaction_source", "TEXT", "interaction_data", "$.source"),),
+    }
+    
+    # Index sur les colonnes générées : la valeur extraite est stockée dans
+    # l'index, un filtre sur la clé ne relit plus le JSON de chaque ligne
+    JSON_INDEXES = [
+        "CREATE INDEX IF NOT EXISTS idx_users_location_sharing ON users(location_sharing, is_active)",
+        """CREATE INDEX IF NOT EXISTS idx_notifications_alert
+           ON notifications(data_alert_id) WHERE data_alert_id IS NOT NULL""",
+        """CREATE INDEX IF NOT EXISTS idx_interactions_source
+           ON user_interactions(interaction_source, created_at) WHERE interaction_source IS NOT NULL""",
+    ]
+    
+    @staticmethod
+    def _json_field_sql(sql_type: str, column: str, path: str) -> str:
+        """Définition d'une colonne générée de JSON_FIELDS (après son nom)"""
+        # json_valid : un JSON mal formé donne NULL au lieu d'une erreur de lecture
+        return (f"{sql_type} GENERATED ALWAYS AS (CASE WHEN json_valid({column}) "
+                f"THEN json_extract({column}, '{path}') END) VIRTUAL")
+    
+    def _create_json_fields(self, cursor):
+        """Ajoute les colonnes générées de JSON_FIELDS et leurs index"""
+        for table, fields in self.JSON_FIELDS.items():
+            for name, sql_type, column, path in fields:
+                self._ensure_column(cursor, table, name, self._json_field_sql(sql_type, column, path))
+        for index_sql in self.JSON_INDEXES:
+            cursor.execute(index_sql)
+    
+    def _migration_json_columns(self, conn: sqlite3.Connection):
+        """
+        Migration 10 : clés JSON indexées et réécriture compacte des colonnes JSON
+        
+        Non transactionnelle : les colonnes générées et leurs index sont créés
+        dans une transaction, puis les valeurs existantes sont compactées par
+        lots (compact_json_columns). Une migration interrompue reprend sans
+        dommage, chaque étape étant idempotente.
+        """
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._create_json_fields(conn.cursor())
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        self.compact_json_columns()
+    
+    # Gravité des motifs de signalement (motif inconnu : REPORT_SEVERITY_DEFAULT)
+    REPORT_SEVERITY = {"danger": 100, "harassment": 60, "false_alert": 40, "inappropriate": 30, "spam": 10}
+    REPORT_SEVERITY_DEFAULT = 20
+    
+    # Poids des types de cible dans la priorité de modération (type inconnu : 1)
+    MODERATION_TARGET_WEIGHTS = {"alert": 3, "user": 2, "message": 2, "comment": 1, "advice": 1}
+    
+    def _severity_sql(self, reason: str) -> str:
+        """Expression SQL de la gravité d'un motif de signalement"""
+        cases = " ".join(f"WHEN '{name}' THEN {value}" for name, value in self.REPORT_SEVERITY.items())
+        return f"(CASE {reason} {cases} ELSE {self.REPORT_SEVERITY_DEFAULT} END)"
+    
+    def _moderation_priority_sql(self, target_type: str, severity_sum: str, max_severity: str) -> str:
+        """
+        Expression SQL de la priorité d'une cible signalée
+        
+        Poids du type de cible × (somme des gravités des signalements en
+        attente + gravité maximale) : le nombre de signalements compte via la
+        somme, et un seul signalement grave passe devant quelques spams.
+        """
+        cases = " ".join(f"WHEN '{name}' THEN {weight}"
+                         for name, weight in self.MODERATION_TARGET_WEIGHTS.items())
+        return f"((CASE {target_type} {cases} ELSE 1 END) * ({severity_sum} + {max_severity}))"
+    
+    def _moderation_enqueue_sql(self, row: str) -> str:
+        """Ajoute un signalement en attente (NEW/OLD) aux compteurs de sa cible"""
+        severity = self._severity_sql(f"{row}.reason")
+        reported_at = f"COALESCE({row}.created_at, CURRENT_TIMESTAMP)"
+        return f'''
+            INSERT INTO moderation_queue (target_type, target_id, report_count, severity_sum,
+                                          max_severity, priority, first_reported_at, last_reported_at)
+            SELECT {row}.target_type, {row}.target_id, 1, {severity}, {severity},
+                   {self._moderation_priority_sql(f"{row}.target_type", severity, severity)},
+                   {reported_at}, {reported_at}
+            WHERE {row}.status = 'pending'
+            ON CONFLICT (target_type, target_id) DO UPDATE SET
+                report_count = report_count + 1,
+                severity_sum = severity_sum + excluded.severity_sum,
+                max_severity = MAX(max_severity, excluded.max_severity),
+                priority = {self._moderation_priority_sql(
+                    "target_type", "severity_sum + excluded.severity_sum",
+                    "MAX(max_severity, excluded.max_severity)")},
+                first_reported_at = MIN(first_reported_at, excluded.first_reported_at),
+                last_reported_at = MAX(last_reported_at, excluded.last_reported_at);
+        '''
+    
+    def _moderation_dequeue_sql(self, row: str) -> str:
+        """
+        Retire un signalement qui n'est plus en attente des compteurs de sa cible
+        
+        Le maximum et les dates ne sont relus dans les signalements restants
+        (index partiel idx_reports_pending) que si la ligne retirée les
+        déterminait. La cible quitte la file à son dernier signalement.
+        """
+        severity = self._severity_sql(f"{row}.reason")
+        remaining = f'''FROM reports r
+                    WHERE r.target_type = {row}.target_type AND r.target_id = {row}.target_id
+                      AND r.status = 'pending' AND r.id != {row}.id'''
+        target = (f"target_type = {row}.target_type AND target_id = {row}.target_id "
+                  f"AND {row}.status = 'pending'")
+        return f'''
+            UPDATE moderation_queue SET
+                report_count = report_count - 1,
+                severity_sum = severity_sum - {severity},
+                max_severity = CASE WHEN {severity} < max_severity THEN max_severity ELSE (
+                    SELECT COALESCE(MAX({self._severity_sql("r.reason")}), 0) {remaining}) END,
+                first_reported_at = CASE WHEN {row}.created_at > first_reported_at
+                    THEN first_reported_at ELSE (SELECT MIN(r.created_at) {remaining}) END,
+                last_reported_at = CASE WHEN {row}.created_at < last_reported_at
+                    THEN last_reported_at ELSE (SELECT MAX(r.created_at) {remaining}) END
+            WHERE {target};
+            UPDATE moderation_queue
+            SET priority = {self._moderation_priority_sql("target_type", "severity_sum", "max_severity")}
+            WHERE {target} AND report_count > 0;
+            DELETE FROM moderation_queue WHERE {target} AND report_count <= 0;
+        '''
+    
+    def _create_moderation_triggers(self, cursor):
+        """Crée les triggers qui maintiennent moderation_queue depuis reports"""
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS reports_moderation_insert
+            AFTER INSERT ON reports WHEN NEW.status = 'pending'
+            BEGIN {self._moderation_enqueue_sql("NEW")} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS reports_moderation_delete
+            AFTER DELETE ON reports WHEN OLD.status = 'pending'
+            BEGIN {self._moderation_dequeue_sql("OLD")} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS reports_moderation_update
+            AFTER UPDATE OF target_type, target_id, reason, status, created_at ON reports
+            WHEN OLD.status = 'pending' OR NEW.status = 'pending'
+            BEGIN
+                {self._moderation_dequeue_sql("OLD")}
+                {self._moderation_enqueue_sql("NEW")}
+            END
+        ''')
+    
+    def _moderation_target_types(self, cursor) -> List[str]:
+        """Types de cibles présents dans la file, les signalements en attente ou les poids"""
+        types = set(self.MODERATION_TARGET_WEIGHTS)
+        types.update(row[0] for row in cursor.execute(
+            "SELECT DISTINCT target_type FROM moderation_queue"))
+        # Lecture par sauts dans l'index partiel des signalements en attente
+        target_type = cursor.execute(
+            "SELECT MIN(target_type) FROM reports WHERE status = 'pending'").fetchone()[0]
+        while target_type is not None:
+            types.add(target_type)
+            target_type = cursor.execute('''
+                SELECT MIN(target_type) FROM reports WHERE status = 'pending' AND target_type > ?
+            ''', (target_type,)).fetchone()[0]
+        return sorted(types)
+    
+    def _refresh_moderation_queue(self, cursor, target_type: str, first_id: int = 0,
+                                  last_id: Optional[int] = None) -> int:
+        """
+        Recalcule depuis reports les entrées de la file d'un type de cible,
+        pour les cibles d'id compris entre first_id et last_id
+        
+        Les réservations en cours (status, moderator_id, lease_until) sont
+        conservées ; seules les lignes dont les compteurs changent sont écrites.
+        
+        Returns:
+            Nombre d'entrées corrigées
+        """
+        last_id = (1 << 63) - 1 if last_id is None else last_id
+        params = (target_type, first_id, last_id)
+        severity = self._severity_sql("reason")
+        measures = ("report_count", "severity_sum", "max_severity", "priority",
+                    "first_reported_at", "last_reported_at")
+        changed = cursor.execute(f'''
+            INSERT INTO moderation_queue (target_type, target_id, {", ".join(measures)})
+            SELECT target_type, target_id, COUNT(*), SUM({severity}), MAX({severity}),
+                   {self._moderation_priority_sql("target_type", f"SUM({severity})", f"MAX({severity})")},
+                   MIN(created_at), MAX(created_at)
+            FROM reports
+            WHERE status = 'pending' AND target_type = ? AND target_id BETWEEN ? AND ?
+            GROUP BY target_id
+            ON CONFLICT (target_type, target_id) DO UPDATE SET
+                {", ".join(f"{column} = excluded.{column}" for column in measures)}
+            WHERE ({", ".join(measures)}) IS NOT ({", ".join(f"excluded.{column}" for column in measures)})
+        ''', params).rowcount
+        return changed + cursor.execute('''
+            DELETE FROM moderation_queue
+            WHERE target_type = ? AND target_id BETWEEN ? AND ?
+              AND target_id NOT IN (
+                  SELECT target_id FROM reports
+                  WHERE status = 'pending' AND target_type = ? AND target_id BETWEEN ? AND ?)
+        ''', params * 2).rowcount
+    
+    def _migration_moderation_queue(self, cursor):
+        """
+        Migration 11 : file de modération, une entrée par cible signalée
+        (voir claim_moderation_item)
+        """
+        self._create_indexes(cursor)
+        self._create_moderation_queue(cursor)
+        self._create_moderation_triggers(cursor)
+        for target_type in self._moderation_target_types(cursor):
+            self._refresh_moderation_queue(cursor, target_type)
+    
+    def _create_moderation_queue(self, cursor):
+        """
+        Crée la table de la file de modération et ses index
+        
+        claimed_report_id : plus grand id des signalements en attente au
+        moment de la réservation ; resolve_moderation_item ne clôt que
+        ceux-là.
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS moderation_queue (
+                target_type TEXT NOT NULL,
+                target_id INTEGER NOT NULL,
+                report_count INTEGER NOT NULL DEFAULT 0,
+                severity_sum INTEGER NOT NULL DEFAULT 0,
+                max_severity INTEGER NOT NULL DEFAULT 0,
+                priority INTEGER NOT NULL DEFAULT 0,
+                first_reported_at TEXT,
+                last_reported_at TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                moderator_id INTEGER,
+                lease_until TEXT,
+                claims INTEGER NOT NULL DEFAULT 0,
+                claimed_report_id INTEGER,
+                PRIMARY KEY (target_type, target_id)
+            ) WITHOUT ROWID
+        ''')
+        # Prochaine cible à traiter : premier élément de l'index partiel
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_moderation_queue_pending
+            ON moderation_queue(priority DESC, first_reported_at) WHERE status = 'pending'
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_moderation_queue_leases
+            ON moderation_queue(lease_until) WHERE status = 'claimed'
+        ''')
+    
+    def _migration_moderation_claims(self, cursor):
+        """
+        Migration 14 : signalements vus à la réservation (claimed_report_id)
+        
+        La file, dérivée de reports, est recréée plutôt que modifiée par
+        ALTER TABLE : sa définition reste celle d'une base neuve. Les
+        réservations en cours sont conservées et couvrent les signalements
+        déjà en attente. Sans effet si le groupe moderation est différé.
+        """
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(moderation_queue)")}
+        if not columns or "claimed_report_id" in columns:
+            return
+        claims = [tuple(row) for row in cursor.execute('''
+            SELECT status, moderator_id, lease_until, claims, target_type, target_id
+            FROM moderation_queue WHERE claims > 0
+        ''')]
+        cursor.execute("DROP TABLE moderation_queue")
+        self._create_moderation_queue(cursor)
+        for target_type in self._moderation_target_types(cursor):
+            self._refresh_moderation_queue(cursor, target_type)
+        cursor.executemany(f'''
+            UPDATE moderation_queue
+            SET status = ?1, moderator_id = ?2, lease_until = ?3, claims = ?4,
+                claimed_report_id = CASE WHEN ?1 = 'claimed' THEN ({self.CLAIMED_REPORT_SQL}) END
+            WHERE target_type = ?5 AND target_id = ?6
+        ''', claims)
+    
+    # Plus grand id des signalements en attente de la cible d'une ligne de la file
+    CLAIMED_REPORT_SQL = '''
+        SELECT MAX(r.id) FROM reports r
+        WHERE r.target_type = moderation_queue.target_type
+          AND r.target_id = moderation_queue.target_id AND r.status = 'pending'
+    '''
+    
+    # Triggers d'agrégats désactivables par bulk_load(defer_aggregates=True) :
+    # table -> (préfixe des triggers, méthode de création, méthode de recalcul)
+    AGGREGATE_TRIGGERS = {
+        "ratings": ("ratings_aggregates_", "_create_rating_triggers", "recompute_rating_aggregates"),
+        "user_progress": ("user_progress_rollups_", "_create_progress_triggers",
+                          "recompute_progress_rollups"),
+        "reports": ("reports_moderation_", "_create_moderation_triggers", "recompute_moderation_queue"),
+    }
+    
+    # Index secondaires (voir _create_indexes et bulk_load)
+    INDEXES = [
+        "CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)",
+        "CREATE INDEX IF NOT EXISTS idx_users_location ON users(latitude, longitude)",
+        # Historique paginé (get_messages) : clé (conversation_id, sent_at, id),
+        # couvrant pour les colonnes de la liste (MESSAGE_LIST_COLUMNS) ; les
+        # corps des messages de la page sont relus par rowid
+        """CREATE INDEX IF NOT EXISTS idx_messages_history ON messages(
+            conversation_id, sent_at, id, sender_id, message_type, status,
+            reply_to_message_id, is_edited
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_alerts_location ON community_alerts(latitude, longitude)",
+        "CREATE INDEX IF NOT EXISTS idx_alerts_type ON community_alerts(alert_type, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_participants_user ON conversation_participants(user_id, is_active)",
+        "CREATE INDEX IF NOT EXISTS idx_notifications_user ON notifications(user_id, is_read)",
+        "CREATE INDEX IF NOT EXISTS idx_notifications_feed ON notifications(user_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_notifications_created ON notifications(created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_interactions_created ON user_interactions(created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_user_progress_user ON user_progress(user_id, progress_status)",
+        "CREATE INDEX IF NOT EXISTS idx_user_progress_content ON user_progress(content_id)",
+        # Adjacence des connexions acceptées dans les deux sens (index couvrants
+        # partiels) : l'utilisateur peut être user1_id comme user2_id
+        """CREATE INDEX IF NOT EXISTS idx_connections_accepted_user1
+           ON parent_connections(user1_id, user2_id, trust_score) WHERE status = 'accepted'""",
+        """CREATE INDEX IF NOT EXISTS idx_connections_accepted_user2
+           ON parent_connections(user2_id, user1_id, trust_score) WHERE status = 'accepted'""",
+        "CREATE INDEX IF NOT EXISTS idx_connections_user2 ON parent_connections(user2_id)",
+        # Notes d'une cible (index couvrant pour le recalcul des agrégats)
+        "CREATE INDEX IF NOT EXISTS idx_ratings_target ON ratings(target_type, target_id, rating)",
+        # Signalements en attente d'une cible (index partiel couvrant pour la
+        # file de modération) ; historique par statut et par modérateur
+        """CREATE INDEX IF NOT EXISTS idx_reports_pending
+           ON reports(target_type, target_id, reason, created_at) WHERE status = 'pending'""",
+        "CREATE INDEX IF NOT EXISTS idx_reports_status ON reports(status, created_at)",
+        """CREATE INDEX IF NOT EXISTS idx_reports_reviewer
+           ON reports(reviewed_by, reviewed_at) WHERE reviewed_by IS NOT NULL""",
+    ]
+    
+    def _create_indexes(self, cursor):
+        """Crée les index pour optimiser les performances"""
+        for index_sql in self.INDEXES:
+            cursor.execute(index_sql)
+    
+    def _ensure_column(self, cursor, table: str, column: str, definition: str) -> bool:
+        """
+        Ajoute une colonne à une table existante si elle est absente
+        
+        Returns:
+            True si la colonne a été ajoutée
+        """
+        # table_xinfo : inclut les colonnes générées
+        columns = {row[1] for row in cursor.execute(f"PRAGMA table_xinfo({table})")}
+        if column in columns:
+            return False
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        return True
+    
+    def _create_counter_triggers(self, cursor):
+        """
+        Crée les triggers qui maintiennent les compteurs de la messagerie
+        
+        - conversation_participants.unread_count : messages des autres
+          participants envoyés après last_read_at
+        - conversations.last_message_at : date du message le plus récent
+        - conversations.participants_count : nombre de participants actifs
+        
+        Chaque trigger ne touche que les lignes de la conversation concernée,
+        la lecture de la boîte de réception ne dépend donc plus du volume
+        d'historique (voir get_inbox).
+        """
+        # Nouveau message : +1 pour les participants qui ne l'ont pas lu
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS messages_counters_insert
+            AFTER INSERT ON messages
+            BEGIN
+                UPDATE conversation_participants
+                SET unread_count = unread_count + 1
+                WHERE conversation_id = NEW.conversation_id
+                  AND user_id != NEW.sender_id
+                  AND (last_read_at IS NULL OR last_read_at < NEW.sent_at);
+                UPDATE conversations
+                SET last_message_at = NEW.sent_at
+                WHERE id = NEW.conversation_id
+                  AND (last_message_at IS NULL OR last_message_at < NEW.sent_at);
+            END
+        ''')
+        
+        # Message supprimé : -1 là où il était compté
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS messages_counters_delete
+            AFTER DELETE ON messages
+            BEGIN
+                UPDATE conversation_participants
+                SET unread_count = unread_count - 1
+                WHERE conversation_id = OLD.conversation_id
+                  AND user_id != OLD.sender_id
+                  AND (last_read_at IS NULL OR last_read_at < OLD.sent_at)
+                  AND unread_count > 0;
+                UPDATE conversations
+                SET last_message_at = (
+                    SELECT MAX(sent_at) FROM messages WHERE conversation_id = OLD.conversation_id
+                )
+                WHERE id = OLD.conversation_id AND last_message_at = OLD.sent_at;
+            END
+        ''')
+        
+        # Message déplacé ou réattribué : équivalent à une suppression + insertion
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS messages_counters_update
+            AFTER UPDATE OF conversation_id, sender_id, sent_at ON messages
+            BEGIN
+                UPDATE conversation_participants
+                SET unread_count = unread_count - 1
+                WHERE conversation_id = OLD.conversation_id
+                  AND user_id != OLD.sender_id
+                  AND (last_read_at IS NULL OR last_read_at < OLD.sent_at)
+                  AND unread_count > 0;
+                UPDATE conversation_participants
+                SET unread_count = unread_count + 1
+                WHERE conversation_id = NEW.conversation_id
+                  AND user_id != NEW.sender_id
+                  AND (last_read_at IS NULL OR last_read_at < NEW.sent_at);
+                UPDATE conversations
+                SET last_message_at = (
+                    SELECT MAX(sent_at) FROM messages WHERE conversation_id = conversations.id
+                )
+                WHERE id IN (OLD.conversation_id, NEW.conversation_id);
+            END
+        ''')
+        
+        # Lecture : recalcul limité aux messages postérieurs à last_read_at
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS participants_counters_read
+            AFTER UPDATE OF last_read_at ON conversation_participants
+            BEGIN
+                UPDATE conversation_participants
+                SET unread_count = (
+                    SELECT COUNT(*) FROM messages
+                    WHERE conversation_id = NEW.conversation_id
+                      AND sender_id != NEW.user_id
+                      AND (NEW.last_read_at IS NULL OR sent_at > NEW.last_read_at)
+                )
+                WHERE id = NEW.id;
+            END
+        ''')
+        
+        # Arrivée d'un participant
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS participants_counters_insert
+            AFTER INSERT ON conversation_participants
+            BEGIN
+                UPDATE conversation_participants
+                SET unread_count = (
+                    SELECT COUNT(*) FROM messages
+                    WHERE conversation_id = NEW.conversation_id
+                      AND sender_id != NEW.user_id
+                      AND (NEW.last_read_at IS NULL OR sent_at > NEW.last_read_at)
+                )
+                WHERE id = NEW.id;
+                UPDATE conversations
+                SET participants_count = (
+                    SELECT COUNT(*) FROM conversation_participants
+                    WHERE conversation_id = NEW.conversation_id AND is_active = 1
+                )
+                WHERE id = NEW.conversation_id;
+            END
+        ''')
+        
+        # Départ ou (dés)activation d'un participant
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS participants_counters_delete
+            AFTER DELETE ON conversation_participants
+            BEGIN
+                UPDATE conversations
+                SET participants_count = (
+                    SELECT COUNT(*) FROM conversation_participants
+                    WHERE conversation_id = OLD.conversation_id AND is_active = 1
+                )
+                WHERE id = OLD.conversation_id;
+            END
+        ''')
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS participants_counters_active
+            AFTER UPDATE OF is_active ON conversation_participants
+            BEGIN
+                UPDATE conversations
+                SET participants_count = (
+                    SELECT COUNT(*) FROM conversation_participants
+                    WHERE conversation_id = NEW.conversation_id AND is_active = 1
+                )
+                WHERE id = NEW.conversation_id;
+            END
+        ''')
+    
+    # Index plein texte : type de recherche -> (table source, table FTS5, colonnes)
+    SEARCH_INDEXES = {
+        "education": ("educational_content", "educational_content_fts", ("title", "content", "tags")),
+        "advice": ("parenting_advice", "parenting_advice_fts", ("title", "content", "tags")),
+        "alerts": ("community_alerts", "community_alerts_fts", ("title", "description")),
+    }
+    
+    def _create_search_indexes(self, cursor):
+        """
+        Crée les index FTS5 (contenu externe) et leurs triggers de synchronisation
+        
+        Le tokenizer unicode61 avec remove_diacritics rend la recherche
+        insensible aux accents ("securite" trouve "sécurité").
+        """
+        for table, fts, columns in self.SEARCH_INDEXES.values():
+            exists = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                    (fts,)).fetchone()
+            column_list = ", ".join(columns)
+            new_values = ", ".join(f"NEW.{column}" for column in columns)
+            old_values = ", ".join(f"OLD.{column}" for column in columns)
+            
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                    {column_list},
+                    content='{table}', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            ''')
+            
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table}
+                BEGIN
+                    INSERT INTO {fts} (rowid, {column_list}) VALUES (NEW.id, {new_values});
+                END
+            ''')
+            
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table}
+                BEGIN
+                    INSERT INTO {fts} ({fts}, rowid, {column_list})
+                    VALUES ('delete', OLD.id, {old_values});
+                END
+            ''')
+            
+            # Seules les colonnes indexées déclenchent une réindexation
+            # (pas les compteurs de vues ou de likes)
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF id, {column_list} ON {table}
+                BEGIN
+                    INSERT INTO {fts} ({fts}, rowid, {column_list})
+                    VALUES ('delete', OLD.id, {old_values});
+                    INSERT INTO {fts} (rowid, {column_list}) VALUES (NEW.id, {new_values});
+                END
+            ''')
+            
+            if not exists:
+                # Indexation des lignes déjà présentes
+                cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+    
+    # Tables indexées spatialement : (table source, table R*Tree)
+    SPATIAL_TABLES = [
+        ("community_alerts", "community_alerts_rtree"),
+        ("users", "users_rtree"),
+    ]
+    
+    def _create_spatial_indexes(self, cursor):
+        """
+        Crée les index spatiaux R*Tree et les triggers qui les synchronisent
+        
+        Chaque point (latitude, longitude) est stocké comme une boîte dégénérée.
+        Les coordonnées R*Tree sont en float32 arrondi vers l'extérieur : la
+        boîte sert uniquement de pré-filtre, la distance exacte est recalculée
+        sur les colonnes REAL de la table source.
+        """
+        for table, rtree in self.SPATIAL_TABLES:
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS {rtree} USING rtree(
+                    id, min_lat, max_lat, min_lon, max_lon
+                )
+            ''')
+            
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {rtree}_insert
+                AFTER INSERT ON {table}
+                WHEN NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL
+                BEGIN
+                    INSERT INTO {rtree} (id, min_lat, max_lat, min_lon, max_lon)
+                    VALUES (NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude);
+                END
+            ''')
+            
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {rtree}_update
+                AFTER UPDATE OF id, latitude, longitude ON {table}
+                BEGIN
+                    DELETE FROM {rtree} WHERE id = OLD.id;
+                    INSERT INTO {rtree} (id, min_lat, max_lat, min_lon, max_lon)
+                    SELECT NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude
+                    WHERE NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL;
+                END
+            ''')
+            
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {rtree}_delete
+                AFTER DELETE ON {table}
+                BEGIN
+                    DELETE FROM {rtree} WHERE id = OLD.id;
+                END
+            ''')
+            
+            # Rattrapage des lignes existantes (bases créées avant l'index spatial)
+            cursor.execute(f'''
+                INSERT INTO {rtree} (id, min_lat, max_lat, min_lon, max_lon)
+                SELECT t.id, t.latitude, t.latitude, t.longitude, t.longitude
+                FROM {table} t
+                WHERE t.latitude IS NOT NULL AND t.longitude IS NOT NULL
+                  AND NOT EXISTS (SELECT 1 FROM {rtree} r WHERE r.id = t.id)
+            ''')
+    
+    # =============================================
+    # REQUÊTES DE PROXIMITÉ
+    # =============================================
+    
+    def _find_near(self, table: str, rtree: str, lat: float, lon: float, radius_m: float,
+                   filters: Optional[List[str]] = None,
+                   params: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Recherche les lignes d'une table à moins de radius_m mètres d'un point
+        
+        Pré-filtre par boîte englobante sur le R*Tree, puis raffinement exact
+        par la formule de haversine. Les résultats sont triés par distance.
+        
+        Le raffinement lit les lignes par position et seules les lignes
+        retenues sont converties en dict : sur 1M d'alertes, ce traitement
+        Python coûtait plus que la requête elle-même.
+        """
+        if radius_m < 0:
+            raise ValueError("radius_m doit être positif")
+        
+        lat_min, lat_max, lon_ranges = bounding_box(lat, lon, radius_m)
+        lon_clause = " OR ".join("(r.max_lon >= ? AND r.min_lon <= ?)" for _ in lon_ranges)
+        where = ["r.max_lat >= ? AND r.min_lat <= ?", f"({lon_clause})"]
+        query_params: List[Any] = [lat_min, lat_max]
+        for lon_min, lon_max in lon_ranges:
+            query_params.extend([lon_min, lon_max])
+        if filters:
+            where.extend(filters)
+            query_params.extend(params or [])
+        
+        # CROSS JOIN impose le R*Tree en table externe : sans cela, après ANALYZE,
+        # le planificateur peut parcourir toute la table source
+        cursor = self.connect().execute(f'''
+            SELECT t.* FROM {rtree} r
+            CROSS JOIN {table} t ON t.id = r.id
+            WHERE {" AND ".join(where)}
+        ''', query_params)
+        columns = [description[0] for description in cursor.description]
+        lat_index, lon_index = columns.index("latitude"), columns.index("longitude")
+        distance = distance_from(lat, lon)
+        
+        results = []
+        for row in cursor:
+            distance_m = distance(row[lat_index], row[lon_index])
+            if distance_m <= radius_m:
+                item = dict(zip(columns, row))
+                item["distance_m"] = distance_m
+                results.append(item)
+        results.sort(key=lambda item: item["distance_m"])
+        return results
+    
+    def find_alerts_near(self, lat: float, lon: float, radius_m: float,
+                         since: Optional[Union[str, datetime]] = None,
+                         alert_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Retourne les alertes communautaires situées dans un rayon donné
+        
+        Args:
+            lat: Latitude du point de référence
+            lon: Longitude du point de référence
+            radius_m: Rayon de recherche en mètres
+            since: Ne retourne que les alertes créées à partir de cette date
+            alert_type: Ne retourne que les alertes de ce type
+            
+        Returns:
+            Liste des alertes (dict) avec leur distance en mètres ("distance_m"),
+            triées de la plus proche à la plus éloignée
+        """
+        filters = []
+        params: List[Any] = []
+        if since is not None:
+            if isinstance(since, datetime):
+                since = since.strftime("%Y-%m-%d %H:%M:%S")
+            filters.append("t.created_at >= ?")
+            params.append(since)
+        if alert_type is not None:
+            filters.append("t.alert_type = ?")
+            params.append(alert_type)
+        return self._find_near("community_alerts", "community_alerts_rtree",
+                               lat, lon, radius_m, filters, params)
+    
+    def find_users_near(self, lat: float, lon: float, radius_m: float) -> List[Dict[str, Any]]:
+        """
+        Retourne les utilisateurs actifs situés dans un rayon donné
+        
+        Args:
+            lat: Latitude du point de référence
+            lon: Longitude du point de référence
+            radius_m: Rayon de recherche en mètres
+            
+        Returns:
+            Liste des utilisateurs (dict) avec leur distance ("distance_m")
+        """
+        return self._find_near("users", "users_rtree", lat, lon, radius_m, ["t.is_active = 1"])
+    
+    # =============================================
+    # DIFFUSION DES ALERTES
+    # =============================================
+    
+    # Rayon de diffusion (mètres) selon la gravité de l'alerte
+    FANOUT_RADIUS_M = {"low": 1000.0, "medium": 2000.0, "high": 5000.0, "critical": 10000.0}
+    
+    # Nombre de tentatives avant qu'une diffusion soit marquée en échec
+    FANOUT_MAX_ATTEMPTS = 5
+    
+    def fan_out_alert(self, alert_id: int, radius_m: Optional[float] = None,
+                      batch_size: int = 5000, lease_seconds: float = 60.0) -> int:
+        """
+        Crée une notification par parent à proximité d'une alerte
+        
+        Destinataires : utilisateurs actifs, avec un jeton de notification,
+        ayant activé privacy_settings.location_sharing, situés dans le rayon
+        (hors auteur de l'alerte). Ils sont sélectionnés en une requête
+        (R*Tree + haversine) dans une table temporaire, puis les notifications
+        sont insérées par lots de batch_size, par ordre d'identifiant.
+        
+        Chaque lot avance alert_fanout.last_user_id dans la même transaction :
+        une diffusion interrompue reprend là où elle s'était arrêtée et un
+        parent n'est jamais notifié deux fois pour la même alerte, même si
+        deux workers traitent l'alerte en même temps.
+        
+        Args:
+            alert_id: Identifiant de l'alerte
+            radius_m: Rayon de diffusion (par défaut selon FANOUT_RADIUS_M)
+            batch_size: Nombre de notifications insérées par transaction
+            lease_seconds: Prolongation du bail du worker à chaque lot
+            
+        Returns:
+            Nombre de notifications créées par cet appel
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size doit être supérieur ou égal à 1")
+        conn = self.connect()
+        if conn.in_transaction:
+            conn.commit()
+        alert = conn.execute('''
+            SELECT id, user_id, title, alert_type, severity, latitude, longitude
+            FROM community_alerts WHERE id = ?
+        ''', (alert_id,)).fetchone()
+        if alert is None:
+            raise ValueError(f"Alerte inconnue: {alert_id}")
+        conn.execute("INSERT OR IGNORE INTO alert_fanout (alert_id) VALUES (?)", (alert_id,))
+        conn.commit()
+        if radius_m is None:
+            radius_m = self.FANOUT_RADIUS_M.get(alert["severity"], self.FANOUT_RADIUS_M["medium"])
+        
+        # Sélection ensembliste des destinataires
+        conn.create_function("haversine_m", 4, haversine_m, deterministic=True)
+        conn.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS fanout_recipients (
+                user_id INTEGER PRIMARY KEY,
+                distance_m REAL
+            )
+        ''')
+        conn.execute("DELETE FROM temp.fanout_recipients")
+        lat_min, lat_max, lon_ranges = bounding_box(alert["latitude"], alert["longitude"], radius_m)
+        lon_clause = " OR ".join("(r.max_lon >= ? AND r.min_lon <= ?)" for _ in lon_ranges)
+        params: List[Any] = [alert["latitude"], alert["longitude"], lat_min, lat_max]
+        for lon_min, lon_max in lon_ranges:
+            params.extend([lon_min, lon_max])
+        params.extend([alert["user_id"], radius_m])
+        # MATERIALIZED : sans lui, la sous-requête aplatie calcule la distance deux fois
+        conn.execute(f'''
+            WITH candidates AS MATERIALIZED (
+                SELECT u.id, haversine_m(?, ?, u.latitude, u.longitude) AS distance_m
+                FROM users_rtree r
+                CROSS JOIN users u ON u.id = r.id
+                WHERE r.max_lat >= ? AND r.min_lat <= ? AND ({lon_clause})
+                  AND u.id != ?
+                  AND u.is_active = 1
+                  AND u.notification_token IS NOT NULL
+                  AND u.location_sharing = 1
+            )
+            INSERT INTO temp.fanout_recipients (user_id, distance_m)
+            SELECT id, distance_m FROM candidates WHERE distance_m <= ?
+        ''', params)
+        conn.commit()
+        
+        priority = "high" if alert["severity"] in ("high", "critical") else "normal"
+        created = 0
+        try:
+            while True:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    # Progression relue sous verrou d'écriture : pas de doublon entre workers
+                    progress = conn.execute('''
+                        SELECT status, last_user_id FROM alert_fanout WHERE alert_id = ?
+                    ''', (alert_id,)).fetchone()
+                    if progress["status"] == "done":
+                        conn.commit()
+                        break
+                    upper, count = conn.execute('''
+                        SELECT MAX(user_id), COUNT(*) FROM (
+                            SELECT user_id FROM temp.fanout_recipients
+                            WHERE user_id > ? ORDER BY user_id LIMIT ?
+                        )
+                    ''', (progress["last_user_id"], batch_size)).fetchone()
+                    if not count:
+                        conn.execute('''
+                            UPDATE alert_fanout
+                            SET status = 'done', lease_until = NULL, error = NULL,
+                                finished_at = CURRENT_TIMESTAMP
+                            WHERE alert_id = ?
+                        ''', (alert_id,))
+                        conn.commit()
+                        break
+                    conn.execute('''
+                        INSERT INTO notifications (user_id, title, message, type, data, priority)
+                        SELECT user_id, ?, ?, 'alert',
+                               json_object('alert_id', ?, 'alert_type', ?,
+                                           'distance_m', CAST(round(distance_m) AS INTEGER)),
+                               ?
+                        FROM temp.fanout_recipients
+                        WHERE user_id > ? AND user_id <= ?
+                        ORDER BY user_id
+                    ''', ("⚠️ Alerte à proximité", alert["title"], alert_id, alert["alert_type"],
+                          priority, progress["last_user_id"], upper))
+                    conn.execute('''
+                        UPDATE alert_fanout
+                        SET last_user_id = ?, recipients = recipients + ?,
+                            lease_until = datetime('now', ?)
+                        WHERE alert_id = ?
+                    ''', (upper, count, f"+{int(lease_seconds)} seconds", alert_id))
+                    conn.commit()
+                except BaseException:
+                    conn.rollback()
+                    raise
+                created += count
+        finally:
+            conn.execute("DELETE FROM temp.fanout_recipients")
+            conn.commit()
+        return created
+    
+    def claim_pending_alert(self, worker: str, lease_seconds: float = 60.0) -> Optional[int]:
+        """
+        Réserve la plus ancienne alerte en attente de diffusion
+        
+        Une alerte dont le bail a expiré (worker arrêté en cours de diffusion)
+        est de nouveau réservable ; fan_out_alert reprend alors sa progression.
+        
+        Returns:
+            Identifiant de l'alerte réservée, ou None si la file est vide
+        """
+        conn = self.connect()
+        if conn.in_transaction:
+            conn.commit()
+        rows = conn.execute('''
+            UPDATE alert_fanout
+            SET status = 'running', worker = ?, attempts = attempts + 1,
+                lease_until = datetime('now', ?)
+            WHERE alert_id = (
+                SELECT alert_id FROM alert_fanout
+                WHERE status = 'pending'
+                   OR (status = 'running' AND lease_until < datetime('now'))
+                ORDER BY queued_at, alert_id
+                LIMIT 1
+            )
+            RETURNING alert_id
+        ''', (worker, f"+{int(lease_seconds)} seconds")).fetchall()
+        conn.commit()
+        return rows[0]["alert_id"] if rows else None
+    
+    def process_pending_alerts(self, worker: Optional[str] = None, max_alerts: Optional[int] = None,
+                               batch_size: int = 5000, lease_seconds: float = 60.0) -> Dict[str, int]:
+        """
+        Diffuse les alertes en attente jusqu'à épuisement de la file
+        
+        Une diffusion en erreur est remise en attente, puis marquée "failed"
+        après FANOUT_MAX_ATTEMPTS tentatives.
+        
+        Args:
+            worker: Nom du worker inscrit dans alert_fanout (par défaut pid/thread)
+            max_alerts: Nombre maximal d'alertes traitées par cet appel
+            batch_size: Voir fan_out_alert
+            lease_seconds: Durée du bail d'une alerte réservée
+            
+        Returns:
+            {"alerts": ..., "notifications": ..., "failed": ...}
+        """
+        worker = worker or f"{os.getpid()}:{threading.get_ident()}"
+        stats = {"alerts": 0, "notifications": 0, "failed": 0}
+        while max_alerts is None or stats["alerts"] + stats["failed"] < max_alerts:
+            alert_id = self.claim_pending_alert(worker, lease_seconds)
+            if alert_id is None:
+                break
+            try:
+                stats["notifications"] += self.fan_out_alert(alert_id, batch_size=batch_size,
+                                                             lease_seconds=lease_seconds)
+                stats["alerts"] += 1
+            except Exception as error:
+                conn = self.connect()
+                if conn.in_transaction:
+                    conn.rollback()
+                conn.execute('''
+                    UPDATE alert_fanout
+                    SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                        lease_until = NULL, error = ?
+                    WHERE alert_id = ?
+                ''', (self.FANOUT_MAX_ATTEMPTS, str(error), alert_id))
+                conn.commit()
+                stats["failed"] += 1
+        return stats
+    
+    # =============================================
+    # CONNEXIONS ENTRE PARENTS
+    # =============================================
+    
+    # Connexions acceptées d'un utilisateur, dans les deux sens (index
+    # couvrants idx_connections_accepted_user1/2, sans lecture de la table)
+    ADJACENCY_SQL = '''
+        SELECT user2_id AS user_id, trust_score FROM parent_connections
+        WHERE user1_id = :user_id AND status = 'accepted'
+        UNION ALL
+        SELECT user1_id AS user_id, trust_score FROM parent_connections
+        WHERE user2_id = :user_id AND status = 'accepted'
+    '''
+    
+    def get_connections(self, user_id: int) -> List[Dict[str, Any]]:
+        """
+        Connexions acceptées d'un utilisateur
+        
+        Pour des parcours répétés (amis d'amis, suggestions), voir
+        db_graph.ConnectionGraph.
+        
+        Returns:
+            Liste de {"user_id", "trust_score"} par identifiant croissant
+        """
+        return [dict(row) for row in self.connect().execute(
+            f"{self.ADJACENCY_SQL} ORDER BY user_id", {"user_id": user_id})]
+    
+    def get_mutual_connections(self, user_id: int, other_id: int) -> List[int]:
+        """Identifiants des connexions acceptées communes à deux utilisateurs"""
+        rows = self.connect().execute(f'''
+            SELECT user_id FROM ({self.ADJACENCY_SQL.replace(":user_id", ":a")})
+            INTERSECT
+            SELECT user_id FROM ({self.ADJACENCY_SQL.replace(":user_id", ":b")})
+            ORDER BY user_id
+        ''', {"a": user_id, "b": other_id})
+        return [row[0] for row in rows]
+    
+    def get_linked_users(self, user_id: int, candidates: Iterable[int]) -> List[int]:
+        """
+        Parmi candidates, utilisateurs ayant déjà une connexion avec user_id
+        quel que soit son statut (en attente, bloquée...)
+        """
+        candidates = list(candidates)
+        if not candidates:
+            return []
+        placeholders = ", ".join("?" for _ in candidates)
+        rows = self.connect().execute(f'''
+            SELECT user2_id FROM parent_connections
+            WHERE user1_id = ? AND user2_id IN ({placeholders})
+            UNION
+            SELECT user1_id FROM parent_connections
+            WHERE user2_id = ? AND user1_id IN ({placeholders})
+        ''', [user_id, *candidates, user_id, *candidates])
+        return [row[0] for row in rows]
+    
+    def prune_connection_changes(self, older_than_days: float = 7.0) -> int:
+        """
+        Purge le journal des connexions (connection_changes)
+        
+        Un instantané plus ancien que la purge se recharge entièrement à sa
+        prochaine mise à jour (voir ConnectionGraph.refresh).
+        
+        Returns:
+            Nombre d'entrées supprimées
+        """
+        conn = self.connect()
+        deleted = conn.execute('''
+            DELETE FROM connection_changes WHERE changed_at < datetime('now', ?)
+        ''', (f"-{older_than_days} days",)).rowcount
+        conn.commit()
+        return deleted
+    
+    # =============================================
+    # RECHERCHE PLEIN TEXTE
+    # =============================================
+    
+    # Poids bm25 par colonne : le titre compte davantage que le corps du texte
+    SEARCH_WEIGHTS = {
+        "education": (10.0, 1.0, 5.0),
+        "advice": (10.0, 1.0, 5.0),
+        "alerts": (10.0, 1.0),
+    }
+    
+    @staticmethod
+    def _fts_query(text: str) -> str:
+        """
+        Convertit une saisie utilisateur en requête FTS5 sûre
+        
+        Chaque mot est cité (la syntaxe FTS5 de la saisie est ignorée) et le
+        dernier mot est recherché comme préfixe.
+        """
+        words = re.findall(r"\w+", text)
+        if not words:
+            return ""
+        terms = [f'"{word}"' for word in words]
+        terms[-1] += "*"
+        return " ".join(terms)
+    
+    def search(self, query: str, kinds: Optional[List[str]] = None,
+               limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Recherche plein texte classée par pertinence (bm25)
+        
+        Args:
+            query: Texte recherché (insensible à la casse et aux accents)
+            kinds: Types de contenu parmi "education", "advice" et "alerts"
+                   (tous par défaut)
+            limit: Nombre maximal de résultats
+            
+        Returns:
+            Liste de résultats (dict) : "kind", "id", "title", "snippet" (termes
+            trouvés entre <b> et </b>) et "score" (plus petit = plus pertinent)
+        """
+        kinds = kinds or list(self.SEARCH_INDEXES)
+        unknown = set(kinds) - set(self.SEARCH_INDEXES)
+        if unknown:
+            raise ValueError(f"Types de recherche inconnus: {', '.join(sorted(unknown))}")
+        match = self._fts_query(query)
+        if not match or limit < 1:
+            return []
+        
+        conn = self.read_connection()
+        results = []
+        for kind in kinds:
+            table, fts, _ = self.SEARCH_INDEXES[kind]
+            weights = ", ".join(str(weight) for weight in self.SEARCH_WEIGHTS[kind])
+            visibility = "AND t.is_published = 1" if table == "educational_content" else ""
+            rows = conn.execute(f'''
+                SELECT t.id, t.title,
+                       snippet({fts}, -1, '<b>', '</b>', '…', 12) AS snippet,
+                       bm25({fts}, {weights}) AS score
+                FROM {fts}
+                JOIN {table} t ON t.id = {fts}.rowid
+                WHERE {fts} MATCH ? {visibility}
+                ORDER BY score
+                LIMIT ?
+            ''', (match, limit)).fetchall()
+            results.extend(dict(row, kind=kind) for row in rows)
+        
+        results.sort(key=lambda item: item["score"])
+        return results[:limit]
+    
+    # =============================================
+    # HISTORIQUE DES MESSAGES
+    # =============================================
+    
+    # Colonnes de la liste, lues dans idx_messages_history, et corps des
+    # messages, relus par rowid pour la seule page retournée
+    MESSAGE_LIST_COLUMNS = (
+        "id, conversation_id, sender_id, message_type, sent_at, is_edited, "
+        "reply_to_message_id, status"
+    )
+    MESSAGE_BODY_COLUMNS = "content, media_url, edited_at, location_data"
+    
+    def get_messages(self, conversation_id: int, before: Optional[Tuple[str, int]] = None,
+                     limit: int = 50) -> Dict[str, Any]:
+        """
+        Retourne une page de l'historique d'une conversation (pagination par curseur)
+        
+        Les messages sont triés du plus récent au plus ancien. Le curseur
+        (sent_at, id) remplace OFFSET : le coût d'une page ne dépend pas de sa
+        profondeur dans l'historique. La page est lue dans idx_messages_history
+        sans accès à la table ; les corps de ses messages, les messages cités
+        et les réactions sont ensuite chargés en une requête chacun.
+        
+        L'index est choisi par le planificateur (pas d'INDEXED BY) : la
+        requête reste valide, plus lente, pendant un bulk_load(drop_indexes=True).
+        
+        Args:
+            conversation_id: Identifiant de la conversation
+            before: Curseur (sent_at, id) du dernier message de la page précédente
+            limit: Nombre maximal de messages à retourner
+            
+        Returns:
+            {"messages": [...], "next_cursor": (sent_at, id) ou None}. Chaque
+            message contient "reply_to" (message cité ou None) et "reactions"
+            ({type de réaction: [identifiants des utilisateurs]})
+        """
+        if limit < 1:
+            raise ValueError("limit doit être supérieur ou égal à 1")
+        conn = self.connect()
+        
+        if before is None:
+            rows = conn.execute(f'''
+                SELECT {self.MESSAGE_LIST_COLUMNS} FROM messages
+                WHERE conversation_id = ?
+                ORDER BY sent_at DESC, id DESC
+                LIMIT ?
+            ''', (conversation_id, limit)).fetchall()
+        else:
+            rows = conn.execute(f'''
+                SELECT {self.MESSAGE_LIST_COLUMNS} FROM messages
+                WHERE conversation_id = ? AND (sent_at, id) < (?, ?)
+                ORDER BY sent_at DESC, id DESC
+                LIMIT ?
+            ''', (conversation_id, before[0], before[1], limit)).fetchall()
+        
+        messages = [dict(row) for row in rows]
+        for message in messages:
+            message["reply_to"] = None
+            message["reactions"] = {}
+        
+        if messages:
+            # Corps des messages de la page (recherche par rowid)
+            by_id = {m["id"]: m for m in messages}
+            placeholders = ", ".join("?" for _ in by_id)
+            for row in conn.execute(f'''
+                SELECT id, {self.MESSAGE_BODY_COLUMNS} FROM messages WHERE id IN ({placeholders})
+            ''', list(by_id)):
+                by_id[row["id"]].update(dict(row))
+            
+            # Messages cités (une seule requête, quelle que soit la page)
+            reply_ids = sorted({m["reply_to_message_id"] for m in messages
+                                if m["reply_to_message_id"] is not None})
+            if reply_ids:
+                reply_placeholders = ", ".join("?" for _ in reply_ids)
+                replies = {row["id"]: dict(row) for row in conn.execute(f'''
+                    SELECT id, sender_id, content, message_type, sent_at
+                    FROM messages WHERE id IN ({reply_placeholders})
+                ''', reply_ids)}
+                for message in messages:
+                    message["reply_to"] = replies.get(message["reply_to_message_id"])
+            
+            # Réactions (index UNIQUE(message_id, user_id, reaction_type))
+            for row in conn.execute(f'''
+                SELECT message_id, reaction_type, user_id FROM message_reactions
+                WHERE message_id IN ({placeholders})
+                ORDER BY message_id, created_at
+            ''', list(by_id)):
+                by_id[row["message_id"]]["reactions"].setdefault(
+                    row["reaction_type"], []).append(row["user_id"])
+        
+        next_cursor = None
+        if len(messages) == limit:
+            next_cursor = (messages[-1]["sent_at"], messages[-1]["id"])
+        return {"messages": messages, "next_cursor": next_cursor}
+    
+    # =============================================
+    # BOÎTE DE RÉCEPTION
+    # =============================================
+    
+    def get_inbox(self, user_id: int) -> List[Dict[str, Any]]:
+        """
+        Retourne les conversations d'un utilisateur, les plus récentes en premier
+        
+        Lit uniquement les compteurs maintenus par les triggers : le coût est
+        proportionnel au nombre de conversations, pas au nombre de messages.
+        
+        Args:
+            user_id: Identifiant de l'utilisateur
+            
+        Returns:
+            Liste de conversations (dict) avec "unread_count", "last_read_at",
+            "is_muted" et le dernier message ("last_message")
+        """
+        rows = self.connect().execute('''
+            SELECT c.id, c.title, c.type, c.last_message_at, c.participants_count,
+                   c.conversation_settings, cp.unread_count, cp.last_read_at, cp.is_muted,
+                   cp.role,
+                   (SELECT m.content FROM messages m
+                    WHERE m.conversation_id = c.id
+                    ORDER BY m.sent_at DESC, m.id DESC LIMIT 1) AS last_message
+            FROM conversation_participants cp
+            JOIN conversations c ON c.id = cp.conversation_id
+            WHERE cp.user_id = ? AND cp.is_active = 1 AND c.is_active = 1
+            ORDER BY c.last_message_at IS NULL, c.last_message_at DESC, c.id DESC
+        ''', (user_id,)).fetchall()
+        return [dict(row) for row in rows]
+    
+    def mark_conversation_read(self, conversation_id: int, user_id: int,
+                               read_at: Optional[Union[str, datetime]] = None):
+        """
+        Marque une conversation comme lue par un utilisateur
+        
+        Args:
+            conversation_id: Identifiant de la conversation
+            user_id: Identifiant de l'utilisateur
+            read_at: Date de lecture (par défaut, le dernier message de la conversation)
+        """
+        conn = self.connect()
+        if read_at is None:
+            row = conn.execute("SELECT last_message_at FROM conversations WHERE id = ?",
+                               (conversation_id,)).fetchone()
+            read_at = row["last_message_at"] if row and row["last_message_at"] else \
+                datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        elif isinstance(read_at, datetime):
+            read_at = read_at.strftime("%Y-%m-%d %H:%M:%S")
+        conn.execute('''
+            UPDATE conversation_participants SET last_read_at = ?
+            WHERE conversation_id = ? AND user_id = ?
+        ''', (read_at, conversation_id, user_id))
+        conn.commit()
+    
+    def check_conversation_counters(self, repair: bool = False) -> Dict[str, List[Tuple]]:
+        """
+        Recalcule les compteurs de la messagerie et les compare aux valeurs stockées
+        
+        Args:
+            repair: Si True, remplace les valeurs incorrectes par les valeurs recalculées
+            
+        Returns:
+            Écarts détectés par compteur : listes de (id, valeur stockée, valeur attendue)
+        """
+        conn = self.connect()
+        mismatches = {
+            "unread_count": [tuple(row) for row in conn.execute('''
+                SELECT cp.id, cp.unread_count, (
+                    SELECT COUNT(*) FROM messages m
+                    WHERE m.conversation_id = cp.conversation_id
+                      AND m.sender_id != cp.user_id
+                      AND (cp.last_read_at IS NULL OR m.sent_at > cp.last_read_at)
+                ) AS expected
+                FROM conversation_participants cp
+                WHERE cp.unread_count IS NOT expected
+            ''')],
+            "last_message_at": [tuple(row) for row in conn.execute('''
+                SELECT c.id, c.last_message_at, (
+                    SELECT MAX(m.sent_at) FROM messages m WHERE m.conversation_id = c.id
+                ) AS expected
+                FROM conversations c
+                WHERE c.last_message_at IS NOT expected
+            ''')],
+            "participants_count": [tuple(row) for row in conn.execute('''
+                SELECT c.id, c.participants_count, (
+                    SELECT COUNT(*) FROM conversation_participants cp
+                    WHERE cp.conversation_id = c.id AND cp.is_active = 1
+                ) AS expected
+                FROM conversations c
+                WHERE EXISTS (SELECT 1 FROM conversation_participants cp
+                              WHERE cp.conversation_id = c.id)
+                  AND c.participants_count IS NOT expected
+            ''')],
+        }
+        
+        if repair:
+            conn.executemany("UPDATE conversation_participants SET unread_count = ? WHERE id = ?",
+                             [(expected, row_id) for row_id, _, expected in mismatches["unread_count"]])
+            conn.executemany("UPDATE conversations SET last_message_at = ? WHERE id = ?",
+                             [(expected, row_id) for row_id, _, expected in mismatches["last_message_at"]])
+            conn.executemany("UPDATE conversations SET participants_count = ? WHERE id = ?",
+                             [(expected, row_id) for row_id, _, expected in mismatches["participants_count"]])
+            conn.commit()
+        return mismatches
+    
+    # =============================================
+    # ÉVALUATIONS
+    # =============================================
+    
+    def rate(self, user_id: int, target_type: str, target_id: int, rating: float,
+             review: Optional[str] = None, is_anonymous: bool = False) -> Dict[str, Any]:
+        """
+        Enregistre (ou remplace) la note d'un utilisateur sur une cible
+        
+        Les agrégats et la colonne de moyenne de la cible sont mis à jour
+        par trigger dans la même transaction.
+        
+        Returns:
+            Résumé de la cible après la note (voir get_rating_summary)
+        """
+        conn = self.connect()
+        conn.execute('''
+            INSERT INTO ratings (user_id, target_id, target_type, rating, review, is_anonymous)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, target_id, target_type) DO UPDATE SET
+                rating = excluded.rating,
+                review = excluded.review,
+                is_anonymous = excluded.is_anonymous,
+                created_at = CURRENT_TIMESTAMP
+        ''', (user_id, target_id, target_type, rating, review, int(is_anonymous)))
+        conn.commit()
+        self._invalidate_rating_target(target_type, target_id)
+        return self.get_rating_summary(target_type, target_id)
+    
+    def remove_rating(self, user_id: int, target_type: str, target_id: int) -> bool:
+        """
+        Supprime la note d'un utilisateur sur une cible
+        
+        Returns:
+            True si une note a été supprimée
+        """
+        conn = self.connect()
+        deleted = conn.execute('''
+            DELETE FROM ratings WHERE user_id = ? AND target_id = ? AND target_type = ?
+        ''', (user_id, target_id, target_type)).rowcount
+        conn.commit()
+        self._invalidate_rating_target(target_type, target_id)
+        return deleted > 0
+    
+    def _invalidate_rating_target(self, target_type: str, target_id: int):
+        """Invalide l'entrée de cache de la cible d'une note"""
+        if target_type in self.RATING_TARGETS:
+            self.invalidate_cache(self.RATING_TARGETS[target_type][0], target_id)
+    
+    def get_rating_summary(self, target_type: str, target_id: int) -> Dict[str, Any]:
+        """
+        Nombre de notes et moyenne d'une cible (lecture de rating_aggregates)
+        
+        Returns:
+            {"rating_count", "average"} (moyenne None sans note)
+        """
+        row = self.connect().execute('''
+            SELECT rating_count, ROUND(average, 2) AS average FROM rating_aggregates
+            WHERE target_type = ? AND target_id = ?
+        ''', (target_type, target_id)).fetchone()
+        if row is None:
+            return {"rating_count": 0, "average": None}
+        return dict(row)
+    
+    def get_top_rated(self, target_type: str, limit: int = 20,
+                      min_count: int = 1) -> List[Dict[str, Any]]:
+        """
+        Cibles les mieux notées, par moyenne puis nombre de notes décroissants
+        
+        Lecture de idx_rating_aggregates_top dans l'ordre : la table ratings
+        n'est pas parcourue.
+        
+        Args:
+            target_type: Type de cible ("content", "advice", "user"...)
+            limit: Nombre de cibles retournées
+            min_count: Nombre minimal de notes pour figurer au classement
+            
+        Returns:
+            Liste de {"target_id", "rating_count", "average"} (et "label" pour
+            les types de RATING_TARGETS)
+        """
+        label = join = ""
+        if target_type in self.RATING_TARGETS:
+            table, _, _, label_column = self.RATING_TARGETS[target_type]
+            label = f", t.{label_column} AS label"
+            join = f"LEFT JOIN {table} t ON t.id = a.target_id"
+        rows = self.read_connection().execute(f'''
+            SELECT a.target_id, a.rating_count, ROUND(a.average, 2) AS average {label}
+            FROM rating_aggregates a {join}
+            WHERE a.target_type = ? AND a.rating_count >= ?
+            ORDER BY a.average DESC, a.rating_count DESC, a.target_id
+            LIMIT ?
+        ''', (target_type, min_count, limit)).fetchall()
+        return [dict(row) for row in rows]
+    
+    def recompute_rating_aggregates(self, target_types: Optional[Sequence[str]] = None,
+                                    batch_size: int = 10000) -> Dict[str, int]:
+        """
+        Recalcule les agrégats des évaluations et les colonnes de moyenne (réparation)
+        
+        Le recalcul avance par plages de batch_size identifiants de cible,
+        chacune dans sa propre transaction : les écritures concurrentes ne
+        sont bloquées que le temps d'une plage.
+        
+        Args:
+            target_types: Types de cibles à recalculer (par défaut tous)
+            batch_size: Nombre d'identifiants de cible par transaction
+            
+        Returns:
+            {"aggregates": agrégats corrigés, "columns": colonnes de moyenne corrigées}
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size doit être supérieur ou égal à 1")
+        conn = self.connect()
+        if conn.in_transaction:
+            conn.commit()
+        if target_types is None:
+            target_types = self._rating_target_types(conn)
+        
+        totals = {"aggregates": 0, "columns": 0}
+        for target_type in target_types:
+            bounds = [conn.execute("SELECT MAX(target_id) FROM ratings WHERE target_type = ?",
+                                   (target_type,)).fetchone()[0],
+                      conn.execute("SELECT MAX(target_id) FROM rating_aggregates WHERE target_type = ?",
+                                   (target_type,)).fetchone()[0]]
+            if target_type in self.RATING_TARGETS:
+                table = self.RATING_TARGETS[target_type][0]
+                bounds.append(conn.execute(f"SELECT MAX(id) FROM {table}").fetchone()[0])
+            last_id = max((bound for bound in bounds if bound is not None), default=0)
+            
+            first_id = 0
+            while first_id <= last_id:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    aggregates, columns = self._refresh_rating_aggregates(
+                        conn.cursor(), target_type, first_id, first_id + batch_size - 1)
+                    conn.commit()
+                except BaseException:
+                    conn.rollback()
+                    raise
+                totals["aggregates"] += aggregates
+                totals["columns"] += columns
+                first_id += batch_size
+        if totals["columns"]:
+            self.invalidate_cache("ratings")
+        return totals
+    
+    # =============================================
+    # CLASSEMENT
+    # =============================================
+    
+    def get_leaderboard(self, limit: int = 20,
+                        category_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Classement des parents par score cumulé sur les contenus terminés
+        
+        Lecture de idx_progress_user_category_rank dans l'ordre (agrégats
+        de la migration 9) : user_progress n'est pas parcourue.
+        
+        Args:
+            limit: Nombre de parents retournés
+            category_id: Limite le classement à une catégorie éducative
+        
+        Returns:
+            Liste (dict) avec "user_id", "name", "total_score" et "completed"
+        """
+        self.ensure_schema_group("education")
+        rows = self.read_connection().execute('''
+            SELECT p.user_id, u.name, p.score_sum AS total_score, p.completed
+            FROM progress_user_category p
+            JOIN users u ON u.id = p.user_id
+            WHERE p.category_id = ? AND p.completed > 0
+            ORDER BY p.score_sum DESC, p.user_id
+            LIMIT ?
+        ''', (category_id if category_id is not None else 0, limit)).fetchall()
+        return [dict(row) for row in rows]
+    
+    def recompute_progress_rollups(self, batch_size: int = 10000) -> Dict[str, int]:
+        """
+        Recalcule les agrégats de progression depuis user_progress (réparation)
+        
+        Le recalcul avance par plages de batch_size utilisateurs (puis
+        contenus), chacune dans sa propre transaction.
+        
+        Returns:
+            Lignes corrigées par table d'agrégats
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size doit être supérieur ou égal à 1")
+        self.ensure_schema_group("education")
+        conn = self.connect()
+        if conn.in_transaction:
+            conn.commit()
+        totals = {}
+        for table, key in (("progress_user_category", "user_id"),
+                           ("progress_content_daily", "content_id")):
+            last_id = max(conn.execute(f"SELECT MAX({key}) FROM user_progress").fetchone()[0] or 0,
+                          conn.execute(f"SELECT MAX({key}) FROM {table}").fetchone()[0] or 0)
+            totals[table] = 0
+            for first_id in range(0, last_id + 1, batch_size):
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    totals[table] += self._refresh_progress_rollups(
+                        conn.cursor(), table, first_id, first_id + batch_size - 1)
+                    conn.commit()
+                except BaseException:
+                    conn.rollback()
+                    raise
+        return totals
+    
+    # =============================================
+    # MODÉRATION
+    # =============================================
+    
+    def report(self, reporter_id: int, target_type: str, target_id: int, reason: str,
+               description: Optional[str] = None) -> int:
+        """
+        Enregistre un signalement ; la cible entre dans la file de modération (trigger)
+        
+        Returns:
+            Identifiant du signalement
+        """
+        if target_type not in self.MODERATION_TARGET_WEIGHTS:
+            raise ValueError(f"Type de cible inconnu: {target_type}")
+        conn = self.connect()
+        cursor = conn.execute('''
+            INSERT INTO reports (reporter_id, target_id, target_type, reason, description)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (reporter_id, target_id, target_type, reason, description))
+        conn.commit()
+        return cursor.lastrowid
+    
+    def claim_moderation_item(self, moderator_id: int,
+                              lease_seconds: float = 300.0) -> Optional[Dict[str, Any]]:
+        """
+        Réserve la cible la plus prioritaire de la file de modération
+        
+        Les réservations expirées sont d'abord remises en attente, puis la
+        première entrée de idx_moderation_queue_pending est réservée, dans
+        une même transaction d'écriture : deux modérateurs ne reçoivent
+        jamais la même cible.
+        
+        Args:
+            moderator_id: Modérateur (users.id)
+            lease_seconds: Durée de la réservation ; passé ce délai, la cible
+                           peut être réservée par un autre modérateur
+            
+        Returns:
+            Entrée de la file réservée (target_type, target_id, report_count,
+            priority, lease_until...), ou None si la file est vide
+        """
+        self.ensure_schema_group("moderation")
+        conn = self.connect()
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute('''
+                UPDATE moderation_queue
+                SET status = 'pending', moderator_id = NULL, lease_until = NULL,
+                    claimed_report_id = NULL
+                WHERE status = 'claimed' AND lease_until < datetime('now')
+            ''')
+            row = conn.execute(f'''
+                UPDATE moderation_queue
+                SET status = 'claimed', moderator_id = ?, lease_until = datetime('now', ?),
+                    claims = claims + 1, claimed_report_id = ({self.CLAIMED_REPORT_SQL})
+                WHERE (target_type, target_id) = (
+                    SELECT target_type, target_id FROM moderation_queue
+                    WHERE status = 'pending'
+                    ORDER BY priority DESC, first_reported_at
+                    LIMIT 1
+                )
+                RETURNING *
+            ''', (moderator_id, f"+{int(lease_seconds)} seconds")).fetchone()
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return dict(row) if row else None
+    
+    def get_moderation_reports(self, target_type: str, target_id: int) -> List[Dict[str, Any]]:
+        """Signalements en attente d'une cible, les plus récents d'abord"""
+        rows = self.connect().execute('''
+            SELECT * FROM reports
+            WHERE target_type = ? AND target_id = ? AND status = 'pending'
+            ORDER BY created_at DESC, id DESC
+        ''', (target_type, target_id)).fetchall()
+        return [dict(row) for row in rows]
+    
+    def resolve_moderation_item(self, moderator_id: int, target_type: str, target_id: int,
+                                action_taken: Optional[str] = None, dismiss: bool = False) -> int:
+        """
+        Clôt les signalements d'une cible réservée par le modérateur
+        
+        Seuls les signalements en attente au moment de la réservation
+        (claimed_report_id) sont clos : ceux déposés depuis n'ont pas été vus
+        et la cible retourne dans la file avec eux. L'entrée est retirée de
+        la file avant la mise à jour des signalements : les triggers n'ont
+        alors plus de compteurs à recalculer.
+        
+        Args:
+            action_taken: Mesure prise ("content_removed", "warning"...)
+            dismiss: Signalements rejetés ("dismissed") plutôt que traités ("reviewed")
+            
+        Returns:
+            Nombre de signalements clos
+            
+        Raises:
+            RuntimeError: si la cible n'est pas (ou plus) réservée par ce modérateur
+        """
+        self.ensure_schema_group("moderation")
+        conn = self.connect()
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            claimed = conn.execute('''
+                DELETE FROM moderation_queue
+                WHERE target_type = ? AND target_id = ? AND status = 'claimed' AND moderator_id = ?
+                RETURNING claimed_report_id
+            ''', (target_type, target_id, moderator_id)).fetchone()
+            if claimed is None:
+                raise RuntimeError(f"Cible {target_type}:{target_id} non réservée par le "
+                                   f"modérateur {moderator_id}")
+            resolved = conn.execute('''
+                UPDATE reports
+                SET status = ?, reviewed_by = ?, reviewed_at = CURRENT_TIMESTAMP, action_taken = ?
+                WHERE target_type = ? AND target_id = ? AND status = 'pending' AND id <= ?
+            ''', ("dismissed" if dismiss else "reviewed", moderator_id, action_taken,
+                  target_type, target_id, claimed[0] or 0)).rowcount
+            # Signalements déposés pendant la réservation : la cible retourne dans la file
+            self._refresh_moderation_queue(conn.cursor(), target_type, target_id, target_id)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return resolved
+    
+    def release_moderation_item(self, moderator_id: int, target_type: str, target_id: int) -> bool:
+        """Rend à la file une cible réservée par le modérateur (sans la traiter)"""
+        self.ensure_schema_group("moderation")
+        conn = self.connect()
+        cursor = conn.execute('''
+            UPDATE moderation_queue
+            SET status = 'pending', moderator_id = NULL, lease_until = NULL, claimed_report_id = NULL
+            WHERE target_type = ? AND target_id = ? AND status = 'claimed' AND moderator_id = ?
+        ''', (target_type, target_id, moderator_id))
+        conn.commit()
+        return cursor.rowcount > 0
+    
+    def moderation_queue_stats(self) -> Dict[str, int]:
+        """Cibles en attente et réservées, et signalements correspondants"""
+        self.ensure_schema_group("moderation")
+        stats = {"pending": 0, "claimed": 0, "reports": 0}
+        for row in self.connect().execute('''
+            SELECT status, COUNT(*) AS targets, SUM(report_count) AS reports
+            FROM moderation_queue GROUP BY status
+        '''):
+            stats[row["status"]] = row["targets"]
+            stats["reports"] += row["reports"] or 0
+        return stats
+    
+    def recompute_moderation_queue(self, batch_size: int = 10000) -> int:
+        """
+        Recalcule la file de modération depuis reports (réparation, poids modifiés)
+        
+        Le recalcul avance par plages de batch_size identifiants de cible,
+        chacune dans sa propre transaction ; les réservations sont conservées.
+        
+        Returns:
+            Nombre d'entrées corrigées
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size doit être supérieur ou égal à 1")
+        self.ensure_schema_group("moderation")
+        conn = self.connect()
+        if conn.in_transaction:
+            conn.commit()
+        
+        changed = 0
+        for target_type in self._moderation_target_types(conn):
+            last_id = max((bound for bound in (
+                conn.execute('''
+                    SELECT MAX(target_id) FROM reports WHERE status = 'pending' AND target_type = ?
+                ''', (target_type,)).fetchone()[0],
+                conn.execute("SELECT MAX(target_id) FROM moderation_queue WHERE target_type = ?",
+                             (target_type,)).fetchone()[0]) if bound is not None), default=0)
+            first_id = 0
+            while first_id <= last_id:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    changed += self._refresh_moderation_queue(
+                        conn.cursor(), target_type, first_id, first_id + batch_size - 1)
+                    conn.commit()
+                except BaseException:
+                    conn.rollback()
+                    raise
+                first_id += batch_size
+        return changed
+    
+    # =============================================
+    # CHARGEMENT EN MASSE
+    # =============================================
+    
+    def _table_indexes(self, table: str) -> List[Tuple[str, str]]:
+        """Index de INDEXES portant sur une table : liste de (nom, instruction CREATE)"""
+        indexes = []
+        for index_sql in self.INDEXES:
+            match = re.search(r"EXISTS\s+(\w+)\s+ON\s+(\w+)\s*\(", index_sql)
+            if match and match.group(2) == table:
+                indexes.append((match.group(1), index_sql))
+        return indexes
+    
+    @staticmethod
+    def _read_rows(source: Union[str, Iterable[Any]]) -> Iterator[Any]:
+        """
+        Itère sur les lignes d'une source de chargement
+        
+        Une chaîne est interprétée comme un chemin de fichier : .csv (avec
+        en-tête, cellule vide = NULL) ou .jsonl / .ndjson (un objet par ligne).
+        Tout autre objet est itéré tel quel (liste, générateur...).
+        """
+        if not isinstance(source, (str, os.PathLike)):
+            yield from source
+            return
+        
+        path = os.fspath(source)
+        extension = os.path.splitext(path)[1].lower()
+        with open(path, newline="", encoding="utf-8") as handle:
+            if extension == ".csv":
+                for row in csv.DictReader(handle):
+                    yield {key: (value if value != "" else None) for key, value in row.items()}
+            elif extension in (".jsonl", ".ndjson"):
+                for line in handle:
+                    if line.strip():
+                        yield json.loads(line)
+            else:
+                raise ValueError(f"Format de fichier non supporté: {path}")
+    
+    def bulk_load(self, table: str, source: Union[str, Iterable[Any]], batch_size: int = 10000,
+                  columns: Optional[Sequence[str]] = None, drop_indexes: bool = False,
+                  defer_aggregates: bool = False,
+                  progress: Optional[Callable[[int, float], None]] = None) -> Dict[str, float]:
+        """
+        Charge un grand volume de lignes dans une table
+        
+        Les lignes sont lues en flux et insérées par lots avec executemany,
+        chaque lot dans sa propre transaction. Les triggers (compteurs, index
+        spatiaux et plein texte) restent actifs, sauf les triggers d'agrégats
+        avec defer_aggregates.
+        
+        Args:
+            table: Table de destination
+            source: Itérable de dict ou de tuples, ou chemin d'un fichier CSV/JSONL
+            batch_size: Nombre de lignes par transaction
+            columns: Colonnes à remplir (obligatoire pour des tuples ; par défaut,
+                     les clés de la première ligne)
+            drop_indexes: Supprime les index secondaires de la table (INDEXES)
+                          pendant le chargement et les reconstruit à la fin
+            defer_aggregates: Supprime les triggers d'agrégats de la table
+                              (AGGREGATE_TRIGGERS) pendant le chargement, puis
+                              les recrée et recalcule les agrégats à la fin
+            progress: Fonction appelée après chaque lot avec (lignes, secondes)
+            
+        Returns:
+            Statistiques : "rows", "batches", "seconds", "rows_per_sec"
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size doit être supérieur ou égal à 1")
+        conn = self.connect()
+        table_columns = [row["name"] for row in conn.execute(
+            "SELECT name FROM pragma_table_info(?)", (table,))]
+        if not table_columns:
+            raise ValueError(f"Table inconnue: {table}")
+        if conn.in_transaction:
+            conn.commit()
+        
+        dropped = self._table_indexes(table) if drop_indexes else []
+        for index_name, _ in dropped:
+            conn.execute(f"DROP INDEX IF EXISTS {index_name}")
+        deferred = self.AGGREGATE_TRIGGERS.get(table) if defer_aggregates else None
+        if deferred is not None and any(self.SCHEMA_GROUPS[name][1] == table
+                                        for name in self._pending_groups()):
+            # Groupe différé : ni triggers ni agrégats tant qu'il n'est pas créé
+            deferred = None
+        if deferred is not None:
+            for (trigger_name,) in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE ?",
+                    (f"{deferred[0]}%",)).fetchall():
+                conn.execute(f"DROP TRIGGER {trigger_name}")
+            conn.commit()
+        
+        rows = batches = 0
+        start = time.perf_counter()
+        insert_sql = None
+        batch: List[Sequence[Any]] = []
+        
+        def flush():
+            nonlocal rows, batches
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(insert_sql, batch)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            rows += len(batch)
+            batches += 1
+            batch.clear()
+            if progress is not None:
+                progress(rows, time.perf_counter() - start)
+        
+        try:
+            for record in self._read_rows(source):
+                if insert_sql is None:
+                    if columns is None:
+                        if not isinstance(record, dict):
+                            raise ValueError("columns est obligatoire pour des lignes non dict")
+                        columns = list(record)
+                    unknown = [column for column in columns if column not in table_columns]
+                    if unknown:
+                        raise ValueError(f"Colonnes inconnues pour {table}: {', '.join(unknown)}")
+                    insert_sql = (f"INSERT INTO {table} ({', '.join(columns)}) "
+                                  f"VALUES ({', '.join('?' for _ in columns)})")
+                
+                values = [record.get(column) for column in columns] \
+                    if isinstance(record, dict) else list(record)
+                # Colonnes JSON stockées en TEXT (forme compacte)
+                batch.append([encode_json(value) if isinstance(value, (dict, list)) else value
+                              for value in values])
+                if len(batch) >= batch_size:
+                    flush()
+            if batch:
+                flush()
+        finally:
+            for _, index_sql in dropped:
+                conn.execute(index_sql)
+            if dropped:
+                conn.commit()
+            if deferred is not None:
+                # Triggers recréés avant le recalcul : les écritures concurrentes
+                # ne sont perdues ni pendant ni après le rattrapage
+                getattr(self, deferred[1])(conn.cursor())
+                conn.commit()
+                getattr(self, deferred[2])()
+        
+        self.invalidate_cache(table)
+        seconds = time.perf_counter() - start
+        return {
+            "rows": rows,
+            "batches": batches,
+            "seconds": seconds,
+            "rows_per_sec": rows / seconds if seconds > 0 else 0.0,
+        }
+    
+    # =============================================
+    # CACHE DES DONNÉES DE RÉFÉRENCE
+    # =============================================
+    
+    # Namespaces du cache invalidés par une écriture sur chaque table :
+    # (namespace, True si ses entrées sont indexées par l'id de la ligne modifiée)
+    CACHE_NAMESPACES = {
+        "education_categories": (("categories", False),),
+        "educational_content": (("content", True), ("quiz", True)),
+        "quiz_questions": (("quiz", False),),
+        "users": (("user", True),),
+        # Les notes changent les moyennes des contenus et des profils (triggers)
+        "ratings": (("content", False), ("user", False)),
+    }
+    
+    def _cached(self, namespace: str, key: Any, query: str, params: Sequence[Any],
+                many: bool = False) -> Any:
+        """Lecture via le cache : exécute la requête seulement en cas d'absence"""
+        found, value = self.cache.get((namespace, key))
+        if not found:
+            cursor = self.connect().execute(query, params)
+            if many:
+                value = tuple(dict(row) for row in cursor.fetchall())
+            else:
+                row = cursor.fetchone()
+                value = dict(row) if row is not None else None
+            self.cache.put((namespace, key), value)
+        # Copies : le contenu du cache ne doit pas être modifié par l'appelant
+        if many:
+            return [dict(item) for item in value]
+        return dict(value) if value is not None else None
+    
+    def invalidate_cache(self, table: Optional[str] = None, key: Any = None):
+        """
+        Invalide les entrées du cache liées à une table
+        
+        Args:
+            table: Table modifiée (tout le cache si None)
+            key: Identifiant de la ligne modifiée (toute la table si None)
+        """
+        if table is None:
+            self.cache.clear()
+            return
+        for namespace, by_row_id in self.CACHE_NAMESPACES.get(table, ()):
+            self.cache.invalidate(namespace, key if by_row_id else None)
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Statistiques du cache (succès, échecs, évictions, taux de succès)"""
+        return self.cache.stats()
+    
+    def get_categories(self) -> List[Dict[str, Any]]:
+        """Catégories éducatives actives, dans l'ordre d'affichage"""
+        return self._cached("categories", "active", '''
+            SELECT * FROM education_categories WHERE is_active = 1 ORDER BY sort_order, id
+        ''', (), many=True)
+    
+    def get_educational_content(self, content_id: int) -> Optional[Dict[str, Any]]:
+        """Contenu éducatif publié (None s'il n'existe pas ou n'est pas publié)"""
+        return self._cached("content", content_id, '''
+            SELECT * FROM educational_content WHERE id = ? AND is_published = 1
+        ''', (content_id,))
+    
+    def get_quiz_questions(self, content_id: int) -> List[Dict[str, Any]]:
+        """Questions de quiz d'un contenu, dans l'ordre"""
+        return self._cached("quiz", content_id, '''
+            SELECT * FROM quiz_questions WHERE content_id = ? ORDER BY sort_order, id
+        ''', (content_id,), many=True)
+    
+    def get_user_profile(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Profil d'un utilisateur (None s'il n'existe pas)"""
+        return self._cached("user", user_id, "SELECT * FROM users WHERE id = ?", (user_id,))
+    
+    # Colonnes du profil modifiables par update_user_profile
+    PROFILE_FIELDS = {
+        "name", "phone", "avatar_url", "address", "latitude", "longitude", "bio",
+        "children_count", "preferred_language", "notification_token", "privacy_settings",
+        "last_seen", "is_active",
+    }
+    
+    def update_user_profile(self, user_id: int, **fields: Any) -> bool:
+        """
+        Met à jour le profil d'un utilisateur et invalide son entrée de cache
+        
+        Args:
+            user_id: Identifiant de l'utilisateur
+            **fields: Colonnes à modifier (voir PROFILE_FIELDS)
+            
+        Returns:
+            True si l'utilisateur existe
+        """
+        unknown = set(fields) - self.PROFILE_FIELDS
+        if unknown:
+            raise ValueError(f"Champs non modifiables: {', '.join(sorted(unknown))}")
+        if not fields:
+            return self.get_user_profile(user_id) is not None
+        
+        values = [encode_json(value) if isinstance(value, (dict, list)) else value
+                  for value in fields.values()]
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        conn = self.connect()
+        cursor = conn.execute(f'''
+            UPDATE users SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ?
+        ''', values + [user_id])
+        conn.commit()
+        self.invalidate_cache("users", user_id)
+        return cursor.rowcount > 0
+    
+    # =============================================
+    # COLONNES JSON
+    # =============================================
+    
+    def _check_json_column(self, table: str, column: str):
+        """Vérifie que la colonne fait partie de JSON_COLUMNS"""
+        if column not in self.JSON_COLUMNS.get(table, ()):
+            raise ValueError(f"Colonne JSON inconnue: {table}.{column}")
+    
+    def get_json(self, table: str, column: str, row_id: int, default: Any = None) -> Any:
+        """
+        Lit et décode une colonne JSON
+        
+        Args:
+            table, column: Colonne de JSON_COLUMNS
+            row_id: Identifiant de la ligne
+            default: Valeur retournée si la ligne n'existe pas ou si la colonne est NULL
+        """
+        self._check_json_column(table, column)
+        row = self.connect().execute(f"SELECT {column} FROM {table} WHERE id = ?",
+                                     (row_id,)).fetchone()
+        if row is None or row[0] is None:
+            return default
+        return json.loads(row[0])
+    
+    def set_json(self, table: str, column: str, row_id: int, value: Any) -> bool:
+        """
+        Remplace une colonne JSON par value, encodée sous forme compacte
+        
+        Returns:
+            True si la ligne existe
+        """
+        self._check_json_column(table, column)
+        conn = self.connect()
+        cursor = conn.execute(f"UPDATE {table} SET {column} = ? WHERE id = ?",
+                              (encode_json(value), row_id))
+        conn.commit()
+        self.invalidate_cache(table, row_id)
+        return cursor.rowcount > 0
+    
+    def patch_json(self, table: str, column: str, row_id: int, changes: Dict[str, Any]) -> bool:
+        """
+        Fusionne des clés dans un objet JSON, sans relire la valeur côté Python
+        
+        Fusion json_patch (RFC 7396) : une clé à None est supprimée, les
+        objets imbriqués sont fusionnés récursivement.
+        
+        Returns:
+            True si la ligne existe
+        """
+        self._check_json_column(table, column)
+        conn = self.connect()
+        cursor = conn.execute(f'''
+            UPDATE {table} SET {column} = json_patch(COALESCE({column}, '{{}}'), ?) WHERE id = ?
+        ''', (encode_json(changes), row_id))
+        conn.commit()
+        self.invalidate_cache(table, row_id)
+        return cursor.rowcount > 0
+    
+    def compact_json_columns(self, tables: Optional[Iterable[str]] = None,
+                             batch_size: int = 10000) -> Dict[str, int]:
+        """
+        Réécrit les colonnes JSON existantes sous forme compacte (json())
+        
+        Les lignes sont traitées par plages d'id, une transaction par lot ;
+        seules les valeurs dont la forme compacte diffère sont écrites, les
+        valeurs qui ne sont pas du JSON valide sont laissées telles quelles.
+        
+        Args:
+            tables: Tables de JSON_COLUMNS à traiter (par défaut toutes)
+            batch_size: Plage d'identifiants traitée par transaction
+        
+        Returns:
+            "table.colonne" -> nombre de valeurs réécrites
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size doit être supérieur ou égal à 1")
+        tables = list(self.JSON_COLUMNS if tables is None else tables)
+        for table in tables:
+            if table not in self.JSON_COLUMNS:
+                raise ValueError(f"Table sans colonne JSON: {table}")
+        conn = self.connect()
+        if conn.in_transaction:
+            conn.commit()
+        
+        rewritten: Dict[str, int] = {}
+        for table in tables:
+            last_id = conn.execute(f"SELECT MAX(id) FROM {table}").fetchone()[0] or 0
+            for column in self.JSON_COLUMNS[table]:
+                count = 0
+                for start_id in range(0, last_id, batch_size):
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        count += conn.execute(f'''
+                            UPDATE {table} SET {column} = json({column})
+                            WHERE id > ? AND id <= ?
+                              AND CASE WHEN json_valid({column}) THEN json({column}) != {column}
+                                       ELSE 0 END
+                        ''', (start_id, start_id + batch_size)).rowcount
+                        conn.commit()
+                    except BaseException:
+                        conn.rollback()
+                        raise
+                rewritten[f"{table}.{column}"] = count
+            self.invalidate_cache(table)
+        return rewritten
+    
+    # =============================================
+    # INSTRUMENTATION DES REQUÊTES
+    # =============================================
+    
+    def query_metrics(self, sort_by: str = "total_ms", explain: bool = False) -> Dict[str, Any]:
+        """
+        Instantané des métriques de requêtes (nécessite query_stats)
+        
+        Args:
+            sort_by: Clé de tri décroissant des modèles ("total_ms", "p95_ms", "count"...)
+            explain: Ajoute à chaque modèle le plan d'exécution de sa première
+                     occurrence ("plan") et ses nœuds suspects ("warnings" :
+                     parcours complets, tris temporaires)
+            
+        Returns:
+            {"since": ..., "statements": [...], "slow_queries": [...]}
+        """
+        if self.query_stats is None:
+            raise RuntimeError("Instrumentation désactivée : passer query_stats au constructeur")
+        statements = self.query_stats.snapshot(sort_by)
+        if explain:
+            conn = self.connect()
+            examples = self.query_stats.examples()
+            for statement in statements:
+                sql, params = examples[statement["template"]]
+                statement["plan"] = statement["warnings"] = None
+                if params is None or not sql.lstrip().upper().startswith(EXPLAINABLE):
+                    continue
+                try:
+                    statement["plan"] = explain_query_plan(conn, sql, params)
+                except sqlite3.Error:
+                    # Table supprimée depuis, base d'archive attachée...
+                    continue
+                statement["warnings"] = plan_warnings(statement["plan"])
+        return {
+            "since": datetime.fromtimestamp(self.query_stats.started_at, timezone.utc)
+                             .strftime("%Y-%m-%d %H:%M:%S"),
+            "statements": statements,
+            "slow_queries": self.query_stats.slow_queries(),
+        }
+    
+    def export_query_metrics(self, path: str, explain: bool = True) -> Dict[str, Any]:
+        """Écrit query_metrics(explain=...) dans un fichier JSON et retourne les métriques"""
+        metrics = self.query_metrics(explain=explain)
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(metrics, handle, ensure_ascii=False, indent=2)
+        return metrics
+    
+    # =============================================
+    # SAUVEGARDE EN LIGNE ET RÉPLICAS
+    # =============================================
+    
+    def backup(self, target_path: str, pages: int = 1024, sleep: float = 0.0,
+               progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        """
+        Copie la base pendant qu'elle est utilisée (API de sauvegarde SQLite)
+        
+        La copie avance par paquets de pages, sur une connexion dédiée. En
+        mode WAL, une transaction de lecture est gardée ouverte pendant toute
+        la copie : elle fige un instantané cohérent sans bloquer les
+        écrivains, qui continuent d'ajouter au WAL. Hors WAL, les écritures
+        d'autres connexions entre deux paquets relancent la copie depuis le
+        début. La copie est écrite dans un fichier temporaire, puis renommée :
+        target_path contient toujours une base complète.
+        
+        Args:
+            target_path: Fichier de destination (remplacé s'il existe)
+            pages: Pages copiées par étape (-1 : tout en une étape)
+            sleep: Pause entre deux étapes (secondes), pour céder les E/S
+            progress: Fonction appelée après chaque étape avec (restantes, total)
+            
+        Returns:
+            Statistiques : "pages", "steps", "seconds", "bytes"
+        """
+        if pages == 0 or pages < -1:
+            raise ValueError("pages doit être supérieur ou égal à 1, ou -1")
+        temp_path = f"{target_path}.tmp"
+        for suffix in ("", "-journal", "-wal", "-shm"):
+            if os.path.exists(temp_path + suffix):
+                os.unlink(temp_path + suffix)
+        
+        start = time.perf_counter()
+        steps = total = 0
+        
+        def on_step(status: int, remaining: int, page_count: int):
+            nonlocal steps, total
+            steps += 1
+            total = page_count
+            if progress is not None:
+                progress(remaining, page_count)
+        
+        source = open_connection(self.db_path, timeout=30.0)
+        target = sqlite3.connect(temp_path)
+        try:
+            if source.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+                # Instantané : la lecture ouvre la transaction sur l'état courant
+                source.execute("BEGIN")
+                source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            source.backup(target, pages=pages, progress=on_step, sleep=sleep)
+            # Copie autonome (sans fichiers -wal/-shm), ouvrable en lecture seule
+            target.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            if source.in_transaction:
+                source.rollback()
+            source.close()
+            target.close()
+        os.replace(temp_path, target_path)
+        return {
+            "pages": total,
+            "steps": steps,
+            "seconds": time.perf_counter() - start,
+            "bytes": os.path.getsize(target_path),
+        }
+    
+    def read_connection(self) -> sqlite3.Connection:
+        """
+        Connexion pour les lectures qui tolèrent un léger retard
+        
+        Retourne une connexion en lecture seule sur un réplica si un
+        ReplicaManager (db_replica) est attaché, sinon connect(). Utilisée par
+        les classements, la recherche et les tableaux de bord ; les lectures
+        qui doivent voir les écritures récentes (cache, messagerie, alertes)
+        restent sur la base principale.
+        """
+        if self.replicas is not None:
+            connection = self.replicas.connection()
+            if connection is not None:
+                return connection
+        return self.connect()
+    
+    # =============================================
+    # ÉTAT ET MAINTENANCE DE LA BASE
+    # =============================================
+    
+    def database_stats(self) -> Dict[str, Any]:
+        """
+        Lignes et taille de chaque table de la base
+        
+        Les tailles viennent de la table virtuelle dbstat : pages de la table
+        et de ses index, tables internes comprises pour les index FTS5 et
+        R*Tree. Elles valent None si SQLite est compilé sans dbstat. Le
+        comptage des lignes parcourt chaque table.
+        
+        Returns:
+            "path", "version", "file_bytes", "wal_bytes", "page_size",
+            "page_count", "freelist_count", "deferred_groups" et "tables"
+            (liste de {"name", "type", "rows", "bytes", "index_bytes"})
+        """
+        conn = self.connect()
+        table_list = [row for row in conn.execute("PRAGMA table_list")
+                      if row["schema"] == "main" and not row["name"].startswith("sqlite_")]
+        tables = sorted((row["name"], row["type"]) for row in table_list
+                        if row["type"] in ("table", "virtual"))
+        shadows = {row["name"] for row in table_list if row["type"] == "shadow"}
+        virtual = sorted((name for name, kind in tables if kind == "virtual"), key=len, reverse=True)
+        owners = {row["name"]: row["tbl_name"] for row in conn.execute(
+            "SELECT name, tbl_name FROM sqlite_master WHERE type = 'index'")}
+        try:
+            pages = conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").fetchall()
+        except sqlite3.OperationalError:
+            pages = None
+        
+        sizes = {name: [0, 0] for name, _ in tables}
+        for name, size in pages or ():
+            table = owners.get(name, name)
+            if table in shadows:
+                # Table interne d'un index FTS5 / R*Tree : comptée avec la table virtuelle
+                table = next((owner for owner in virtual if table.startswith(f"{owner}_")), table)
+            if table in sizes:
+                sizes[table][1 if name in owners else 0] += size
+        
+        result_tables = []
+        for name, kind in tables:
+            try:
+                rows = conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0]
+            except sqlite3.OperationalError:
+                rows = None
+            result_tables.append({
+                "name": name,
+                "type": kind,
+                "rows": rows,
+                "bytes": sizes[name][0] if pages is not None else None,
+                "index_bytes": sizes[name][1] if pages is not None else None,
+            })
+        wal_path = f"{self.db_path}-wal"
+        return {
+            "path": self.db_path,
+            "version": self.schema_version(),
+            "file_bytes": os.path.getsize(self.db_path),
+            "wal_bytes": os.path.getsize(wal_path) if os.path.exists(wal_path) else 0,
+            "page_size": conn.execute("PRAGMA page_size").fetchone()[0],
+            "page_count": conn.execute("PRAGMA page_count").fetchone()[0],
+            "freelist_count": conn.execute("PRAGMA freelist_count").fetchone()[0],
+            "deferred_groups": sorted(self._pending_groups()),
+            "tables": result_tables,
+        }
+    
+    def vacuum(self, full: bool = False) -> Dict[str, int]:
+        """
+        Récupère l'espace libre et met à jour les statistiques du planificateur
+        
+        Sans full, les pages libres sont rendues au système (incremental_vacuum) ;
+        avec full, la base est reconstruite (VACUUM : copie complète sous
+        verrou exclusif). PRAGMA optimize est exécuté dans les deux cas.
+        
+        Returns:
+            "freed_pages", "bytes_before" et "bytes_after" (fichier principal)
+        """
+        conn = self.connect()
+        if conn.in_transaction:
+            conn.commit()
+        bytes_before = os.path.getsize(self.db_path)
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        if full:
+            conn.execute("VACUUM")
+        else:
+            self.incremental_vacuum()
+        conn.execute("PRAGMA optimize").fetchall()
+        if conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        return {
+            "freed_pages": pages - conn.execute("PRAGMA page_count").fetchone()[0],
+            "bytes_before": bytes_before,
+            "bytes_after": os.path.getsize(self.db_path),
+        }
+    
+    # =============================================
+    # ARCHIVAGE ET RÉTENTION
+    # =============================================
+    
+    # Tables en ajout seul archivées par mois (colonne created_at)
+    RETENTION_TABLES = ("user_interactions", "notifications")
+    
+    def archive_path(self, month: str) -> str:
+        """Chemin de la base d'archive d'un mois ("AAAA-MM")"""
+        stem = os.path.splitext(os.path.basename(self.db_path))[0]
+        return os.path.join(self.archive_dir, f"{stem}_archive_{month}.db")
+    
+    def archived_months(self) -> List[str]:
+        """Mois disponibles dans les archives, du plus ancien au plus récent"""
+        stem = os.path.splitext(os.path.basename(self.db_path))[0]
+        prefix = f"{stem}_archive_"
+        months = [os.path.basename(path)[len(prefix):-len(".db")]
+                  for path in glob.glob(os.path.join(glob.escape(self.archive_dir), f"{glob.escape(prefix)}*.db"))]
+        return sorted(month for month in months if re.fullmatch(r"\d{4}-\d{2}", month))
+    
+    @staticmethod
+    def _next_month(month: str) -> str:
+        """Mois suivant ("2025-12" -> "2026-01")"""
+        year, number = int(month[:4]), int(month[5:7])
+        return f"{year + number // 12:04d}-{number % 12 + 1:02d}"
+    
+    def _create_archive_table(self, conn: sqlite3.Connection, table: str):
+        """
+        Crée la table d'archive (mêmes colonnes, sans contraintes) dans le schéma archive
+        
+        PRAGMA table_xinfo liste aussi les colonnes générées (hidden 2 ou 3),
+        que table_info omet. Celles de JSON_FIELDS sont recréées à l'identique,
+        y compris sur une archive créée avant la migration 10 : une condition
+        de select_with_archives voit les mêmes colonnes partout.
+        """
+        columns = []
+        for row in conn.execute(f"PRAGMA main.table_xinfo({table})"):
+            if row[6] == 0:
+                columns.append("id INTEGER PRIMARY KEY" if row[1] == "id" else f"{row[1]} {row[2]}")
+        conn.execute(f"CREATE TABLE IF NOT EXISTS archive.{table} ({', '.join(columns)})")
+        existing = {row[1] for row in conn.execute(f"PRAGMA archive.table_xinfo({table})")}
+        for name, sql_type, column, path in self.JSON_FIELDS.get(table, ()):
+            if name not in existing and column in existing:
+                conn.execute(f"ALTER TABLE archive.{table} ADD COLUMN {name} "
+                             f"{self._json_field_sql(sql_type, column, path)}")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS archive.idx_{table}_created "
+                     f"ON {table}(created_at)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS archive.idx_{table}_user "
+                     f"ON {table}(user_id, created_at)")
+    
+    @staticmethod
+    def _archive_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+        """
+        Colonnes stockées communes à main.{table} et archive.{table}
+        
+        Les colonnes générées ne peuvent pas être insérées (SELECT * les
+        retourne pourtant) et une archive créée avant une migration peut
+        avoir moins de colonnes que la table principale.
+        """
+        archived = {row[1] for row in conn.execute(f"PRAGMA archive.table_xinfo({table})")
+                    if row[6] == 0}
+        return [row[1] for row in conn.execute(f"PRAGMA main.table_xinfo({table})")
+                if row[6] == 0 and row[1] in archived]
+    
+    def archive_old_rows(self, older_than_days: int = 180, tables: Optional[Sequence[str]] = None,
+                         batch_size: int = 5000, vacuum_pages: Optional[int] = 2000,
+                         now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Déplace les lignes anciennes vers des bases d'archive mensuelles
+        
+        Chaque lot est d'abord copié dans l'archive du mois (transaction sur
+        l'archive seule), puis supprimé de la base principale dans une seconde
+        transaction courte. Une interruption entre les deux laisse au pire des
+        doublons, éliminés à la reprise (INSERT OR IGNORE sur l'id).
+        
+        Args:
+            older_than_days: Âge minimal (en jours, selon created_at) des lignes archivées
+            tables: Tables à archiver (par défaut RETENTION_TABLES)
+            batch_size: Nombre de lignes déplacées par lot
+            vacuum_pages: Pages libérées par incremental_vacuum en fin
+                          d'archivage (None pour ne pas compacter)
+            now: Date de référence (par défaut maintenant, UTC)
+        
+        Returns:
+            Statistiques : lignes archivées par table, mois touchés, durée et
+            pages libérées
+        """
+        tables = list(tables or self.RETENTION_TABLES)
+        unknown = set(tables) - set(self.RETENTION_TABLES)
+        if unknown:
+            raise ValueError(f"Tables non archivables: {', '.join(sorted(unknown))}")
+        now = now or datetime.now(timezone.utc)
+        cutoff = (now - timedelta(days=older_than_days)).strftime("%Y-%m-%d %H:%M:%S")
+        os.makedirs(self.archive_dir, exist_ok=True)
+        
+        # Connexion dédiée : les ATTACH ne touchent pas la connexion du helper
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        stats: Dict[str, Any] = {"rows": {}, "months": [], "seconds": 0.0, "freed_pages": 0}
+        start = time.perf_counter()
+        try:
+            for table in tables:
+                stats["rows"][table] = 0
+                oldest = conn.execute(f"SELECT MIN(created_at) FROM {table}").fetchone()[0]
+                if oldest is None or oldest >= cutoff:
+                    continue
+                
+                month = oldest[:7]
+                while month <= cutoff[:7]:
+                    upper = min(cutoff, f"{self._next_month(month)}-01")
+                    moved = self._archive_month(conn, table, month, upper, batch_size)
+                    if moved:
+                        stats["rows"][table] += moved
+                        if month not in stats["months"]:
+                            stats["months"].append(month)
+                    month = self._next_month(month)
+        finally:
+            conn.close()
+        
+        if vacuum_pages is not None:
+            stats["freed_pages"] = self.incremental_vacuum(vacuum_pages)
+        stats["months"].sort()
+        stats["seconds"] = time.perf_counter() - start
+        return stats
+    
+    def _archive_month(self, conn: sqlite3.Connection, table: str, month: str,
+                       upper: str, batch_size: int) -> int:
+        """Déplace par lots les lignes d'un mois antérieures à `upper` ; retourne leur nombre"""
+        lower = f"{month}-01"
+        if not conn.execute(f"SELECT 1 FROM {table} WHERE created_at >= ? AND created_at < ? LIMIT 1",
+                            (lower, upper)).fetchone():
+            return 0
+        
+        conn.execute("ATTACH DATABASE ? AS archive", (self.archive_path(month),))
+        moved = 0
+        try:
+            self._create_archive_table(conn, table)
+            conn.commit()
+            columns = ", ".join(self._archive_columns(conn, table))
+            while True:
+                ids = [row[0] for row in conn.execute(f'''
+                    SELECT id FROM main.{table}
+                    WHERE created_at >= ? AND created_at < ?
+                    ORDER BY created_at
+                    LIMIT ?
+                ''', (lower, upper, batch_size))]
+                if not ids:
+                    break
+                placeholders = ", ".join("?" for _ in ids)
+                conn.execute(f"INSERT OR IGNORE INTO archive.{table} ({columns}) "
+                             f"SELECT {columns} FROM main.{table} WHERE id IN ({placeholders})", ids)
+                conn.commit()
+                conn.execute(f"DELETE FROM main.{table} WHERE id IN ({placeholders})", ids)
+                conn.commit()
+                moved += len(ids)
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.execute("DETACH DATABASE archive")
+        return moved
+    
+    def incremental_vacuum(self, pages: Optional[int] = None) -> int:
+        """
+        Rend au système de fichiers les pages libres de la base
+        
+        Nécessite auto_vacuum=INCREMENTAL (activé sur les bases créées par
+        migrate) ; sans effet sinon.
+        
+        Args:
+            pages: Nombre maximal de pages à libérer (toutes par défaut)
+        
+        Returns:
+            Nombre de pages libérées
+        """
+        conn = self.connect()
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return 0
+        if conn.in_transaction:
+            conn.commit()
+        before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        # executescript exécute le PRAGMA jusqu'au bout (execute ne libère qu'une page)
+        conn.executescript(f"PRAGMA incremental_vacuum({int(pages) if pages else 0});")
+        return before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+    
+    def select_with_archives(self, table: str, where: str = "1", params: Sequence[Any] = (),
+                             order_by: str = "created_at", descending: bool = True,
+                             limit: Optional[int] = None,
+                             since: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Interroge une table de rétention sur la base principale et ses archives
+        
+        Args:
+            table: Table parmi RETENTION_TABLES
+            where: Condition SQL écrite par le code appelant, insérée telle
+                   quelle dans la requête de chaque source (base principale
+                   et archives) : les valeurs passent toujours par params
+            params: Paramètres de la condition
+            order_by: Colonne de tri
+            descending: Tri décroissant
+            limit: Nombre maximal de lignes
+            since: Ignore les archives des mois antérieurs ("AAAA-MM")
+        
+        Returns:
+            Lignes (dict) triées, avec "archived" indiquant leur provenance
+        """
+        if table not in self.RETENTION_TABLES:
+            raise ValueError(f"Table non archivée: {table}")
+        conn = self.connect()
+        columns = {row["name"] for row in conn.execute("SELECT name FROM pragma_table_info(?)",
+                                                       (table,))}
+        if order_by not in columns:
+            raise ValueError(f"Colonne inconnue: {order_by}")
+        
+        direction = "DESC" if descending else "ASC"
+        query = f"SELECT * FROM {table} WHERE {where} ORDER BY {order_by} {direction}"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        
+        results = [dict(row, archived=False) for row in conn.execute(query, params)]
+        for month in self.archived_months():
+            if since and month < since[:7]:
+                continue
+            archive = sqlite3.connect(f"file:{self.archive_path(month)}?mode=ro", uri=True)
+            archive.row_factory = sqlite3.Row
+            try:
+                if archive.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                   (table,)).fetchone():
+                    results.extend(dict(row, archived=True) for row in archive.execute(query, params))
+            finally:
+                archive.close()
+        
+        results.sort(key=lambda row: sqlite_sort_key(row[order_by]), reverse=descending)
+        return results[:limit] if limit is not None else results
+    
+    def get_notifications(self, user_id: int, unread_only: bool = False, limit: int = 50,
+                          include_archived: bool = False) -> List[Dict[str, Any]]:
+        """
+        Fil de notifications d'un utilisateur, les plus récentes en premier
+        
+        Args:
+            user_id: Identifiant de l'utilisateur
+            unread_only: Ne retourne que les notifications non lues
+            limit: Nombre maximal de notifications
+            include_archived: Inclut les notifications archivées
+        """
+        where = "user_id = ?" + (" AND is_read = 0" if unread_only else "")
+        if include_archived:
+            return self.select_with_archives("notifications", where, (user_id,), limit=limit)
+        rows = self.connect().execute(f'''
+            SELECT * FROM notifications WHERE {where}
+            ORDER BY created_at DESC LIMIT ?
+        ''', (user_id, limit)).fetchall()
+        return [dict(row) for row in rows]
+    
+    def _insert_initial_data(self, cursor):
+        """Insère les données initiales nécessaires"""
+        # Catégories éducatives par défaut
+        categories = [
+            ("Sécurité Internet", "Apprendre à naviguer en sécurité sur internet", "🌐", 1),
+            ("Prévention des Dangers", "Identifier et éviter les situations dangereuses", "⚠️", 2),
+            ("Communication", "Développer une communication ouverte avec votre enfant", "💬", 3),
+            ("Premiers Secours", "Gestes de premiers secours pour enfants", "🚑", 4),
+            ("Éducation Émotionnelle", "Aider votre enfant à gérer ses émotions", "❤️", 5),
+        ]
+        
+        cursor.executemany('''
+            INSERT OR IGNORE INTO education_categories (name, description, icon, sort_order)
+            VALUES (?, ?, ?, ?)
+        ''', categories)
+        
+        print("✅ Données initiales insérées!")
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Ligne de commande de la base de données
+    
+        python data/db_setting.py [init] [--lazy]    crée ou met à jour le schéma
+        python data/db_setting.py verify [--integrity]
+        python data/db_setting.py stats              lignes et taille des tables
+        python data/db_setting.py vacuum [--full]
+    
+    data/db_cli.py accepte les mêmes commandes sans recompiler ce module à
+    chaque lancement.
+    
+    Returns:
+        Code de sortie (0 si la commande a réussi)
+    """
+    # Import local : argparse n'est pas chargé par les processus qui importent le module
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Base de données Child Security")
+    parser.add_argument("--db", default=os.path.join("data", "child_security_complete.db"),
+                        help="Chemin de la base")
+    subparsers = parser.add_subparsers(dest="command")
+    init = subparsers.add_parser("init", help="Crée ou met à jour le schéma (par défaut)")
+    init.add_argument("--lazy", action="store_true",
+                      help="Diffère les tables d'agrégats rarement utilisées (progression, "
+                           "modération) jusqu'à leur premier accès")
+    verify = subparsers.add_parser("verify", help="Compare le schéma à celui de la version du code")
+    verify.add_argument("--integrity", action="store_true",
+                        help="Vérifie aussi l'intégrité des pages (PRAGMA quick_check)")
+    subparsers.add_parser("stats", help="Lignes et taille de chaque table")
+    vacuum = subparsers.add_parser("vacuum", help="Récupère l'espace libre")
+    vacuum.add_argument("--full", action="store_true",
+                        help="Reconstruit toute la base (VACUUM, verrou exclusif)")
+    args = parser.parse_args(argv)
+    command = args.command or "init"
+    
+    if command == "init":
+        data_dir = os.path.dirname(args.db)
+        if data_dir and not os.path.exists(data_dir):
+            os.makedirs(data_dir)
+    elif not os.path.exists(args.db):
+        print(f"❌ Base introuvable: {args.db}")
+        return 1
+    db_helper = DatabaseHelper(args.db, cache_size=0,
+                               lazy_schema=getattr(args, "lazy", False))
+    
+    def size(value: Optional[int]) -> str:
+        return "-" if value is None else f"{value / 1e6:.2f} Mo"
+    
+    try:
+        if command == "init":
+            start = time.perf_counter()
+            applied = db_helper.migrate()
+            elapsed = (time.perf_counter() - start) * 1000.0
+            if applied:
+                print(f"✅ Base prête: {args.db} (version {db_helper.SCHEMA_VERSION}, "
+                      f"{len(applied)} migrations en {elapsed:.1f} ms)")
+            else:
+                print(f"✅ Schéma déjà à jour: {args.db} (version {db_helper.SCHEMA_VERSION})")
+            deferred = sorted(db_helper._pending_groups())
+            if deferred:
+                print(f"⏸️ Groupes créés au premier accès: {', '.join(deferred)}")
+            
+        elif command == "verify":
+            report = db_helper.verify_schema(integrity=args.integrity)
+            print(f"📋 Version du schéma: {report['version']} (code: {report['expected_version']})")
+            print(f"   Empreinte: {report['fingerprint'][:16]} "
+                  f"(dernière migration: {(report['recorded_fingerprint'] or '-')[:16]})")
+            for key, label in (("missing", "Manquants"), ("unexpected", "Inattendus"),
+                               ("changed", "Modifiés"), ("deferred_groups", "Groupes différés")):
+                if report[key]:
+                    print(f"   {label}: {', '.join(report[key])}")
+            if report["integrity"] is not None:
+                print(f"   Intégrité: {report['integrity']}")
+            print("✅ Schéma conforme" if report["ok"] else "❌ Schéma non conforme")
+            return 0 if report["ok"] else 1
+            
+        elif command == "stats":
+            stats = db_helper.database_stats()
+            print(f"📊 {stats['path']}: version {stats['version']}, {size(stats['file_bytes'])} "
+                  f"(WAL {size(stats['wal_bytes'])}), {stats['freelist_count']} pages libres "
+                  f"sur {stats['page_count']}")
+            print(f"  {'Table':<32} {'Lignes':>12} {'Données':>12} {'Index':>12}")
+            for table in stats["tables"]:
+                rows = "-" if table["rows"] is None else table["rows"]
+                print(f"  {table['name']:<32} {rows:>12} {size(table['bytes']):>12} "
+                      f"{size(table['index_bytes']):>12}")
+            if stats["deferred_groups"]:
+                print(f"  Groupes pas encore créés: {', '.join(stats['deferred_groups'])}")
+            
+        elif command == "vacuum":
+            result = db_helper.vacuum(full=args.full)
+            print(f"✅ {result['freed_pages']} pages libérées: {size(result['bytes_before'])} "
+                  f"-> {size(result['bytes_after'])}")
+        return 0
+    
     except Exception as e:
-        print(f"❌ Erreur lors de la création: {e}")
+        print(f"❌ Erreur ({command}): {e}")
+        return 1
     finally:
         db_helper.close()
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
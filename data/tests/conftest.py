@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""Fixtures communes : bases temporaires migrées au schéma courant"""
+
+import os
+import shutil
+import sys
+
+import pytest
+
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DATA_DIR)
+
+from db_setting import DatabaseHelper  # noqa: E402
+
+# Base livrée avec l'application, créée avant le versionnage du schéma (user_version 0)
+BASELINE_DB = os.path.join(DATA_DIR, "child_security_complete.db")
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Base neuve migrée jusqu'à SCHEMA_VERSION"""
+    db_helper = DatabaseHelper(str(tmp_path / "test.db"), cache_size=0)
+    db_helper.create_tables()
+    yield db_helper
+    db_helper.close()
+
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    """Copie de la base livrée, non migrée"""
+    path = tmp_path / "child_security_complete.db"
+    shutil.copyfile(BASELINE_DB, path)
+    db_helper = DatabaseHelper(str(path), cache_size=0)
+    yield db_helper
+    db_helper.close()
+
+
+def add_user(db_helper: DatabaseHelper, name: str, **fields) -> int:
+    """Insère un utilisateur et retourne son id"""
+    fields = {"name": name, "email": f"{name.lower()}@example.com",
+              "join_date": "2025-01-01 00:00:00", **fields}
+    conn = db_helper.connect()
+    cursor = conn.execute(f"INSERT INTO users ({', '.join(fields)}) "
+                          f"VALUES ({', '.join('?' for _ in fields)})", list(fields.values()))
+    conn.commit()
+    return cursor.lastrowid
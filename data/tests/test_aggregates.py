@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Agrégats maintenus par trigger : compteurs de messagerie, évaluations,
+progression et file de modération
+
+Chaque test vérifie la valeur incrémentale puis la compare au recalcul
+complet (check_conversation_counters, recompute_*), qui ne doit rien corriger.
+"""
+
+import pytest
+
+from conftest import add_user
+
+
+def insert(db_helper, table, **fields):
+    conn = db_helper.connect()
+    cursor = conn.execute(f"INSERT INTO {table} ({', '.join(fields)}) "
+                          f"VALUES ({', '.join('?' for _ in fields)})", list(fields.values()))
+    conn.commit()
+    return cursor.lastrowid
+
+
+@pytest.fixture
+def people(db):
+    return add_user(db, "Alice"), add_user(db, "Bob"), add_user(db, "Carol")
+
+
+def test_unread_counters(db, people):
+    alice, bob, carol = people
+    conversation = insert(db, "conversations", created_by=alice, title="Sortie d'école")
+    for user_id in people:
+        insert(db, "conversation_participants", conversation_id=conversation, user_id=user_id)
+    insert(db, "messages", conversation_id=conversation, sender_id=alice, content="Bonjour",
+           sent_at="2025-06-01 08:00:00")
+    insert(db, "messages", conversation_id=conversation, sender_id=bob, content="Salut",
+           sent_at="2025-06-01 08:05:00")
+
+    unread = {user_id: db.get_inbox(user_id)[0]["unread_count"] for user_id in people}
+    assert unread == {alice: 1, bob: 1, carol: 2}
+    assert db.get_inbox(carol)[0]["last_message"] == "Salut"
+
+    db.mark_conversation_read(conversation, carol)
+    assert db.get_inbox(carol)[0]["unread_count"] == 0
+    db.connect().execute("DELETE FROM messages WHERE sender_id = ?", (bob,))
+    db.connect().commit()
+    assert db.get_inbox(alice)[0]["unread_count"] == 0
+    assert db.check_conversation_counters() == {
+        "unread_count": [], "last_message_at": [], "participants_count": []}
+
+
+def test_rating_aggregates(db, people):
+    alice, bob, carol = people
+    content = insert(db, "educational_content", category_id=1, title="Écrans", content="...")
+
+    db.rate(alice, "content", content, 5)
+    assert db.rate(bob, "content", content, 2) == {"rating_count": 2, "average": 3.5}
+    assert db.rate(bob, "content", content, 4) == {"rating_count": 2, "average": 4.5}
+    db.rate(carol, "user", alice, 3)
+    assert db.remove_rating(alice, "content", content)
+    assert db.get_rating_summary("content", content) == {"rating_count": 1, "average": 4.0}
+    average = db.connect().execute("SELECT average_rating FROM educational_content WHERE id = ?",
+                                   (content,)).fetchone()[0]
+    assert average == 4.0
+    assert [row["target_id"] for row in db.get_top_rated("content")] == [content]
+
+    db.remove_rating(bob, "content", content)
+    assert db.get_rating_summary("content", content) == {"rating_count": 0, "average": None}
+    assert db.recompute_rating_aggregates() == {"aggregates": 0, "columns": 0}
+
+
+def test_progress_rollups(db, people):
+    alice, bob, _ = people
+    first = insert(db, "educational_content", category_id=1, title="Internet", content="...")
+    second = insert(db, "educational_content", category_id=2, title="Dangers", content="...")
+    insert(db, "user_progress", user_id=alice, content_id=first, progress_status="completed",
+           score=80, started_at="2025-05-01 10:00:00")
+    insert(db, "user_progress", user_id=alice, content_id=second, progress_status="in_progress",
+           started_at="2025-05-02 10:00:00")
+    progress_id = insert(db, "user_progress", user_id=bob, content_id=second,
+                         progress_status="in_progress", started_at="2025-05-03 10:00:00")
+
+    assert [(row["user_id"], row["total_score"]) for row in db.get_leaderboard()] == [(alice, 80)]
+    conn = db.connect()
+    conn.execute("UPDATE user_progress SET progress_status = 'completed', score = 95 WHERE id = ?",
+                 (progress_id,))
+    conn.commit()
+    assert [(row["user_id"], row["total_score"]) for row in db.get_leaderboard()] == \
+        [(bob, 95), (alice, 80)]
+    assert [row["user_id"] for row in db.get_leaderboard(category_id=1)] == [alice]
+    totals = conn.execute("SELECT tracked, in_progress, completed FROM progress_user_category "
+                          "WHERE user_id = ? AND category_id = 0", (alice,)).fetchone()
+    assert tuple(totals) == (2, 1, 1)
+
+    conn.execute("DELETE FROM user_progress WHERE user_id = ?", (alice,))
+    conn.commit()
+    assert [row["user_id"] for row in db.get_leaderboard()] == [bob]
+    assert db.recompute_progress_rollups() == {"progress_user_category": 0,
+                                               "progress_content_daily": 0}
+
+
+def test_moderation_queue(db, people):
+    alice, bob, carol = people
+    db.report(alice, "user", carol, "spam")
+    db.report(bob, "user", carol, "harassment")
+    db.report(alice, "alert", 7, "danger")
+
+    assert db.moderation_queue_stats() == {"pending": 2, "claimed": 0, "reports": 3}
+    item = db.claim_moderation_item(bob)
+    assert (item["target_type"], item["target_id"]) == ("alert", 7)
+    assert db.claim_moderation_item(alice)["report_count"] == 2
+    assert db.claim_moderation_item(carol) is None
+
+    with pytest.raises(RuntimeError):
+        db.resolve_moderation_item(alice, "alert", 7)
+    assert db.resolve_moderation_item(bob, "alert", 7, action_taken="removed") == 1
+    assert db.release_moderation_item(alice, "user", carol)
+    assert db.moderation_queue_stats() == {"pending": 1, "claimed": 0, "reports": 2}
+    assert db.recompute_moderation_queue() == 0
+
+
+def test_moderation_resolve_keeps_reports_filed_after_claim(db, people):
+    alice, bob, carol = people
+    first = db.report(alice, "user", carol, "spam")
+    item = db.claim_moderation_item(bob)
+    assert item["claimed_report_id"] == first
+    late = db.report(alice, "user", carol, "harassment")
+
+    assert db.resolve_moderation_item(bob, "user", carol, action_taken="warning") == 1
+    statuses = dict(db.connect().execute("SELECT id, status FROM reports").fetchall())
+    assert statuses == {first: "reviewed", late: "pending"}
+    requeued = db.claim_moderation_item(alice)
+    assert (requeued["target_id"], requeued["report_count"]) == (carol, 1)
+    assert requeued["claimed_report_id"] == late
+    assert db.resolve_moderation_item(alice, "user", carol, dismiss=True) == 1
+    assert db.moderation_queue_stats() == {"pending": 0, "claimed": 0, "reports": 0}
+    assert db.recompute_moderation_queue() == 0
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""Archivage mensuel des tables de rétention (archive_old_rows, select_with_archives)"""
+
+import json
+from datetime import datetime
+
+from conftest import add_user
+
+
+def add_notification(db_helper, user_id, created_at, **fields):
+    conn = db_helper.connect()
+    fields = {"user_id": user_id, "title": "Alerte", "message": "Alerte à proximité",
+              "type": "alert", "created_at": created_at, **fields}
+    cursor = conn.execute(f"INSERT INTO notifications ({', '.join(fields)}) "
+                          f"VALUES ({', '.join('?' for _ in fields)})", list(fields.values()))
+    conn.commit()
+    return cursor.lastrowid
+
+
+def test_archive_after_all_migrations(db, tmp_path):
+    """Les colonnes générées (migration 10) ne cassent pas la copie vers l'archive"""
+    db.archive_dir = str(tmp_path / "archives")
+    user_id = add_user(db, "Alice")
+    old_id = add_notification(db, user_id, "2025-01-15 10:00:00", data=json.dumps({"alert_id": 7}))
+    add_notification(db, user_id, "2025-12-20 10:00:00")
+    db.connect().execute(
+        "INSERT INTO user_interactions (user_id, interaction_type, target_id, target_type, "
+        "interaction_data, created_at) VALUES (?, 'view', 1, 'content', ?, '2025-02-01 08:00:00')",
+        (user_id, json.dumps({"source": "feed"})))
+    db.connect().commit()
+    assert db.schema_version() == db.SCHEMA_VERSION
+
+    stats = db.archive_old_rows(older_than_days=90, now=datetime(2025, 12, 31))
+
+    assert stats["rows"] == {"user_interactions": 1, "notifications": 1}
+    assert stats["months"] == ["2025-01", "2025-02"]
+    assert db.connect().execute("SELECT COUNT(*) FROM notifications").fetchone()[0] == 1
+    archived = db.select_with_archives("notifications", "data_alert_id = ?", (7,))
+    assert [(row["id"], row["archived"]) for row in archived] == [(old_id, True)]
+    interactions = db.select_with_archives("user_interactions", "interaction_source = 'feed'")
+    assert len(interactions) == 1 and interactions[0]["archived"]
+
+
+def test_select_with_archives_merges_sources(db, tmp_path):
+    db.archive_dir = str(tmp_path / "archives")
+    user_id = add_user(db, "Bob")
+    for created_at in ("2025-03-02 09:00:00", "2025-04-10 09:00:00", "2025-12-01 09:00:00",
+                       "2025-12-15 09:00:00"):
+        add_notification(db, user_id, created_at)
+    db.archive_old_rows(older_than_days=90, now=datetime(2025, 12, 31))
+    assert db.archived_months() == ["2025-03", "2025-04"]
+
+    feed = db.get_notifications(user_id, limit=3, include_archived=True)
+    assert [row["created_at"][:10] for row in feed] == ["2025-12-15", "2025-12-01", "2025-04-10"]
+    assert [row["archived"] for row in feed] == [False, False, True]
+    recent = db.select_with_archives("notifications", "user_id = ?", (user_id,), since="2025-04")
+    assert len(recent) == 3
+    oldest_first = db.select_with_archives("notifications", "user_id = ?", (user_id,),
+                                           descending=False, limit=1)
+    assert oldest_first[0]["created_at"].startswith("2025-03-02")
+
+
+def test_select_with_archives_sorts_mixed_types(db, tmp_path):
+    """NULL, 0 et entiers (et texte) se comparent comme dans SQLite après fusion"""
+    db.archive_dir = str(tmp_path / "archives")
+    user_id = add_user(db, "Carol")
+    add_notification(db, user_id, "2025-01-05 09:00:00", is_read=1)
+    add_notification(db, user_id, "2025-01-06 09:00:00", is_read=None)
+    add_notification(db, user_id, "2025-12-05 09:00:00", is_read=0)
+    add_notification(db, user_id, "2025-12-06 09:00:00", is_read="oui")
+    db.archive_old_rows(older_than_days=90, now=datetime(2025, 12, 31))
+
+    rows = db.select_with_archives("notifications", "user_id = ?", (user_id,),
+                                   order_by="is_read", descending=False)
+    assert [row["is_read"] for row in rows] == [None, 0, 1, "oui"]
+    rows = db.select_with_archives("notifications", "user_id = ?", (user_id,),
+                                   order_by="is_read", limit=2)
+    assert [row["is_read"] for row in rows] == ["oui", 1]
+
+
+def test_archive_is_idempotent(db, tmp_path):
+    db.archive_dir = str(tmp_path / "archives")
+    user_id = add_user(db, "Dan")
+    add_notification(db, user_id, "2025-02-01 09:00:00")
+    first = db.archive_old_rows(older_than_days=90, now=datetime(2025, 12, 31))
+    second = db.archive_old_rows(older_than_days=90, now=datetime(2025, 12, 31))
+    assert first["rows"]["notifications"] == 1
+    assert second["rows"]["notifications"] == 0
+    assert len(db.select_with_archives("notifications", "user_id = ?", (user_id,))) == 1
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Front-end asyncio : lecteurs en pool et écrivain à validation groupée"""
+
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+from conftest import add_user
+from db_async import AsyncDatabaseHelper
+
+
+def run(db_path, scenario):
+    """Exécute scenario(helper) avec un AsyncDatabaseHelper démarré"""
+    async def main():
+        async with AsyncDatabaseHelper(db_path, readers=2) as helper:
+            return await scenario(helper)
+    return asyncio.run(main())
+
+
+def test_failed_write_does_not_roll_back_its_group(db):
+    alice = add_user(db, "Alice")
+    gate = threading.Event()
+
+    async def scenario(helper):
+        # Le thread écrivain est bloqué : les écritures suivantes forment un groupe
+        blocker = asyncio.ensure_future(helper.write(lambda conn: gate.wait(5)))
+        await asyncio.sleep(0.05)
+        writes = [helper.execute("INSERT INTO notifications (user_id, title, message, type) "
+                                 "VALUES (?, ?, 'corps', 'system')", (alice, f"N{i}"))
+                  for i in range(3)]
+        writes.insert(1, helper.execute("INSERT INTO notifications (user_id) VALUES (?)", (alice,)))
+        tasks = [asyncio.ensure_future(write) for write in writes]
+        await asyncio.sleep(0.05)
+        gate.set()
+        await blocker
+        return await asyncio.gather(*tasks, return_exceptions=True), dict(helper.stats)
+
+    results, stats = run(db.db_path, scenario)
+    assert isinstance(results[1], sqlite3.IntegrityError)
+    assert [result["rowcount"] for i, result in enumerate(results) if i != 1] == [1, 1, 1]
+    # Le bloqueur, puis les quatre écritures dans une seule transaction
+    assert stats == {"writes": 5, "transactions": 2, "failed_writes": 1}
+    titles = [row[0] for row in db.connect().execute(
+        "SELECT title FROM notifications WHERE user_id = ? ORDER BY id", (alice,))]
+    assert titles == ["N0", "N1", "N2"]
+
+
+def test_reads_see_committed_writes(db):
+    alice, bob = add_user(db, "Alice"), add_user(db, "Bob")
+    conversation = db.connect().execute(
+        "INSERT INTO conversations (created_by) VALUES (?)", (alice,)).lastrowid
+    db.connect().commit()
+
+    async def scenario(helper):
+        ids = await asyncio.gather(*(helper.send_message(conversation, (alice, bob)[i % 2],
+                                                         f"Message {i}") for i in range(6)))
+        page = await helper.get_messages(conversation, limit=10)
+        return ids, page
+
+    ids, page = run(db.db_path, scenario)
+    assert sorted(m["id"] for m in page["messages"]) == sorted(ids)
+
+
+def test_writes_invalidate_reader_cache(db):
+    alice = add_user(db, "Alice")
+
+    async def scenario(helper):
+        before = await helper.run(type(db).get_user_profile, alice)
+        await helper.execute("UPDATE users SET name = 'Alicia' WHERE id = ?", (alice,),
+                             table="users", key=alice)
+        after = await helper.run(type(db).get_user_profile, alice)
+        await helper.executemany("UPDATE users SET name = ? WHERE id = ?", [("Ali", alice)],
+                                 table="users")
+        renamed = await helper.run(type(db).get_user_profile, alice)
+        return before["name"], after["name"], renamed["name"]
+
+    assert run(db.db_path, scenario) == ("Alice", "Alicia", "Ali")
+
+
+def test_write_before_start_raises(db):
+    async def main():
+        with pytest.raises(RuntimeError):
+            await AsyncDatabaseHelper(db.db_path).execute("SELECT 1")
+    asyncio.run(main())
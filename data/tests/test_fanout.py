@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""Diffusion des alertes aux parents à proximité (file alert_fanout, baux)"""
+
+import logging
+import sqlite3
+import time
+
+import pytest
+
+from conftest import add_user
+from db_fanout import AlertFanoutWorkers
+from db_setting import DatabaseHelper
+
+SHARING = '{"profile_visible": true, "location_sharing": true}'
+
+
+@pytest.fixture
+def alert(db):
+    """Alerte à Paris : 5 parents notifiables, 3 qui ne doivent pas l'être"""
+    author = add_user(db, "Auteur", latitude=48.8566, longitude=2.3522,
+                      notification_token="t0", privacy_settings=SHARING)
+    for i in range(5):
+        add_user(db, f"Parent{i}", latitude=48.8566 + i * 0.001, longitude=2.3522,
+                 notification_token=f"t{i + 1}", privacy_settings=SHARING)
+    add_user(db, "Loin", latitude=48.95, longitude=2.3522, notification_token="t6",
+             privacy_settings=SHARING)
+    add_user(db, "Discret", latitude=48.8566, longitude=2.3522, notification_token="t7")
+    add_user(db, "SansJeton", latitude=48.8566, longitude=2.3522, privacy_settings=SHARING)
+    conn = db.connect()
+    alert_id = conn.execute("INSERT INTO community_alerts (user_id, title, description, alert_type, "
+                            "latitude, longitude) VALUES (?, 'Enfant perdu', '', 'lost_child', "
+                            "48.8566, 2.3522)", (author,)).lastrowid
+    conn.commit()
+    return alert_id
+
+
+def notified(db_helper, alert_id):
+    """Destinataires des notifications d'une alerte, avec leur nombre de notifications"""
+    return db_helper.connect().execute('''
+        SELECT u.name, COUNT(*) FROM notifications n JOIN users u ON u.id = n.user_id
+        WHERE n.data_alert_id = ? GROUP BY u.id ORDER BY u.id
+    ''', (alert_id,)).fetchall()
+
+
+def test_fan_out_notifies_each_nearby_parent_once(db, alert):
+    assert db.process_pending_alerts("w1") == {"alerts": 1, "notifications": 5, "failed": 0}
+    # Rediffusion explicite : la progression enregistrée évite les doublons
+    assert db.fan_out_alert(alert) == 0
+    assert [tuple(row) for row in notified(db, alert)] == [(f"Parent{i}", 1) for i in range(5)]
+    row = db.connect().execute("SELECT status, recipients FROM alert_fanout WHERE alert_id = ?",
+                               (alert,)).fetchone()
+    assert tuple(row) == ("done", 5)
+
+
+def test_expired_lease_is_resumed_without_duplicates(db, alert):
+    crashed = DatabaseHelper(db.db_path, cache_size=0)
+    conn = crashed.connect()
+    # Le worker s'arrête après le premier lot de 2 notifications
+    conn.execute('''
+        CREATE TEMP TRIGGER crash BEFORE INSERT ON notifications
+        WHEN (SELECT COUNT(*) FROM notifications WHERE data_alert_id IS NOT NULL) >= 2
+        BEGIN SELECT RAISE(ABORT, 'arrêt du worker'); END
+    ''')
+    assert crashed.claim_pending_alert("w1", lease_seconds=60) == alert
+    with pytest.raises(sqlite3.IntegrityError):
+        crashed.fan_out_alert(alert, batch_size=2)
+    crashed.close()
+    assert len(notified(db, alert)) == 2
+
+    # Bail encore valide : l'alerte n'est pas réservable
+    assert db.claim_pending_alert("w2") is None
+    db.connect().execute("UPDATE alert_fanout SET lease_until = datetime('now', '-1 seconds')")
+    db.connect().commit()
+    assert db.process_pending_alerts("w2", batch_size=2) == \
+        {"alerts": 1, "notifications": 3, "failed": 0}
+    assert [tuple(row) for row in notified(db, alert)] == [(f"Parent{i}", 1) for i in range(5)]
+    row = db.connect().execute("SELECT status, worker, attempts FROM alert_fanout").fetchone()
+    assert tuple(row) == ("done", "w2", 2)
+
+
+def test_workers_drain_the_queue(db, alert):
+    with AlertFanoutWorkers(db.db_path, workers=2, poll_interval=0.05) as workers:
+        deadline = time.monotonic() + 5
+        while workers.pending() and time.monotonic() < deadline:
+            time.sleep(0.02)
+    assert workers.stats["alerts"] == 1 and workers.stats["errors"] == 0
+    assert len(notified(db, alert)) == 5
+
+
+def test_worker_errors_are_logged(db, caplog):
+    db.connect().execute("DROP TABLE alert_fanout")
+    db.connect().commit()
+    with caplog.at_level(logging.ERROR, logger="child_security.fanout"):
+        with AlertFanoutWorkers(db.db_path, poll_interval=0.05) as workers:
+            deadline = time.monotonic() + 5
+            while not workers.stats["errors"] and time.monotonic() < deadline:
+                time.sleep(0.02)
+    assert workers.stats["errors"] >= 1
+    assert any(record.exc_info and "alert_fanout" in str(record.exc_info[1])
+               for record in caplog.records)
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""Graphe des connexions en mémoire (instantané CSR + journal connection_changes)"""
+
+import random
+
+import pytest
+
+from conftest import add_user
+from db_graph import ConnectionGraph
+
+USERS = 12
+
+
+@pytest.fixture
+def users(db):
+    return [add_user(db, f"Parent{i}", latitude=48.85 + i * 0.01, longitude=2.35)
+            for i in range(USERS)]
+
+
+def connect(db_helper, first, second, status="accepted", trust=3.0):
+    conn = db_helper.connect()
+    conn.execute("INSERT INTO parent_connections (user1_id, user2_id, status, connection_date, "
+                 "trust_score) VALUES (?, ?, ?, '2025-01-01', ?)", (first, second, status, trust))
+    conn.commit()
+
+
+def assert_matches_sql(db_helper, graph, users):
+    for user_id in users:
+        expected = {row["user_id"]: row["trust_score"] for row in db_helper.get_connections(user_id)}
+        assert graph.neighbors(user_id) == expected, user_id
+    for first, second in zip(users, users[1:]):
+        assert graph.mutual_connections(first, second) == \
+            db_helper.get_mutual_connections(first, second)
+    accepted = db_helper.connect().execute(
+        "SELECT COUNT(*) FROM parent_connections WHERE status = 'accepted'").fetchone()[0]
+    assert graph.edge_count == accepted
+
+
+def test_refresh_and_compact_follow_random_mutations(db, users):
+    rng = random.Random(7)
+    for first, second in rng.sample([(a, b) for a in users for b in users if a < b], 20):
+        connect(db, first, second, rng.choice(["accepted", "pending"]), rng.uniform(1, 5))
+    # Pas de refonte automatique : la couche de modifications est testée seule
+    graph = ConnectionGraph(db, compact_ratio=100).load()
+    # Refonte à chaque refresh
+    compacting = ConnectionGraph(db, compact_ratio=0).load()
+    assert_matches_sql(db, graph, users)
+
+    conn = db.connect()
+    for _ in range(6):
+        rows = conn.execute("SELECT id, status FROM parent_connections").fetchall()
+        for row in rng.sample(rows, 4):
+            action = rng.choice(["accept", "block", "trust", "delete"])
+            if action == "accept":
+                conn.execute("UPDATE parent_connections SET status = 'accepted' WHERE id = ?",
+                             (row["id"],))
+            elif action == "block":
+                conn.execute("UPDATE parent_connections SET status = 'blocked' WHERE id = ?",
+                             (row["id"],))
+            elif action == "trust":
+                conn.execute("UPDATE parent_connections SET trust_score = ? WHERE id = ?",
+                             (rng.uniform(1, 5), row["id"]))
+            else:
+                conn.execute("DELETE FROM parent_connections WHERE id = ?", (row["id"],))
+        conn.commit()
+        linked = {frozenset(row) for row in conn.execute(
+            "SELECT user1_id, user2_id FROM parent_connections")}
+        free = [(a, b) for a in users for b in users
+                if a < b and frozenset((a, b)) not in linked]
+        connect(db, *rng.choice(free), trust=rng.uniform(1, 5))
+        assert graph.refresh() > 0
+        assert_matches_sql(db, graph, users)
+        compacting.refresh()
+        assert not compacting._delta
+        assert_matches_sql(db, compacting, users)
+
+    graph.compact()
+    assert not graph._delta
+    assert_matches_sql(db, graph, users)
+
+
+def test_refresh_reloads_after_journal_purge(db, users):
+    connect(db, users[0], users[1])
+    graph = ConnectionGraph(db).load()
+    connect(db, users[1], users[2])
+    connect(db, users[2], users[3])
+    db.connect().execute("DELETE FROM connection_changes")
+    db.connect().commit()
+    connect(db, users[3], users[4])
+    assert graph.refresh() == -1
+    assert_matches_sql(db, graph, users)
+
+
+def test_suggestions_rank_friends_of_friends(db, users):
+    me, a, b, c, d, pending = users[:6]
+    connect(db, me, a, trust=5.0)
+    connect(db, me, b, trust=5.0)
+    connect(db, a, c, trust=5.0)
+    connect(db, b, c, trust=5.0)
+    connect(db, a, d, trust=1.0)
+    connect(db, a, pending)
+    connect(db, me, pending, status="pending")
+    graph = ConnectionGraph(db).load()
+
+    suggestions = graph.suggest_connections(me, k=5)
+    assert [s["user_id"] for s in suggestions] == [c, d]
+    assert suggestions[0]["mutual_count"] == 2
+    assert suggestions[0]["distance_m"] == round(graph.distance_m(me, c))
+    assert graph.suggest_connections(me, k=5, max_distance_m=4000) == suggestions[:1]
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Historique paginé des conversations (get_messages)"""
+
+from conftest import add_user
+
+
+def test_get_messages_pages_with_bodies(db):
+    alice, bob = add_user(db, "Alice"), add_user(db, "Bob")
+    conn = db.connect()
+    conversation = conn.execute("INSERT INTO conversations (created_by) VALUES (?)",
+                                (alice,)).lastrowid
+    for i in range(5):
+        conn.execute("INSERT INTO messages (conversation_id, sender_id, content, sent_at, "
+                     "location_data, reply_to_message_id) VALUES (?, ?, ?, ?, ?, ?)",
+                     (conversation, (alice, bob)[i % 2], f"Message {i}",
+                      f"2025-06-01 08:0{i}:00", '{"lat":48.85}' if i == 4 else None,
+                      1 if i == 3 else None))
+    conn.execute("INSERT INTO message_reactions (message_id, user_id, reaction_type) "
+                 "VALUES (5, ?, '👍')", (bob,))
+    conn.commit()
+
+    first = db.get_messages(conversation, limit=2)
+    assert [m["content"] for m in first["messages"]] == ["Message 4", "Message 3"]
+    assert first["messages"][0]["location_data"] == '{"lat":48.85}'
+    assert first["messages"][0]["reactions"] == {"👍": [bob]}
+    assert first["messages"][1]["reply_to"]["content"] == "Message 0"
+    second = db.get_messages(conversation, before=first["next_cursor"], limit=2)
+    last = db.get_messages(conversation, before=second["next_cursor"], limit=2)
+    assert [m["content"] for m in second["messages"] + last["messages"]] == \
+        ["Message 2", "Message 1", "Message 0"]
+    assert last["next_cursor"] is None
+
+
+def test_get_messages_page_query_is_covered(db):
+    """Sans INDEXED BY, le planificateur lit la page dans idx_messages_history, sans tri"""
+    conn = db.connect()
+    for where, params in (("conversation_id = ?", (1,)),
+                          ("conversation_id = ? AND (sent_at, id) < (?, ?)", (1, "2025", 9))):
+        plan = " ".join(row[3] for row in conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT {db.MESSAGE_LIST_COLUMNS} FROM messages "
+            f"WHERE {where} ORDER BY sent_at DESC, id DESC LIMIT 50", params))
+        assert "COVERING INDEX idx_messages_history" in plan
+        assert "TEMP B-TREE" not in plan
+
+
+def test_get_messages_during_bulk_load_without_indexes(db):
+    """Pendant bulk_load(drop_indexes=True), get_messages reste utilisable"""
+    alice = add_user(db, "Alice")
+    conn = db.connect()
+    conversation = conn.execute("INSERT INTO conversations (created_by) VALUES (?)",
+                                (alice,)).lastrowid
+    conn.commit()
+    pages = []
+
+    def progress(rows, seconds):
+        assert not conn.execute("SELECT 1 FROM sqlite_master "
+                                "WHERE name = 'idx_messages_history'").fetchone()
+        pages.append(len(db.get_messages(conversation, limit=10)["messages"]))
+
+    db.bulk_load("messages", ({"conversation_id": conversation, "sender_id": alice,
+                               "content": f"Message {i}", "sent_at": f"2025-06-01 08:{i:02d}:00"}
+                              for i in range(30)),
+                 batch_size=10, drop_indexes=True, progress=progress)
+    assert pages == [10, 10, 10]
+    assert db.get_messages(conversation, limit=1)["messages"][0]["content"] == "Message 29"
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""Migrations du schéma (PRAGMA user_version) sur une base neuve et sur la base livrée"""
+
+import pytest
+
+from conftest import add_user
+from db_setting import DatabaseHelper
+
+
+def table_counts(db_helper, tables):
+    conn = db_helper.connect()
+    return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in tables}
+
+
+def test_baseline_database_migrates_to_current_version(baseline_db):
+    assert baseline_db.schema_version() == 0
+    user_id = add_user(baseline_db, "Alice")
+    other_id = add_user(baseline_db, "Bob")
+    conn = baseline_db.connect()
+    conn.execute("INSERT INTO educational_content (category_id, title, content) "
+                 "VALUES (1, 'Mots de passe', 'Choisir un mot de passe')")
+    conn.execute("INSERT INTO ratings (user_id, target_id, target_type, rating) "
+                 "VALUES (?, 1, 'content', 4)", (user_id,))
+    conn.execute("INSERT INTO ratings (user_id, target_id, target_type, rating) "
+                 "VALUES (?, 1, 'content', 2)", (other_id,))
+    conn.execute("INSERT INTO reports (reporter_id, target_id, target_type, reason) "
+                 "VALUES (?, ?, 'user', 'spam')", (user_id, other_id))
+    conn.commit()
+    tables = ("users", "education_categories", "educational_content", "ratings", "reports")
+    before = table_counts(baseline_db, tables)
+
+    applied = baseline_db.migrate()
+
+    assert applied == [version for version, _, _, _ in baseline_db.MIGRATIONS]
+    assert baseline_db.schema_version() == baseline_db.SCHEMA_VERSION
+    assert table_counts(baseline_db, tables) == before
+    report = baseline_db.verify_schema(integrity=True)
+    assert report["ok"], report
+    # Rattrapage des agrégats depuis les lignes existantes
+    assert baseline_db.get_rating_summary("content", 1) == {"rating_count": 2, "average": 3.0}
+    assert baseline_db.moderation_queue_stats()["pending"] == 1
+    assert baseline_db.migrate() == []
+
+
+def test_migrations_step_by_step_match_single_pass(baseline_db, db):
+    for version, _, _, _ in baseline_db.MIGRATIONS:
+        assert baseline_db.migrate(version) == [version]
+        assert baseline_db.schema_version() == version
+    assert baseline_db.verify_schema()["ok"]
+    assert db.verify_schema()["ok"]
+    assert baseline_db.verify_schema()["fingerprint"] == db.verify_schema()["fingerprint"]
+
+
+def test_newer_schema_is_rejected(db):
+    conn = db.connect()
+    conn.execute(f"PRAGMA user_version = {db.SCHEMA_VERSION + 1}")
+    with pytest.raises(RuntimeError):
+        db.migrate()
+
+
+def test_message_history_index_is_slimmed(db):
+    """Migration 13 : l'index couvrant complet de la version 3 est remplacé"""
+    conn = db.connect()
+    conn.executescript("""
+        DROP INDEX idx_messages_history;
+        CREATE INDEX idx_messages_history ON messages(
+            conversation_id, sent_at, id, sender_id, message_type, status,
+            reply_to_message_id, is_edited, edited_at, media_url, location_data, content);
+        CREATE INDEX idx_messages_conversation ON messages(conversation_id, sent_at);
+        PRAGMA user_version = 12;
+    """)
+
+    assert db.migrate()[0] == 13
+    columns = [row[2] for row in conn.execute("PRAGMA index_info(idx_messages_history)")]
+    assert columns[:3] == ["conversation_id", "sent_at", "id"]
+    assert "content" not in columns
+    assert not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_messages_conversation'"
+                            ).fetchone()
+    assert db.verify_schema()["ok"]
+
+
+def test_moderation_queue_upgrade_keeps_claims(db):
+    """Migration 14 : la file est recréée avec claimed_report_id, réservations conservées"""
+    alice = add_user(db, "Alice")
+    conn = db.connect()
+    db.report(alice, "alert", 1, "danger")
+    db.report(alice, "user", 2, "spam")
+    db.claim_moderation_item(alice)
+    conn.executescript("""
+        DROP TABLE moderation_queue;
+        CREATE TABLE moderation_queue (
+            target_type TEXT NOT NULL, target_id INTEGER NOT NULL,
+            report_count INTEGER NOT NULL DEFAULT 0, severity_sum INTEGER NOT NULL DEFAULT 0,
+            max_severity INTEGER NOT NULL DEFAULT 0, priority INTEGER NOT NULL DEFAULT 0,
+            first_reported_at TEXT, last_reported_at TEXT,
+            status TEXT NOT NULL DEFAULT 'pending', moderator_id INTEGER, lease_until TEXT,
+            claims INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (target_type, target_id)) WITHOUT ROWID;
+        INSERT INTO moderation_queue (target_type, target_id, report_count, status, moderator_id,
+                                      lease_until, claims)
+        VALUES ('alert', 1, 1, 'claimed', 1, datetime('now', '+300 seconds'), 1),
+               ('user', 2, 1, 'pending', NULL, NULL, 0);
+        PRAGMA user_version = 13;
+    """)
+
+    assert db.migrate() == [14]
+    rows = {row["target_type"]: dict(row) for row in conn.execute("SELECT * FROM moderation_queue")}
+    assert rows["alert"]["status"] == "claimed" and rows["alert"]["claimed_report_id"] == 1
+    assert rows["user"]["status"] == "pending" and rows["user"]["claimed_report_id"] is None
+    assert rows["user"]["priority"] > 0
+    assert db.verify_schema()["ok"]
+    assert db.resolve_moderation_item(alice, "alert", 1) == 1
+
+
+def test_lazy_schema_defers_only_derived_tables(tmp_path):
+    """lazy_schema diffère les agrégats de progression et la file, pas les tables sources"""
+    db = DatabaseHelper(str(tmp_path / "lazy.db"), cache_size=0, lazy_schema=True)
+    try:
+        db.migrate()
+        tables = {row[0] for row in db.connect().execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert {"educational_content", "user_progress", "reports"} <= tables
+        assert not {"progress_user_category", "progress_content_daily", "moderation_queue"} & tables
+        report = db.verify_schema()
+        assert report["ok"] and report["deferred_groups"] == ["education", "moderation"]
+
+        user_id = add_user(db, "Alice")
+        conn = db.connect()
+        conn.execute("INSERT INTO educational_content (category_id, title, content) "
+                     "VALUES (1, 'Écrans', '...')")
+        conn.execute("INSERT INTO user_progress (user_id, content_id, progress_status, score) "
+                     "VALUES (?, 1, 'completed', 70)", (user_id,))
+        conn.commit()
+        # Premier accès : création du groupe et rattrapage depuis user_progress
+        assert [(row["user_id"], row["total_score"]) for row in db.get_leaderboard()] == \
+            [(user_id, 70)]
+        assert db.verify_schema()["deferred_groups"] == ["moderation"]
+    finally:
+        db.close()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""Mode pool de DatabaseHelper (ConnectionPool, WAL, connexion par thread)"""
+
+import threading
+
+import pytest
+
+from conftest import add_user
+from db_setting import DatabaseHelper
+
+
+@pytest.fixture
+def pooled_db(db):
+    """La base migrée de `db`, ouverte en mode pool (2 connexions, attente 1 s)"""
+    db_helper = DatabaseHelper(db.db_path, pool_size=2, cache_size=0)
+    db_helper.pool.timeout = 1.0
+    yield db_helper
+    db_helper.close()
+
+
+def run_in_thread(target, *args):
+    """Exécute target dans un thread court et retourne son résultat"""
+    outcome = {}
+
+    def body():
+        try:
+            outcome["result"] = target(*args)
+        except BaseException as error:
+            outcome["error"] = error
+
+    thread = threading.Thread(target=body)
+    thread.start()
+    thread.join()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def test_pool_connections_use_wal(pooled_db):
+    with pooled_db.acquire() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_threads_beyond_pool_size_get_connections_back(pooled_db):
+    """Une connexion attachée par un appel simple est rendue à la fin du thread"""
+    alice = add_user(pooled_db, "Alice")
+    pooled_db.release()
+    with pooled_db.acquire() as conn:
+        conn.execute("INSERT INTO notifications (user_id, title, message, type) "
+                     "VALUES (?, 'Bienvenue', 'Premier message', 'system')", (alice,))
+    for _ in range(5):
+        assert len(run_in_thread(pooled_db.get_notifications, alice)) == 1
+    assert len(pooled_db.pool._all) <= pooled_db.pool.size
+
+
+def test_nested_acquire_shares_the_transaction(pooled_db):
+    with pytest.raises(RuntimeError):
+        with pooled_db.acquire() as outer:
+            outer.execute("INSERT INTO education_categories (name) VALUES ('Externe')")
+            with pooled_db.acquire() as inner:
+                assert inner is outer
+                inner.execute("INSERT INTO education_categories (name) VALUES ('Interne')")
+            raise RuntimeError("annulation")
+    with pooled_db.acquire() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM education_categories "
+                            "WHERE name IN ('Externe', 'Interne')").fetchone()[0] == 0
+
+
+def test_release_returns_pinned_connection(pooled_db):
+    first = pooled_db.connect()
+    assert pooled_db.connect() is first
+    pooled_db.release()
+    with pooled_db.acquire() as conn:
+        assert conn is first
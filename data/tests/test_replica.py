@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Sauvegarde en ligne (backup) et réplicas en lecture seule (ReplicaManager)"""
+
+import sqlite3
+
+import pytest
+
+from conftest import add_user
+from db_replica import ReplicaManager
+from db_setting import DatabaseHelper
+
+
+def count_users(conn):
+    return conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+
+def test_backup_is_a_consistent_snapshot(db, tmp_path):
+    db.connect().execute("PRAGMA journal_mode = WAL")
+    for i in range(50):
+        add_user(db, f"Parent{i}", bio="x" * 2000)
+    before = count_users(db.connect())
+    writer = DatabaseHelper(db.db_path, cache_size=0)
+
+    def write_during_copy(remaining, total):
+        # Écriture concurrente entre deux paquets : absente de l'instantané
+        if remaining:
+            add_user(writer, f"Pendant{remaining}")
+
+    target = str(tmp_path / "copie.db")
+    stats = db.backup(target, pages=8, progress=write_during_copy)
+    writer.close()
+    assert stats["steps"] > 1 and stats["pages"] > 8
+    assert count_users(db.connect()) > before
+
+    copy = DatabaseHelper(target, cache_size=0)
+    try:
+        assert count_users(copy.connect()) == before
+        assert copy.connect().execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+        report = copy.verify_schema(integrity=True)
+        assert report["ok"], report
+    finally:
+        copy.close()
+
+
+def test_replicas_serve_routed_reads_until_refresh(db, tmp_path):
+    conn = db.connect()
+    conn.execute("INSERT INTO educational_content (category_id, title, content) "
+                 "VALUES (1, 'Zébrures', 'Premier contenu')")
+    conn.commit()
+    manager = ReplicaManager(db, replicas=2, interval=3600, replica_dir=str(tmp_path / "rep"))
+    with manager:
+        assert db.read_connection() is not db.connect()
+        with pytest.raises(sqlite3.OperationalError):
+            db.read_connection().execute("DELETE FROM users")
+        assert len(db.search("zebrures")) == 1
+
+        conn.execute("INSERT INTO educational_content (category_id, title, content) "
+                     "VALUES (1, 'Zébrures bis', 'Second contenu')")
+        conn.commit()
+        assert len(db.search("zebrures")) == 1
+        manager.refresh()
+        assert len(db.search("zebrures")) == 2
+
+        # Copie trop ancienne : retour sur la base principale
+        manager.max_age = 0.0
+        manager.refreshed_at -= 1
+        assert db.read_connection() is db.connect()
+    assert db.replicas is None
+    assert manager.stats["refreshes"] == 2 and manager.stats["errors"] == 0
+    manager.remove_files()
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""Recherche plein texte FTS5 (search)"""
+
+import pytest
+
+from conftest import add_user
+
+
+def add_content(db_helper, title, content, tags=None, is_published=1):
+    """Insère un contenu éducatif dans la première catégorie et retourne son id"""
+    conn = db_helper.connect()
+    cursor = conn.execute(
+        "INSERT INTO educational_content (category_id, title, content, tags, is_published) "
+        "VALUES ((SELECT MIN(id) FROM education_categories), ?, ?, ?, ?)",
+        (title, content, tags, is_published))
+    conn.commit()
+    return cursor.lastrowid
+
+
+def test_search_ignores_accents_and_case(db):
+    content_id = add_content(db, "Sécurité à l'école", "Règles élémentaires pour la récréation")
+    for query in ("securite ecole", "SÉCURITÉ", "recreation"):
+        assert [r["id"] for r in db.search(query, kinds=["education"])] == [content_id]
+    assert "<b>" in db.search("recreation", kinds=["education"])[0]["snippet"]
+
+
+def test_search_prefix_and_ranking(db):
+    in_body = add_content(db, "Promenade", "Un mot sur le trampoline du parc")
+    in_title = add_content(db, "Trampoline au jardin", "Conseils de surveillance")
+    results = db.search("trampo", kinds=["education"])
+    assert [r["id"] for r in results] == [in_title, in_body]
+    assert results[0]["score"] <= results[1]["score"]
+
+
+def test_search_follows_updates_deletes_and_visibility(db):
+    content_id = add_content(db, "Xylophone", "Instrument de musique")
+    hidden_id = add_content(db, "Xylophone caché", "Brouillon", is_published=0)
+    conn = db.connect()
+    assert [r["id"] for r in db.search("xylophone", kinds=["education"])] == [content_id]
+    conn.execute("UPDATE educational_content SET title = 'Métallophone' WHERE id = ?", (content_id,))
+    conn.commit()
+    assert db.search("xylophone", kinds=["education"]) == []
+    assert [r["id"] for r in db.search("metallophone", kinds=["education"])] == [content_id]
+    conn.execute("DELETE FROM educational_content WHERE id = ?", (content_id,))
+    conn.commit()
+    assert db.search("metallophone", kinds=["education"]) == []
+    assert hidden_id not in [r["id"] for r in db.search("brouillon")]
+
+
+def test_search_merges_kinds_and_quotes_user_syntax(db):
+    author = add_user(db, "Alice")
+    conn = db.connect()
+    conn.execute("INSERT INTO parenting_advice (author_id, title, content, category) "
+                 "VALUES (?, 'Coucher serein', 'Rituel du soir', 'sommeil')", (author,))
+    conn.execute("INSERT INTO community_alerts (user_id, title, description, alert_type, "
+                 "latitude, longitude) VALUES (?, 'Chien errant', 'Vu près du coucher de soleil', "
+                 "'animal', 48.85, 2.35)", (author,))
+    conn.commit()
+    assert {r["kind"] for r in db.search("coucher")} == {"advice", "alerts"}
+    # Opérateurs FTS5 de la saisie traités comme du texte
+    assert {r["kind"] for r in db.search('"coucher" -(')} == {"advice", "alerts"}
+    assert db.search("*") == []
+    with pytest.raises(ValueError):
+        db.search("coucher", kinds=["forum"])
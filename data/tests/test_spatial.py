@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""Recherches de proximité (R*Tree puis haversine)"""
+
+import pytest
+
+from conftest import add_user
+from db_setting import distance_from, haversine_m
+
+
+@pytest.mark.parametrize("origin, point", [
+    ((48.8566, 2.3522), (48.8600, 2.3600)),
+    ((0.0, 179.99), (0.0, -179.99)),
+    ((-33.87, 151.21), (51.51, -0.13)),
+])
+def test_distance_from_matches_haversine(origin, point):
+    assert distance_from(*origin)(*point) == pytest.approx(haversine_m(*origin, *point), abs=1e-6)
+
+
+def test_find_alerts_near(db):
+    user_id = add_user(db, "Alice")
+    conn = db.connect()
+    for title, lat, lon, alert_type in (("Proche", 48.8570, 2.3525, "lost_child"),
+                                        ("Moyenne", 48.8650, 2.3522, "road_danger"),
+                                        ("Loin", 48.9500, 2.3522, "lost_child"),
+                                        ("Antiméridien", -16.5, 179.999, "other")):
+        conn.execute("INSERT INTO community_alerts (user_id, title, description, alert_type, "
+                     "latitude, longitude) VALUES (?, ?, '', ?, ?, ?)",
+                     (user_id, title, alert_type, lat, lon))
+    conn.commit()
+
+    near = db.find_alerts_near(48.8566, 2.3522, 2000)
+    assert [alert["title"] for alert in near] == ["Proche", "Moyenne"]
+    assert near[0]["distance_m"] == pytest.approx(haversine_m(48.8566, 2.3522, 48.8570, 2.3525))
+    assert [a["title"] for a in db.find_alerts_near(48.8566, 2.3522, 2000,
+                                                    alert_type="lost_child")] == ["Proche"]
+    assert [a["title"] for a in db.find_alerts_near(-16.5, -179.999, 1000)] == ["Antiméridien"]